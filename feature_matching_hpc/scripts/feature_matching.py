@@ -2,6 +2,9 @@
 
 debug = False
 
+# Optional bounding box (xmin, ymin, xmax, ymax) in the study crs, for only matching the edges in part of the study area
+bbox = None
+
 import os.path
 import pickle
 import os
@@ -11,6 +14,7 @@ import pandas as pd
 import yaml
 
 from src import matching_functions as match_func
+from src import parquet_functions as parquet_func
 
 with open(r"../config.yml") as file:
 
@@ -21,13 +25,13 @@ with open(r"../config.yml") as file:
 
 path = f"../{study_area}"
 
-ref_edges_simplified = gpd.read_parquet(path+"/data/ref_edges_simplified.parquet")
-ref_edges_simp_joined = gpd.read_parquet(path+"/data/ref_edges_simplified_joined.parquet")
-osm_edges_simplified = gpd.read_parquet(path+"/data/osm_edges_simplified.parquet")
-osm_edges_simp_joined = gpd.read_parquet(path+"/data/osm_edges_simplified_joined.parquet")
+ref_edges_simplified = parquet_func.read_parquet(path+"/data/ref_edges_simplified.parquet", bbox=bbox)
+ref_edges_simp_joined = parquet_func.read_parquet(path+"/data/ref_edges_simplified_joined.parquet", bbox=bbox)
+osm_edges_simplified = parquet_func.read_parquet(path+"/data/osm_edges_simplified.parquet", bbox=bbox)
+osm_edges_simp_joined = parquet_func.read_parquet(path+"/data/osm_edges_simplified_joined.parquet", bbox=bbox)
 
-ref_grid = gpd.read_parquet(path+"/data/ref_grid.parquet")
-osm_grid = gpd.read_parquet(path+"/data/osm_grid.parquet")
+ref_grid = parquet_func.read_parquet(path+"/data/ref_grid.parquet")
+osm_grid = parquet_func.read_parquet(path+"/data/osm_grid.parquet")
 
 grid = pd.merge(left=osm_grid, right=ref_grid.drop('geometry',axis=1), left_index=True, right_index=True, suffixes=('_osm','_ref'))
 assert len(grid) == len(osm_grid) == len(ref_grid)
@@ -63,10 +67,21 @@ ref_segments.set_crs(study_crs, inplace=True)
 ref_segments.rename(columns={"seg_id": "seg_id_ref"}, inplace=True)
 ref_segments.dropna(subset=["geometry"], inplace=True)
 
+# Sort segments spatially, so segments close to each other are also close in memory and on disk
+osm_segments, osm_id_map = parquet_func.spatial_sort(osm_segments)
+ref_segments, ref_id_map = parquet_func.spatial_sort(ref_segments)
+
 print('Segments created!')
 
-osm_segments.to_parquet(path+f"/processed/osm_segments_{segment_length}.parquet")
-ref_segments.to_parquet(path+f"/processed/ref_segments_{segment_length}.parquet")
+osm_segments_fp = path+f"/processed/osm_segments_{segment_length}.parquet"
+ref_segments_fp = path+f"/processed/ref_segments_{segment_length}.parquet"
+
+osm_segments.to_parquet(osm_segments_fp)
+ref_segments.to_parquet(ref_segments_fp)
+
+# Original and new position of each segment
+osm_id_map.to_parquet(parquet_func.id_map_path(osm_segments_fp), index=False)
+ref_id_map.to_parquet(parquet_func.id_map_path(ref_segments_fp), index=False)
 
 buffer_matches = match_func.overlay_buffer(
     reference_data=ref_segments,
@@ -29,6 +29,7 @@ copy_files = {
     f"../data/OSM/{study_area}/processed/osm_edges_simplified.parquet":f"{study_area}/data/osm_edges_simplified.parquet",
     f"../data/OSM/{study_area}/processed/osm_edges_simplified_joined.parquet":f"{study_area}/data/osm_edges_simplified_joined.parquet",
     "../src/matching_functions.py":"scripts/src/matching_functions.py",
+    "../src/parquet_functions.py":"scripts/src/parquet_functions.py",
     "../config.yml":"config.yml"
 }
     
@@ -0,0 +1,46 @@
+# Lazy loaders for the data prepared in the 1a_initialize_osm and 2a_initialize_ref notebooks
+# Datasets are only read when they are used, e.g. osm_loader.edges_simplified or osm_loader.load("edges_simplified", columns=["edge_id", "geometry"])
+# Use osm_loader.report() and ref_loader.report() to see which datasets are loaded and how much memory they use
+
+from src import io_functions as io_func
+
+exec(open("../settings/yaml_variables.py").read())
+exec(open("../settings/paths.py").read())
+
+# Optional bounding box (xmin, ymin, xmax, ymax) in the study crs, for only loading the data in part of the study area
+load_bbox = None
+
+osm_loader = io_func.DataLoader(
+    {
+        "graph": osm_graph_fp,
+        "graph_simplified": osm_graph_simplified_fp,
+        "grid": osm_grid_fp,
+        "nodes": osm_nodes_fp,
+        "edges": osm_edges_fp,
+        "nodes_simplified": osm_nodes_simplified_fp,
+        "edges_simplified": osm_edges_simplified_fp,
+        "nodes_joined": osm_nodes_joined_fp,
+        "edges_joined": osm_edges_joined_fp,
+        "nodes_simp_joined": osm_nodes_simplified_joined_fp,
+        "edges_simp_joined": osm_edges_simplified_joined_fp,
+    },
+    index_cols={"nodes": "osmid", "nodes_simplified": "osmid"},
+    bbox=load_bbox,
+)
+
+ref_loader = io_func.DataLoader(
+    {
+        "graph": ref_graph_fp,
+        "graph_simplified": ref_graph_simplified_fp,
+        "grid": ref_grid_fp,
+        "nodes": ref_nodes_fp,
+        "edges": ref_edges_fp,
+        "nodes_simplified": ref_nodes_simplified_fp,
+        "edges_simplified": ref_edges_simplified_fp,
+        "nodes_joined": ref_nodes_joined_fp,
+        "edges_joined": ref_edges_joined_fp,
+        "nodes_simp_joined": ref_nodes_simplified_joined_fp,
+        "edges_simp_joined": ref_edges_simplified_joined_fp,
+    },
+    bbox=load_bbox,
+)
@@ -1,57 +1,39 @@
 # This data is prepared in the 1a_initialize_osm notebook
+# To only load the data needed, use the lazy loader osm_loader defined in data_loaders.py instead
 
 import osmnx as ox
 import geopandas as gpd
 
-exec(open("../settings/yaml_variables.py").read())
-exec(open("../settings/paths.py").read())
+exec(open("../settings/data_loaders.py").read())
 
 # Load simplified and non-simplified graphs
 
-osm_graph = ox.load_graphml(
-    osm_graph_fp,
-)
+osm_graph = osm_loader.graph
 
-
-osm_graph_simplified = ox.load_graphml(
-    osm_graph_simplified_fp,
-
-)
-
-# osm_graph_simplified = ox.load_graphml(
-#     osm_graph_simplified_fp,
-#     edge_dtypes={
-#         "bicycle_bidirectional": ox.io._convert_bool_string,
-#         "infrastructure_length": float,
-#     },
-# )
+osm_graph_simplified = osm_loader.graph_simplified
 
 print("OSM graphs loaded successfully!")
 
 # Load grid
-osm_grid = gpd.read_parquet(osm_grid_fp)
+osm_grid = osm_loader.grid
 grid_ids = osm_grid.grid_id.to_list()
 
 # Load saved edged and nodes
-osm_nodes = gpd.read_parquet(osm_nodes_fp)
-osm_nodes.set_index("osmid", inplace=True)
+osm_nodes = osm_loader.nodes
 
-osm_edges = gpd.read_parquet(osm_edges_fp)
-#osm_edges.set_index(["u", "v", "key"], inplace=True)
+osm_edges = osm_loader.edges
 
-osm_edges_simplified = gpd.read_parquet(osm_edges_simplified_fp)
-#osm_edges_simplified.set_index(["u", "v", "key"], inplace=True)
+osm_edges_simplified = osm_loader.edges_simplified
 
-osm_nodes_simplified = gpd.read_parquet(osm_nodes_simplified_fp)
-osm_nodes_simplified.set_index("osmid", inplace=True)
+osm_nodes_simplified = osm_loader.nodes_simplified
 osm_nodes_simplified["osmid"] = osm_nodes_simplified.index
 
-osm_edges_joined = gpd.read_parquet(osm_edges_joined_fp)
+osm_edges_joined = osm_loader.edges_joined
 
-osm_nodes_joined = gpd.read_parquet(osm_nodes_joined_fp)
+osm_nodes_joined = osm_loader.nodes_joined
 
-osm_edges_simp_joined = gpd.read_parquet(osm_edges_simplified_joined_fp)
+osm_edges_simp_joined = osm_loader.edges_simp_joined
 
-osm_nodes_simp_joined = gpd.read_parquet(osm_nodes_simplified_joined_fp)
+osm_nodes_simp_joined = osm_loader.nodes_simp_joined
 
 print("OSM data loaded successfully!")
@@ -1,47 +1,39 @@
 # This data is prepared in the 2a_initialize_ref notebook
+# To only load the data needed, use the lazy loader ref_loader defined in data_loaders.py instead
 
 import osmnx as ox
 import geopandas as gpd
 
-exec(open("../settings/yaml_variables.py").read())
-exec(open("../settings/paths.py").read())
+exec(open("../settings/data_loaders.py").read())
 
 # Load simplified and non-simplified graphs
-ref_graph = ox.load_graphml(
-    ref_graph_fp
-)
+ref_graph = ref_loader.graph
 
-ref_graph_simplified = ox.load_graphml(
-    ref_graph_simplified_fp
-)
+ref_graph_simplified = ref_loader.graph_simplified
 
 print("Reference graphs loaded successfully!")
 
 # Load grid
-ref_grid = gpd.read_parquet(ref_grid_fp)
+ref_grid = ref_loader.grid
 grid_ids = ref_grid.grid_id.to_list()
 
 # # Load saved edged and nodes
-ref_nodes = gpd.read_parquet(ref_nodes_fp)
-#ref_nodes.set_index("osmid", inplace=True)
+ref_nodes = ref_loader.nodes
 assert ref_nodes.index.name == 'osmid'
 
-ref_edges = gpd.read_parquet(ref_edges_fp)
-#ref_edges.set_index(["u", "v", "key"], inplace=True)
+ref_edges = ref_loader.edges
 
-ref_edges_simplified = gpd.read_parquet(ref_edges_simplified_fp)
-#ref_edges_simplified.set_index(["u", "v", "key"], inplace=True)
+ref_edges_simplified = ref_loader.edges_simplified
 
-ref_nodes_simplified = gpd.read_parquet(ref_nodes_simplified_fp)
-#ref_nodes_simplified.set_index("osmid", inplace=True)
+ref_nodes_simplified = ref_loader.nodes_simplified
 assert ref_nodes_simplified.index.name == 'osmid'
 
-ref_edges_joined = gpd.read_parquet(ref_edges_joined_fp)
+ref_edges_joined = ref_loader.edges_joined
 
-ref_nodes_joined = gpd.read_parquet(ref_nodes_joined_fp)
+ref_nodes_joined = ref_loader.nodes_joined
 
-ref_edges_simp_joined = gpd.read_parquet(ref_edges_simplified_joined_fp)
+ref_edges_simp_joined = ref_loader.edges_simp_joined
 
-ref_nodes_simp_joined = gpd.read_parquet(ref_nodes_simplified_joined_fp)
+ref_nodes_simp_joined = ref_loader.nodes_simp_joined
 
 print("Reference data loaded successfully!")
@@ -2,6 +2,7 @@ import geopandas as gpd
 import pickle
 import json
 import pandas as pd
+from src import evaluation_functions as eval_func
 
 exec(open("../settings/yaml_variables.py").read())
 exec(open("../settings/paths.py").read())
@@ -18,17 +19,10 @@ exec(open("../settings/paths.py").read())
 # assert len(grid) == len(osm_intrinsic_grid) == len(ref_intrinsic_grid)
 # grid['grid_id'] = grid.grid_id_osm
 
-with open(
-    f"../../results/OSM/{study_area}/data/grid_results_intrinsic.pickle", "rb"
-) as fp:
-    osm_intrinsic_grid = pickle.load(fp)
+osm_intrinsic_grid = eval_func.load_grid_results(osm_intrinsic_grid_fp)
 
-with open(
-    f"../../results/REFERENCE/{study_area}/data/grid_results_intrinsic.pickle", "rb"
-) as fp:
-    ref_intrinsic_grid = pickle.load(fp)
-
-ref_intrinsic_grid.drop("geometry", axis=1, inplace=True)
+# Geometries are only needed once
+ref_intrinsic_grid = eval_func.load_grid_results(ref_intrinsic_grid_fp, geometry=False)
 
 grid = osm_intrinsic_grid.merge(
     ref_intrinsic_grid, on="grid_id", suffixes=("_osm", "_ref")
@@ -3,9 +3,10 @@ import pickle
 
 # OSM filepaths
 osm_processed_fp = f"../../data/OSM/{study_area}/processed/"
+osm_cache_fp = osm_processed_fp + "cache/"
 
-osm_graph_fp = osm_processed_fp + "osm_graph.graphml"
-osm_graph_simplified_fp = osm_processed_fp + "osm_simplified_graph.graphml"
+osm_graph_fp = osm_processed_fp + "osm_graph/"
+osm_graph_simplified_fp = osm_processed_fp + "osm_simplified_graph/"
 
 osm_edges_fp = osm_processed_fp + "osm_edges.parquet"
 osm_nodes_fp = osm_processed_fp + "osm_nodes.parquet"
@@ -19,7 +20,7 @@ osm_nodes_simplified_joined_fp = osm_processed_fp + "osm_nodes_simplified_joined
 
 osm_grid_fp = osm_processed_fp + "grid.parquet"
 osm_intrinsic_grid_fp = (
-    f"../../results/OSM/{study_area}/data/grid_results_intrinsic.pickle"
+    f"../../results/OSM/{study_area}/data/grid_results_intrinsic.parquet"
 )
 
 osm_intrinsic_fp = f"../../results/OSM/{study_area}/data/intrinsic_analysis.json"
@@ -35,9 +36,10 @@ osm_results_data_fp = f"../../results/OSM/{study_area}/data/"
 
 # Reference filepaths
 ref_processed_fp = f"../../data/REFERENCE/{study_area}/processed/"
+ref_cache_fp = ref_processed_fp + "cache/"
 
-ref_graph_fp = ref_processed_fp + "ref_graph.graphml"
-ref_graph_simplified_fp = ref_processed_fp + "ref_simplified_graph.graphml"
+ref_graph_fp = ref_processed_fp + "ref_graph/"
+ref_graph_simplified_fp = ref_processed_fp + "ref_simplified_graph/"
 
 ref_edges_fp = ref_processed_fp + "ref_edges.parquet"
 ref_nodes_fp = ref_processed_fp + "ref_nodes.parquet"
@@ -51,7 +53,7 @@ ref_nodes_simplified_joined_fp = ref_processed_fp + "ref_nodes_simplified_joined
 
 ref_grid_fp = ref_processed_fp + "grid.parquet"
 ref_intrinsic_grid_fp = (
-    f"../../results/REFERENCE/{study_area}/data/grid_results_intrinsic.pickle"
+    f"../../results/REFERENCE/{study_area}/data/grid_results_intrinsic.parquet"
 )
 
 ref_intrinsic_fp = f"../../results/REFERENCE/{study_area}/data/intrinsic_analysis.json"
@@ -73,3 +75,5 @@ compare_results_static_maps_fp = f"../../results/COMPARE/{study_area}/maps_stati
 compare_results_inter_maps_fp = f"../../results/COMPARE/{study_area}/maps_interactive/"
 compare_results_plots_fp = f"../../results/COMPARE/{study_area}/plots/"
 compare_results_data_fp = f"../../results/COMPARE/{study_area}/data/"
+
+compare_extrinsic_grid_fp = compare_results_data_fp + "grid_results_extrinsic.parquet"
@@ -1,6 +1,14 @@
+from src import parquet_functions as parquet_func
+from src import schema_functions as schema_func
+
 exec(open("../settings/yaml_variables.py").read())
 exec(open("../settings/paths.py").read())
 
+# Nodes and edges are sorted spatially before saving, for faster spatial queries and partial reads.
+# Use "hilbert" or "h3" (see parquet_functions.spatial_sort), or None to save the data in the original order
+# For sorted data, the original and new position of each row is saved in a "_id_map.parquet" file next to the data
+parquet_sort_method = "hilbert"
+
 
 assert len(bicycle_nodes) == len(bicycle_nodes.osmid.unique())
 assert len(bicycle_edges) == len(bicycle_edges.edge_id.unique())
@@ -12,11 +20,30 @@ assert len(bicycle_nodes_simplified) == len(
 assert "infrastructure_length" in bicycle_edges_simplified.columns
 assert "length" in bicycle_edges.columns
 
-bicycle_nodes.to_parquet(osm_nodes_fp, index=True)
+# Store OSM tags as categoricals, ids as integers, lengths as float32 and booleans as bool
+osm_tag_cols = schema_func.osm_tag_columns(osm_way_tags)
+
+# osmid of simplified edges can be a list of ids, and is always stored as a string
+simplified_id_cols = [c for c in schema_func.ID_COLUMNS if c != "osmid"]
+
+bicycle_nodes = schema_func.compact_dtypes(bicycle_nodes, tag_cols=osm_tag_cols)
+bicycle_edges = schema_func.compact_dtypes(bicycle_edges, tag_cols=osm_tag_cols)
+bicycle_nodes_simplified = schema_func.compact_dtypes(bicycle_nodes_simplified)
+bicycle_edges_simplified = schema_func.compact_dtypes(
+    bicycle_edges_simplified, id_cols=simplified_id_cols
+)
+osm_nodes_joined = schema_func.compact_dtypes(osm_nodes_joined)
+osm_edges_joined = schema_func.compact_dtypes(osm_edges_joined, tag_cols=osm_tag_cols)
+osm_nodes_simp_joined = schema_func.compact_dtypes(osm_nodes_simp_joined)
+osm_edges_simp_joined = schema_func.compact_dtypes(
+    osm_edges_simp_joined, id_cols=simplified_id_cols
+)
 
-bicycle_edges.to_parquet(osm_edges_fp, index=True)
+parquet_func.write_parquet(bicycle_nodes, osm_nodes_fp, sort_method=parquet_sort_method)
 
-bicycle_nodes_simplified.to_parquet(osm_nodes_simplified_fp, index=True)
+parquet_func.write_parquet(bicycle_edges, osm_edges_fp, sort_method=parquet_sort_method)
+
+parquet_func.write_parquet(bicycle_nodes_simplified, osm_nodes_simplified_fp, sort_method=parquet_sort_method)
 
 cols = [
     "edge_id",
@@ -32,19 +59,16 @@ cols = [
 ]
 keep_cols = [c for c in cols if c in bicycle_edges_simplified.columns]
 
-bicycle_edges_simplified["osmid"] = bicycle_edges_simplified["osmid"].astype(str)
 bicycle_edges_simplified["osmid"] = bicycle_edges_simplified["osmid"].astype(str)
 bicycle_edges_simplified = bicycle_edges_simplified[keep_cols]
 
-bicycle_edges_simplified.to_parquet(osm_edges_simplified_fp, index=True)
+parquet_func.write_parquet(bicycle_edges_simplified, osm_edges_simplified_fp, sort_method=parquet_sort_method)
 
-osm_nodes_joined.to_parquet(osm_nodes_joined_fp, index=True)
+parquet_func.write_parquet(osm_nodes_joined, osm_nodes_joined_fp, sort_method=parquet_sort_method)
 
-osm_edges_joined.to_parquet(osm_edges_joined_fp, index=True)
+parquet_func.write_parquet(osm_edges_joined, osm_edges_joined_fp, sort_method=parquet_sort_method)
 
-osm_nodes_simp_joined.to_parquet(
-    osm_nodes_simplified_joined_fp, index=True
-)
+parquet_func.write_parquet(osm_nodes_simp_joined, osm_nodes_simplified_joined_fp, sort_method=parquet_sort_method)
 
 cols = [
     "edge_id",
@@ -63,20 +87,17 @@ cols = [
 ]
 keep_cols = [c for c in cols if c in osm_edges_simp_joined.columns]
 
-osm_edges_simp_joined["osmid"] = osm_edges_simp_joined["osmid"].astype(str)
 osm_edges_simp_joined["osmid"] = osm_edges_simp_joined["osmid"].astype(str)
 osm_edges_simp_joined = osm_edges_simp_joined[keep_cols]
 
-osm_edges_simp_joined.to_parquet(
-    osm_edges_simplified_joined_fp, index=True
-)
+parquet_func.write_parquet(osm_edges_simp_joined, osm_edges_simplified_joined_fp, sort_method=parquet_sort_method)
 
 print("OSM nodes and edges saved successfully!")
 
-ox.save_graphml(bicycle_graph, osm_graph_fp)
-ox.save_graphml(bicycle_graph_simplified, osm_graph_simplified_fp)
+graph_func.save_graph_parquet(bicycle_graph, osm_graph_fp)
+graph_func.save_graph_parquet(bicycle_graph_simplified, osm_graph_simplified_fp)
 print("OSM networks saved successfully!")
 
 # Export grid
-grid.to_parquet(osm_grid_fp)
+parquet_func.write_parquet(grid, osm_grid_fp, sort_method=None)
 print("OSM grid saved successfully!")
@@ -1,6 +1,14 @@
+from src import parquet_functions as parquet_func
+from src import schema_functions as schema_func
+
 exec(open("../settings/yaml_variables.py").read())
 exec(open("../settings/paths.py").read())
 
+# Nodes and edges are sorted spatially before saving, for faster spatial queries and partial reads.
+# Use "hilbert" or "h3" (see parquet_functions.spatial_sort), or None to save the data in the original order
+# For sorted data, the original and new position of each row is saved in a "_id_map.parquet" file next to the data
+parquet_sort_method = "hilbert"
+
 assert len(ref_nodes) == len(ref_nodes.nodeID.unique())
 assert len(ref_edges) == len(ref_edges.edge_id.unique())
 assert len(ref_edges_simplified) == len(ref_edges_simplified.edge_id.unique())
@@ -9,11 +17,30 @@ assert len(ref_nodes_simplified) == len(ref_nodes_simplified.nodeID.unique())
 assert "infrastructure_length" in ref_edges_simplified.columns
 assert "length" in ref_edges.columns
 
-ref_nodes.to_parquet(ref_nodes_fp, index=True)
+# Store ids as integers, lengths as float32 and booleans as bool
+ref_bool_cols = [bicycle_bidirectional]
+
+# osmid of simplified edges can be a list of ids, and is always stored as a string
+simplified_id_cols = [c for c in schema_func.ID_COLUMNS if c != "osmid"]
+
+ref_nodes = schema_func.compact_dtypes(ref_nodes)
+ref_edges = schema_func.compact_dtypes(ref_edges, bool_cols=ref_bool_cols)
+ref_nodes_simplified = schema_func.compact_dtypes(ref_nodes_simplified)
+ref_edges_simplified = schema_func.compact_dtypes(
+    ref_edges_simplified, id_cols=simplified_id_cols, bool_cols=ref_bool_cols
+)
+ref_nodes_joined = schema_func.compact_dtypes(ref_nodes_joined)
+ref_edges_joined = schema_func.compact_dtypes(ref_edges_joined, bool_cols=ref_bool_cols)
+ref_nodes_simp_joined = schema_func.compact_dtypes(ref_nodes_simp_joined)
+ref_edges_simp_joined = schema_func.compact_dtypes(
+    ref_edges_simp_joined, id_cols=simplified_id_cols, bool_cols=ref_bool_cols
+)
+
+parquet_func.write_parquet(ref_nodes, ref_nodes_fp, sort_method=parquet_sort_method)
 
-ref_edges.to_parquet(ref_edges_fp, index=True)
+parquet_func.write_parquet(ref_edges, ref_edges_fp, sort_method=parquet_sort_method)
 
-ref_nodes_simplified.to_parquet(ref_nodes_simplified_fp, index=True)
+parquet_func.write_parquet(ref_nodes_simplified, ref_nodes_simplified_fp, sort_method=parquet_sort_method)
 
 cols = [
     "edge_id",
@@ -31,21 +58,19 @@ cols = [
 ]
 keep_cols = [c for c in cols if c in ref_edges_simplified.columns]
 
+ref_edges_simplified["osmid"] = ref_edges_simplified["osmid"].astype(str)
 ref_edges_simplified[reference_id_col] = ref_edges_simplified[reference_id_col].astype(
     str
 )
-ref_edges_simplified["osmid"] = ref_edges_simplified["osmid"].astype(str)
 ref_edges_simplified = ref_edges_simplified[keep_cols]
 
-ref_edges_simplified.to_parquet(ref_edges_simplified_fp, index=True)
+parquet_func.write_parquet(ref_edges_simplified, ref_edges_simplified_fp, sort_method=parquet_sort_method)
 
-ref_nodes_joined.to_parquet(ref_nodes_joined_fp, index=True)
+parquet_func.write_parquet(ref_nodes_joined, ref_nodes_joined_fp, sort_method=parquet_sort_method)
 
-ref_edges_joined.to_parquet(ref_edges_joined_fp, index=True)
+parquet_func.write_parquet(ref_edges_joined, ref_edges_joined_fp, sort_method=parquet_sort_method)
 
-ref_nodes_simp_joined.to_parquet(
-    ref_nodes_simplified_joined_fp, index=True 
-)
+parquet_func.write_parquet(ref_nodes_simp_joined, ref_nodes_simplified_joined_fp, sort_method=parquet_sort_method)
 
 cols = [
     "edge_id",
@@ -67,24 +92,22 @@ cols = [
 ]
 keep_cols = [c for c in cols if c in ref_edges_simp_joined.columns]
 
+ref_edges_simp_joined["osmid"] = ref_edges_simp_joined["osmid"].astype(str)
 ref_edges_simp_joined[reference_id_col] = ref_edges_simp_joined[
     reference_id_col
 ].astype(str)
-ref_edges_simp_joined["osmid"] = ref_edges_simp_joined["osmid"].astype(str)
 ref_edges_simp_joined = ref_edges_simp_joined[keep_cols]
 
-ref_edges_simp_joined.to_parquet(
-    ref_edges_simplified_joined_fp, index=True 
-)
+parquet_func.write_parquet(ref_edges_simp_joined, ref_edges_simplified_joined_fp, sort_method=parquet_sort_method)
 
 
 print(f"{reference_name} nodes and edges saved successfully!")
 
-ox.save_graphml(graph_ref, ref_graph_fp)
-ox.save_graphml(graph_ref_simplified, ref_graph_simplified_fp)
+graph_func.save_graph_parquet(graph_ref, ref_graph_fp)
+graph_func.save_graph_parquet(graph_ref_simplified, ref_graph_simplified_fp)
 
 print(f"{reference_name} networks saved successfully!")
 
 # Export grid
-grid.to_parquet(ref_grid_fp)
+parquet_func.write_parquet(grid, ref_grid_fp, sort_method=None)
 print("Reference grid saved successfully!")
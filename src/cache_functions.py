@@ -0,0 +1,234 @@
+"""
+The functions defined below are used for caching the results of time consuming analysis functions on disk,
+so that notebooks can be rerun without recomputing results for unchanged input data
+"""
+
+import os
+import glob
+import pickle
+import hashlib
+import inspect
+import functools
+import pandas as pd
+import geopandas as gpd
+import networkx as nx
+import shapely
+
+
+def _update_hash(hasher, obj):
+
+    """
+    Update a hash object with the content of obj.
+    Geometries are hashed using their WKB representation, other columns using the pandas hash of their values.
+
+    Arguments:
+        hasher (hashlib hash object): hash to update
+        obj (undefined): object to hash (gdf, df, networkx graph, list, dict etc.)
+
+    Returns:
+        None
+    """
+
+    hasher.update(type(obj).__name__.encode())
+
+    if isinstance(obj, (gpd.GeoDataFrame, gpd.GeoSeries)):
+
+        geometry = obj.geometry if isinstance(obj, gpd.GeoDataFrame) else obj
+        hasher.update(str(obj.crs).encode())
+
+        for wkb in shapely.to_wkb(geometry.to_numpy()):
+            hasher.update(wkb if wkb is not None else b"")
+
+        if isinstance(obj, gpd.GeoDataFrame):
+            _update_hash(hasher, pd.DataFrame(obj.drop(columns=obj.geometry.name)))
+        else:
+            _update_hash(hasher, obj.index.to_series())
+
+    elif isinstance(obj, (pd.DataFrame, pd.Series)):
+
+        if isinstance(obj, pd.DataFrame):
+            hasher.update(str(obj.columns.to_list()).encode())
+        else:
+            hasher.update(str(obj.name).encode())
+
+        try:
+            values = pd.util.hash_pandas_object(obj, index=True)
+        except TypeError:
+            # Columns with unhashable values (e.g. lists) are hashed using their string representation
+            values = pd.util.hash_pandas_object(obj.astype(str), index=True)
+
+        hasher.update(values.to_numpy().tobytes())
+
+    elif isinstance(obj, nx.Graph):
+
+        hasher.update(pickle.dumps(list(obj.nodes(data=True))))
+        hasher.update(pickle.dumps(list(obj.edges(data=True))))
+
+    elif isinstance(obj, (list, tuple)):
+
+        for o in obj:
+            _update_hash(hasher, o)
+
+    elif isinstance(obj, dict):
+
+        for k in sorted(obj.keys(), key=str):
+            _update_hash(hasher, k)
+            _update_hash(hasher, obj[k])
+
+    else:
+        hasher.update(pickle.dumps(obj))
+
+
+def hash_arguments(func, *args, **kwargs):
+
+    """
+    Create a key identifying a function call based on the function source code and the arguments.
+
+    Arguments:
+        func (function): function to be called
+        *args (undefined): arguments
+        **kwargs (undefined): keyword arguments
+
+    Returns:
+        key (str): hex digest of the hash
+    """
+
+    hasher = hashlib.sha256()
+
+    hasher.update(func.__module__.encode())
+    hasher.update(func.__qualname__.encode())
+    hasher.update(inspect.getsource(func).encode())
+
+    _update_hash(hasher, list(args))
+    _update_hash(hasher, kwargs)
+
+    return hasher.hexdigest()
+
+
+def _write_result(result, fp):
+
+    """
+    Helper function for storing a result. Dataframes are stored as parquet, other results are pickled.
+    Returns the filepath of the stored result.
+    """
+
+    if isinstance(result, pd.DataFrame):
+        try:
+            result.to_parquet(fp + ".parquet")
+            return fp + ".parquet"
+        except Exception:
+            # E.g. columns with mixed data types
+            if os.path.exists(fp + ".parquet"):
+                os.remove(fp + ".parquet")
+
+    with open(fp + ".pickle", "wb") as f:
+        pickle.dump(result, f)
+
+    return fp + ".pickle"
+
+
+def _read_result(fp):
+
+    """
+    Helper function for loading a result stored with _write_result.
+    """
+
+    if fp.endswith(".parquet"):
+        try:
+            return gpd.read_parquet(fp)
+        except ValueError:
+            # No geometry column
+            return pd.read_parquet(fp)
+
+    with open(fp, "rb") as f:
+        return pickle.load(f)
+
+
+def evict_cache(cache_dir, max_size_mb):
+
+    """
+    Remove the least recently used results from a cache directory until the size of the cache is below max_size_mb.
+
+    Arguments:
+        cache_dir (str): path to cache directory
+        max_size_mb (numeric): max size of the cache in megabytes
+
+    Returns:
+        None
+    """
+
+    files = glob.glob(os.path.join(cache_dir, "*.parquet")) + glob.glob(
+        os.path.join(cache_dir, "*.pickle")
+    )
+    files.sort(key=os.path.getmtime)
+
+    total_size = sum(os.path.getsize(f) for f in files)
+
+    while files and total_size > max_size_mb * 1000000:
+        f = files.pop(0)
+        total_size -= os.path.getsize(f)
+        os.remove(f)
+
+
+def disk_cache(cache_dir, max_size_mb=1000):
+
+    """
+    Decorator for caching the results of a function on disk.
+    Results are stored with a key based on a hash of the function source code and all arguments,
+    so results are only reused if the input data and parameters are unchanged.
+    When the cache exceeds max_size_mb, the least recently used results are removed.
+
+    OBS! Changes a function makes to its input data (e.g. new columns) are not repeated when a cached result is used.
+
+    Arguments:
+        cache_dir (str): path to directory for storing cached results
+        max_size_mb (numeric): max size of the cache in megabytes
+
+    Returns:
+        decorator (function): decorator to wrap a function with
+
+    Example:
+        find_adjacent_components = disk_cache("../../data/cache/")(eval_func.find_adjacent_components)
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+
+            os.makedirs(cache_dir, exist_ok=True)
+
+            fp = os.path.join(
+                cache_dir, func.__name__ + "_" + hash_arguments(func, *args, **kwargs)
+            )
+
+            for cached_fp in [fp + ".parquet", fp + ".pickle"]:
+                if os.path.exists(cached_fp):
+                    # Update modification time, used for removing least recently used results
+                    os.utime(cached_fp)
+                    return _read_result(cached_fp)
+
+            result = func(*args, **kwargs)
+
+            _write_result(result, fp)
+            evict_cache(cache_dir, max_size_mb)
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def clear_cache(cache_dir):
+
+    """
+    Remove all cached results in a cache directory.
+
+    Arguments:
+        cache_dir (str): path to cache directory
+
+    Returns:
+        None
+    """
+
+    evict_cache(cache_dir, 0)
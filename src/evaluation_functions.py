@@ -10,65 +10,137 @@ import osmnx as ox
 import networkx as nx
 import numpy as np
 import matplotlib.pyplot as plt
-from shapely.geometry import mapping, Polygon
-import h3
+import shapely
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 
 
-def create_h3_grid(polygon_gdf, hex_resolution, crs, buffer_dist):
+def merge_results(grid, results_df, how):
 
-    # Inspired by https://stackoverflow.com/questions/51159241/how-to-generate-shapefiles-for-h3-hexagons-in-a-particular-area
+    """
+    Merges a dataframe with analysis results with the grid gdf.
+    Checks if columns already have been merged - if they have, existing columns are dropped from the grid.
+    For left merges on unique grid ids, the results columns are aligned on grid_id and added to a shallow copy of the grid,
+    so the geometries and existing columns are not copied. The columns of the input grid are not changed.
 
-    print(f"Creating hexagons at resolution {hex_resolution}...")
+    Arguments:
+        grid (gdf): grid data
+        results_df (df): dataframe with results
+        how (str): merge method. E.g. 'left' or 'inner'.
 
-    union_poly = polygon_gdf.buffer(buffer_dist).to_crs("EPSG:4326").geometry.unary_union
+    Returns:
+        grid (gdf): grid gdf with results columns merged
+    """
 
-    # Find the hexagons within the shape boundary using PolyFill
-    hex_list=[]
-    for n,g in enumerate(union_poly):
-        temp = mapping(g)
-        temp['coordinates']=[[[j[1],j[0]] for j in i] for i in temp['coordinates']]  
-        hex_list.extend(h3.polyfill(temp,res=hex_resolution))
+    merge_cols = results_df.columns.to_list()
+    merge_cols.remove("grid_id")
+
+    if how == "left" and grid.grid_id.is_unique and results_df.grid_id.is_unique:
+
+        aligned = results_df.set_index("grid_id").reindex(grid.grid_id.to_numpy())
 
-    # Create hexagon data frame
-    hex_pd = pd.DataFrame(hex_list,columns=["hex_id"])
+        grid = grid.copy(deep=False)
 
-    # Create hexagon geometry and GeoDataFrame
-    hex_pd['geometry'] = [Polygon(h3.h3_to_geo_boundary(x, geo_json=True)) for x in hex_pd["hex_id"]]
+        for c in merge_cols:
+            grid[c] = aligned[c].to_numpy()
 
-    grid = gpd.GeoDataFrame(hex_pd)
+        return grid
 
-    grid.set_crs("4326",inplace=True).to_crs(crs, inplace=True)
+    # Existing columns are dropped
+    existing_cols = [c for c in merge_cols if c in grid.columns]
 
-    grid["grid_id"] = grid.hex_id
+    grid = grid.drop(columns=existing_cols).merge(results_df, on="grid_id", how=how)
 
     return grid
 
 
+def _list_columns(df):
 
-def merge_results(grid, results_df, how):
+    """
+    Helper function for finding the object columns in a dataframe with lists (e.g. the component ids of each grid cell)
+    """
+
+    list_cols = []
+
+    for c in df.columns:
+        if df[c].dtype == object and not isinstance(df[c], gpd.GeoSeries):
+            if df[c].map(lambda x: isinstance(x, (list, tuple, np.ndarray))).any():
+                list_cols.append(c)
+
+    return list_cols
+
+
+def save_grid_results(grid, fp):
 
     """
-    Merges a dataframe with analysis results with the grid gdf.
-    Checks if columns already have been merged - if they have, existing columns are dropped from the grid.
+    Save grid with results as a (geo)parquet file, with one column per result.
+    Columns with lists are saved as Parquet list columns. Empty cells in these columns (missing values or empty strings) are saved as empty lists.
 
     Arguments:
-        grid (gdf): grid data
-        results_df (df): dataframe with results
-        how (str): merge method. E.g. 'left' or 'inner'.
+        grid (gdf): grid with results. Must have a column grid_id
+        fp (str): filepath to save the grid to
 
     Returns:
-        grid (gdf): grid gdf with results columns merged
+        None
     """
 
-    merge_cols = results_df.columns.to_list()
-    merge_cols.remove("grid_id")
+    assert grid.grid_id.is_unique, "Grid ids are not unique!"
+
+    list_cols = _list_columns(grid)
+
+    if len(list_cols) > 0:
+        grid = grid.copy()
+
+    for c in list_cols:
+
+        is_list = grid[c].map(lambda x: isinstance(x, (list, tuple, np.ndarray)))
+        is_empty = grid[c].map(
+            lambda x: x is None
+            or (isinstance(x, str) and x == "")
+            or (isinstance(x, float) and np.isnan(x))
+        )
+
+        if not (is_list | is_empty).all():
+            raise ValueError(f"Column '{c}' contains both lists and other values")
+
+        grid[c] = [list(x) if l else [] for x, l in zip(grid[c], is_list)]
+
+    grid.to_parquet(fp, index=False)
+
+
+def load_grid_results(fp, columns=None, geometry=True):
+
+    """
+    Load grid with results saved with save_grid_results.
+    Only the columns needed can be loaded - grid_id and geometry are always included (geometry only if geometry is True).
+    List columns are returned as columns with lists.
+
+    Arguments:
+        fp (str): filepath of the grid results
+        columns (list): names of results columns to load. If None, all columns are loaded.
+        geometry (bool): if False, the geometries are not loaded and a dataframe is returned
+
+    Returns:
+        grid (gdf/df): grid with results
+    """
+
+    schema = pq.read_schema(fp)
+
+    if columns is None:
+        columns = [c for c in schema.names if c not in ["grid_id", "geometry"]]
 
-    for c in merge_cols:
-        if c in grid.columns:
-            grid.drop(c, axis=1, inplace=True)
-            # print('Existing column dropped!')
+    columns = ["grid_id"] + [c for c in columns if c not in ["grid_id", "geometry"]]
 
-    grid = grid.merge(results_df, on="grid_id", how=how)
+    if geometry:
+        grid = gpd.read_parquet(fp, columns=columns[:1] + ["geometry"] + columns[1:])
+    else:
+        grid = pd.read_parquet(fp, columns=columns)
+
+    for c in columns:
+        if pa.types.is_list(schema.field(c).type):
+            grid[c] = [list(x) if x is not None else None for x in grid[c]]
 
     return grid
 
@@ -102,6 +174,8 @@ def create_grid_geometry(gdf, cell_size):
 
     """
     Creates a geodataframe with grid cells covering the area specificed by the input gdf
+    Square cells are generated from the bounds of the area, and only cells intersecting the area are kept.
+    Cells on the border of the area are clipped to the area (and split into several cells if the clipped cell has several parts).
 
     Arguments:
         gdf (gdf): geodataframe with a polygon/polygons defining the study area
@@ -112,11 +186,33 @@ def create_grid_geometry(gdf, cell_size):
     """
 
     geometry = gdf["geometry"].unary_union
-    geometry_cut = ox.utils_geo._quadrat_cut_geometry(geometry, quadrat_width=cell_size)
+    west, south, east, north = geometry.bounds
+
+    x_num = max(int(np.ceil((east - west) / cell_size)), 1)
+    y_num = max(int(np.ceil((north - south) / cell_size)), 1)
+
+    # Column and row index of each cell, ordered by column
+    col, row = np.divmod(np.arange(x_num * y_num), y_num)
+
+    x_min = west + col * cell_size
+    y_min = south + row * cell_size
+
+    cells = shapely.box(x_min, y_min, x_min + cell_size, y_min + cell_size)
 
-    grid = gpd.GeoDataFrame(geometry=[geometry_cut], crs=gdf.crs)
+    # Only keep cells intersecting the area
+    tree = shapely.STRtree(cells)
+    cells = cells[np.sort(tree.query(geometry, predicate="intersects"))]
 
-    grid = grid.explode(index_parts=False, ignore_index=True)
+    # Only clip cells which are not completely within the area
+    shapely.prepare(geometry)
+    border = ~shapely.contains(geometry, cells)
+    cells[border] = shapely.intersection(cells[border], geometry)
+
+    # Clipped cells can be split in several parts or only touch the area along a line
+    cells = shapely.get_parts(cells)
+    cells = cells[(shapely.get_type_id(cells) == 3) & (shapely.area(cells) > 0)]
+
+    grid = gpd.GeoDataFrame(geometry=cells, crs=gdf.crs)
 
     # Create arbitraty grid id col
     grid["grid_id"] = grid.index
@@ -345,6 +441,81 @@ def measure_infrastructure_length(
     return infrastructure_length
 
 
+def _broadcast_values(values, n):
+
+    """
+    Small helper for turning either a dataset-wide value or a column into an object array of length n.
+
+    Arguments:
+        values (undefined): single value for all rows OR array-like/series with one value per row
+        n (int): number of rows
+
+    Returns:
+        values (np.array): object array with one value per row
+    """
+
+    if np.ndim(values) == 0:
+        return np.full(n, values, dtype=object)
+
+    values = np.asarray(values, dtype=object)
+
+    assert len(values) == n, "Number of values does not match number of geometries!"
+
+    return values
+
+
+def compute_infrastructure_length(
+    geometries, geometry_type, bidirectional, bicycle_infrastructure
+):
+
+    """
+    Measure the infrastructure length of all edges in a dataset at once.
+    Frame-level version of measure_infrastructure_length:
+    If an edge represents a bidirectional lane/path or infrastructure on both sides on a street,
+    the infrastructure is set to two times the geometric length.
+    If onesided/oneway, infrastructure length == geometric length.
+    Edges without bicycle infrastructure or with missing information get no infrastructure length (NaN).
+
+    Arguments:
+        geometries (GeoSeries/array): geometries of the edges
+        geometry_type (str/series): either a value for the whole dataset ('true_geometries' or 'centerline') OR a column with a value for each edge
+        bidirectional (bool/series): either a value for the whole dataset OR a column with True/False for each edge
+        bicycle_infrastructure (str/series): either a value for the whole dataset OR a column with 'yes'/'no' for each edge
+
+    Returns:
+        infrastructure_length (np.array): length of infrastructure for each edge
+        missing_count (int): number of edges with bicycle infrastructure but missing information on geometry type or direction
+    """
+
+    edge_length = shapely.length(np.asarray(geometries))
+    n = len(edge_length)
+
+    geometry_type = _broadcast_values(geometry_type, n)
+    bidirectional = _broadcast_values(bidirectional, n)
+    bicycle_infrastructure = _broadcast_values(bicycle_infrastructure, n)
+
+    is_bicycle = bicycle_infrastructure == "yes"
+    known_type = (geometry_type == "true_geometries") | (geometry_type == "centerline")
+
+    conditions = [
+        is_bicycle & known_type & (bidirectional == True),
+        is_bicycle & known_type & (bidirectional == False),
+    ]
+    choices = [edge_length * 2, edge_length]
+
+    infrastructure_length = np.select(conditions, choices, default=np.nan)
+
+    missing = is_bicycle & (pd.isnull(geometry_type) | pd.isnull(bidirectional))
+    missing_count = int(missing.sum())
+
+    if missing_count > 0:
+        print(
+            f"Missing information when calculating true infrastructure length for {missing_count} edges!"
+        )
+
+    return infrastructure_length, missing_count
+
+
 def analyze_existing_tags(gdf, dict):
 
     """
@@ -418,6 +589,128 @@ def analyze_existing_tags(gdf, dict):
     return results
 
 
+def existing_tags_mask(gdf, dict):
+
+    """
+    Build a boolean matrix indicating for each feature whether it has information on each attribute in a custom dictionary.
+    Uses the same dictionary format as analyze_existing_tags.
+    The not-null mask for all tag columns is computed once and reused for all attributes and geometry types.
+
+    Arguments:
+        gdf (gdf): data to be checked for missing tags
+        dict (dictionary): dictionary defining the tags to be checked.
+
+    Returns:
+        mask (df): boolean dataframe with the same index as gdf and one column per attribute
+    """
+
+    cols = gdf.columns.to_list()
+
+    tag_cols = []
+    for sub_dict in dict.values():
+        for tags in sub_dict.values():
+            tag_cols.extend([t for t in tags if t in cols and t not in tag_cols])
+
+    not_na = gdf[tag_cols].notna().to_numpy()
+    col_index = {t: i for i, t in enumerate(tag_cols)}
+
+    geom_masks = {"all": np.ones(len(gdf), dtype=bool)}
+
+    mask = {}
+
+    for attribute, sub_dict in dict.items():
+
+        attr_mask = np.zeros(len(gdf), dtype=bool)
+
+        for geom_type, tags in sub_dict.items():
+
+            idx = [col_index[t] for t in tags if t in col_index]
+
+            if len(idx) == 0:
+                continue
+
+            if geom_type not in geom_masks:
+                geom_masks[geom_type] = (gdf.bicycle_geometries == geom_type).to_numpy()
+
+            attr_mask |= geom_masks[geom_type] & not_na[:, idx].any(axis=1)
+
+        mask[attribute] = attr_mask
+
+    mask = pd.DataFrame(mask, index=gdf.index)
+
+    return mask
+
+
+def _existing_tags_values(gdf, dict):
+
+    """
+    Helper function returning the count (0/1) and length of existing tags per feature, with one count and one length column per attribute.
+    """
+
+    mask = existing_tags_mask(gdf, dict)
+    lengths = gdf.geometry.length.to_numpy()
+
+    values = {}
+    for attribute in mask.columns:
+        values[attribute + "_count"] = mask[attribute].to_numpy().astype(int)
+        values[attribute + "_length"] = np.where(mask[attribute].to_numpy(), lengths, 0.0)
+
+    return pd.DataFrame(values, index=gdf.index)
+
+
+def compute_existing_tags(gdf, dict):
+
+    """
+    Analyse the extent of existing/missing tags in a gdf with data from OSM based on custom dictionary.
+    Returns results in the same format as analyze_existing_tags, but computes all attributes in one pass.
+    For attributes with several tags, the length includes all features with at least one of the tags.
+
+    Arguments:
+        gdf (gdf): data to be checked for missing tags
+        dict (dictionary): dictionary defining the tags to be checked.
+
+    Returns:
+        results (dictionary): dictionary with the number and length of features with a given tag
+    """
+
+    totals = _existing_tags_values(gdf, dict).sum()
+
+    results = {}
+
+    for attribute in dict.keys():
+        results[attribute] = {
+            "count": int(totals[attribute + "_count"]),
+            "length": totals[attribute + "_length"],
+        }
+
+    return results
+
+
+def compute_existing_tags_grid(gdf, dict, prefix="existing_tags_"):
+
+    """
+    Compute the number and length of features with existing tags for each grid cell.
+    All attributes are computed in one pass and aggregated with a single groupby on grid_id.
+
+    Arguments:
+        gdf (gdf): data to be checked for missing tags. Each row must have a grid_id column referencing the intersecting grid cell
+        dict (dictionary): dictionary defining the tags to be checked.
+        prefix (str): prefix for the names of the results columns
+
+    Returns:
+        results_df (df): dataframe with a grid_id column and a count and length column for each attribute, which can be used with merge_results
+    """
+
+    values = _existing_tags_values(gdf, dict)
+    values["grid_id"] = gdf["grid_id"].to_numpy()
+
+    results_df = values.groupby("grid_id").sum()
+    results_df.columns = [prefix + c for c in results_df.columns]
+    results_df.reset_index(inplace=True)
+
+    return results_df
+
+
 def check_incompatible_tags(edges, incompatible_tags_dictionary, store_edge_ids=False):
 
     """
@@ -461,6 +754,103 @@ def check_incompatible_tags(edges, incompatible_tags_dictionary, store_edge_ids=
     return results
 
 
+def incompatible_tags_mask(edges, incompatible_tags_dictionary):
+
+    """
+    Build a boolean matrix indicating for each edge whether it has each of the incompatible tag combinations defined in a dictionary.
+    Uses the same dictionary format as check_incompatible_tags.
+    Combinations with the same tag and comparison column (e.g. bicycle=no and bicycle=dismount) are combined in one column.
+
+    Arguments:
+        edges (gdf): gdf with data to be analysed
+        incompatible_tags_dictionary (dict): dictionary with tag combinations to analyse
+
+    Returns:
+        mask (df): boolean dataframe with the same index as edges and one column per combination, named tag/column
+    """
+
+    cols = edges.columns.to_list()
+    mask = {}
+
+    for tag, subdict in incompatible_tags_dictionary.items():
+
+        if tag not in cols:
+            continue
+
+        for value, combinations in subdict.items():
+
+            tag_mask = (edges[tag] == value).to_numpy()
+
+            for c in combinations:
+
+                if c[0] not in cols:
+                    continue
+
+                key = tag + "/" + c[0]
+                combination_mask = tag_mask & (edges[c[0]] == c[1]).to_numpy()
+
+                if key in mask:
+                    mask[key] = mask[key] | combination_mask
+                else:
+                    mask[key] = combination_mask
+
+    mask = pd.DataFrame(mask, index=edges.index)
+
+    return mask
+
+
+def compute_incompatible_tags(
+    edges,
+    incompatible_tags_dictionary,
+    grid_edges=None,
+    store_edge_ids=False,
+    edge_id_col="edge_id",
+    prefix="incompatible_tags_",
+):
+
+    """
+    Check incompatible tags in gdf with data from OSM, for the entire data set and for each grid cell.
+    The tag combinations are only evaluated once for the edges in the data set.
+    Results for grid cells are found by looking up the edge ids of the edges joined to the grid.
+
+    Arguments:
+        edges (gdf): gdf with data to be analysed
+        incompatible_tags_dictionary (dict): dictionary with tag combinations to analyse
+        grid_edges (gdf): edges joined to the grid, with columns with grid_id and edge id. If None, no grid results are computed.
+        store_edge_ids (True/False): setting for whether to return ids of edges w. incompatible tags instead of counts
+        edge_id_col (str): name of column with unique edge id
+        prefix (str): prefix for the names of the grid results columns
+
+    Returns:
+        results (dict): dictionary with the count (or list of edge ids) of incompatible tags for each type
+        results_df (df): dataframe with a grid_id column and the count of incompatible tags for each type, which can be used with merge_results. None if grid_edges is None.
+    """
+
+    mask = incompatible_tags_mask(edges, incompatible_tags_dictionary)
+
+    results = {}
+
+    for key in mask.columns:
+        if store_edge_ids == True:
+            results[key] = list(edges[edge_id_col].loc[mask[key]])
+        else:
+            results[key] = int(mask[key].sum())
+
+    if grid_edges is None:
+        return results, None
+
+    edge_mask = mask.set_axis(edges[edge_id_col].to_numpy())
+    grid_mask = edge_mask.reindex(grid_edges[edge_id_col].to_numpy(), fill_value=False)
+    grid_mask = grid_mask.astype(int)
+    grid_mask["grid_id"] = grid_edges["grid_id"].to_numpy()
+
+    results_df = grid_mask.groupby("grid_id").sum()
+    results_df.columns = [prefix + c for c in results_df.columns]
+    results_df.reset_index(inplace=True)
+
+    return results, results_df
+
+
 def check_intersection(row, gdf, print_check=False):
 
     """
@@ -619,6 +1009,90 @@ def compute_alpha_beta_gamma(edges, nodes, G, planar=True):
     return alpha, beta, gamma
 
 
+def compute_alpha_beta_gamma_grid(
+    edges, nodes, planar=True, node_id_col="osmid", prefix=None
+):
+
+    """
+    Computes alpha, beta and gamma for each grid cell, based on edges and nodes already joined to the grid.
+    The number of components in each cell is found with one connected components search for all cells,
+    using the u and v columns of the edges. Nodes in the component search are the nodes in the cell and the end nodes of edges in the cell.
+    Cells with too few nodes for a metric to be defined get NaN for that metric.
+
+    Arguments:
+        edges (gdf): network edges with columns u, v and grid_id
+        nodes (gdf): network nodes with a column with node id and grid_id
+        planar: whether network is (approx.) planar or not
+        node_id_col (str): name of column in nodes with node id
+        prefix (str): optional prefix to add to column names
+
+    Returns:
+        abg_df (df): dataframe with columns with grid id and alpha, beta and gamma for each grid cell
+    """
+
+    # Node ids are made unique per grid cell, so that all cells can be handled in one graph
+    node_keys = pd.DataFrame(
+        {
+            "grid_id": np.concatenate(
+                [nodes.grid_id.to_numpy(), edges.grid_id.to_numpy(), edges.grid_id.to_numpy()]
+            ),
+            "node": np.concatenate(
+                [nodes[node_id_col].to_numpy(), edges.u.to_numpy(), edges.v.to_numpy()]
+            ),
+        }
+    )
+
+    codes = node_keys.groupby(["grid_id", "node"], sort=False).ngroup().to_numpy()
+
+    n = codes.max() + 1 if len(codes) > 0 else 0
+    u_codes = codes[len(nodes) : len(nodes) + len(edges)]
+    v_codes = codes[len(nodes) + len(edges) :]
+
+    adjacency = coo_matrix(
+        (np.ones(len(edges), dtype=np.int8), (u_codes, v_codes)), shape=(n, n)
+    )
+
+    _, labels = connected_components(adjacency, directed=False)
+
+    components = pd.DataFrame(
+        {"grid_id": node_keys.grid_id.to_numpy(), "component": labels[codes]}
+    )
+
+    p = components.groupby("grid_id").component.nunique()
+    e = edges.groupby("grid_id").size()
+    v = nodes.groupby("grid_id").size()
+
+    abg_df = pd.concat([e.rename("e"), v.rename("v"), p.rename("p")], axis=1)
+    abg_df = abg_df.fillna(0)
+
+    e, v, p = abg_df.e, abg_df.v, abg_df.p
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+
+        if planar:
+            abg_df["alpha"] = ((e - v + p) / (2 * v - 5)).where(v >= 3)
+            abg_df["gamma"] = (e / (3 * (v - 2))).where(v >= 3)
+
+        else:
+            abg_df["alpha"] = ((e - v) / ((v * (v - 1) / 2) - (v - 1))).where(v >= 3)
+            abg_df["gamma"] = (e / ((v * (v - 1)) / 2)).where(v >= 2)
+
+        abg_df["beta"] = (e / v).where(v > 0)
+
+    abg_df = abg_df[["alpha", "beta", "gamma"]]
+    abg_df.index.name = "grid_id"
+    abg_df.reset_index(inplace=True)
+
+    if prefix:
+        abg_df.rename(
+            {c: prefix + "_" + c for c in ["alpha", "beta", "gamma"]},
+            axis=1,
+            inplace=True,
+        )
+
+    return abg_df
+
+
 
 def compute_edge_node_ratio(data_tuple):
 
@@ -726,24 +1200,90 @@ def get_dangling_nodes(network_edges, network_nodes):
         dangling_nodes (gdf): geodataframe with all dangling nodes
     """
 
-    edges = network_edges.copy()
     nodes = network_nodes.copy()
 
-    if "u" not in edges.columns:
+    degrees = get_endpoint_degrees(network_edges)
 
-        all_node_occurences = (
-            edges.reset_index().u.to_list() + edges.reset_index().v.to_list()
-        )
+    dead_ends = pd.concat(
+        [
+            degrees.u.loc[degrees.degree_u == 1],
+            degrees.v.loc[degrees.degree_v == 1],
+        ]
+    ).to_list()
 
-    else:
+    dangling_nodes = nodes[nodes.index.isin(dead_ends)]
 
-        all_node_occurences = edges.u.to_list() + edges.v.to_list()
+    return dangling_nodes
 
-    dead_ends = [x for x in all_node_occurences if all_node_occurences.count(x) == 1]
 
-    dangling_nodes = nodes[nodes.index.isin(dead_ends)]
+def aggregate_grid_metrics(datasets):
 
-    return dangling_nodes
+    """
+    Compute metrics for each grid cell for one or more datasets already joined to the grid
+    (i.e. having a column with reference to intersecting grid cell ids).
+    Each dataset is aggregated with one groupby, and the results for all datasets are returned in one dataframe which can be merged with the grid once.
+
+    Supported metrics:
+        'count': number of features (e.g. node count for node datasets). Column: count_{label}
+        'length': geometric length of features. Column: length_{label}
+        'infrastructure_length': sum of the column infrastructure_length. Column: infrastructure_length_{label}
+        'ave_degree': average of the column degree (see _node_degrees_as_df). Column: {label}_ave_degree
+
+    Arguments:
+        datasets (list): list of tuples with joined_data (gdf), label (str) and metrics (list of str)
+
+    Returns:
+        results_df (df): dataframe with a grid_id column and one column for each metric and dataset
+    """
+
+    metric_funcs = {
+        "count": ("grid_id", "size"),
+        "length": ("_geom_length", "sum"),
+        "infrastructure_length": ("infrastructure_length", "sum"),
+        "ave_degree": ("degree", "mean"),
+    }
+
+    metric_names = {
+        "count": "count_{}",
+        "length": "length_{}",
+        "infrastructure_length": "infrastructure_length_{}",
+        "ave_degree": "{}_ave_degree",
+    }
+
+    results = []
+
+    for joined_data, label, metrics in datasets:
+
+        for m in metrics:
+            assert m in metric_funcs, f"Metric {m} is not supported!"
+
+        data = pd.DataFrame({"grid_id": joined_data["grid_id"].to_numpy()})
+
+        if "length" in metrics:
+            data["_geom_length"] = joined_data.geometry.length.to_numpy()
+
+        for m in ["infrastructure_length", "ave_degree"]:
+            if m in metrics:
+                col = metric_funcs[m][0]
+                assert col in joined_data.columns, f"Column {col} is missing for {label}!"
+                data[col] = joined_data[col].to_numpy()
+
+        named_aggs = {
+            metric_names[m].format(label): pd.NamedAgg(*metric_funcs[m])
+            for m in metrics
+        }
+
+        results.append(data.groupby("grid_id").agg(**named_aggs))
+
+    results_df = pd.concat(results, axis=1)
+
+    degree_cols = [c for c in results_df.columns if c.endswith("_ave_degree")]
+    results_df[degree_cols] = results_df[degree_cols].round(decimals=3)
+
+    results_df.index.name = "grid_id"
+    results_df.reset_index(inplace=True)
+
+    return results_df
 
 
 def count_features_in_grid(joined_data, label):
@@ -760,15 +1300,7 @@ def count_features_in_grid(joined_data, label):
         count_df (df): dataframe with the count of all features in each grid cell, indexed by grid cell id
     """
 
-    count_features_in_grid = {}
-    grouped = joined_data.groupby("grid_id")
-
-    for name, group in grouped:
-        count_features_in_grid[name] = len(group)
-
-    count_df = pd.DataFrame.from_dict(count_features_in_grid, orient="index")
-    count_df.reset_index(inplace=True)
-    count_df.rename(columns={"index": "grid_id", 0: f"count_{label}"}, inplace=True)
+    count_df = aggregate_grid_metrics([(joined_data, label, ["count"])])
 
     return count_df
 
@@ -778,6 +1310,7 @@ def length_features_in_grid(joined_data, label):
     """
     Count the length of the features in each grid cell based on a dataset already joined to the grid
     (i.e. having a column with reference to intersecting grid cell ids)
+    OBS! Returns geometric length, not infrastructure length
 
     Arguments:
         joined_data (gdf): gdf with network edges indexed by their start and end nodes
@@ -787,15 +1320,7 @@ def length_features_in_grid(joined_data, label):
         len_df (df): dataframe with the length of all features in each grid cell, indexed by grid cell id
     """
 
-    len_features_in_grid = {}
-    grouped = joined_data.groupby("grid_id")
-
-    for name, group in grouped:
-        len_features_in_grid[name] = group.geometry.length.sum()
-
-    len_df = pd.DataFrame.from_dict(len_features_in_grid, orient="index")
-    len_df.reset_index(inplace=True)
-    len_df.rename(columns={"index": "grid_id", 0: f"length_{label}"}, inplace=True)
+    len_df = aggregate_grid_metrics([(joined_data, label, ["length"])])
 
     return len_df
 
@@ -803,29 +1328,10 @@ def length_features_in_grid(joined_data, label):
 def length_of_features_in_grid(joined_data, label):
 
     """
-    Compute the length of all features of one dataset for each grid cell.
-    Assumes that the data have already been joined to the grid (all rows must have a reference to the intersecting grid cell id)
-    OBS! Returns geometric length, not infrastructure length
-
-    Arguments:
-        joined_data (gdf): gdf with network edges indexed by their start and end nodes
-        label (str): name of joined_data for naming column with feature count
-
-    Returns:
-        len_df (df): dataframe with the length of all features in each grid cell, indexed by grid cell id
+    Same as length_features_in_grid. Kept for backwards compatibility.
     """
 
-    features_in_grid_length = {}
-    grouped = joined_data.groupby("grid_id")
-
-    for name, group in grouped:
-        features_in_grid_length[name] = group.geometry.length.sum()
-
-    len_df = pd.DataFrame.from_dict(features_in_grid_length, orient="index")
-    len_df.reset_index(inplace=True)
-    len_df.rename(columns={"index": "grid_id", 0: f"length_{label}"}, inplace=True)
-
-    return len_df
+    return length_features_in_grid(joined_data, label)
 
 
 def compute_network_density(data_tuple, area, return_dangling_nodes=False):
@@ -877,21 +1383,32 @@ def compute_network_density(data_tuple, area, return_dangling_nodes=False):
         return edge_density, node_density
 
 
-def find_adjacent_components(components, edge_id, buffer_dist, crs):
+def find_adjacent_components(
+    components, edge_id, buffer_dist, crs, method="buffer"
+):
 
     """
     Find edges in different (unconnected) components that are within a specified distance from each other.
 
+    With method 'buffer', all edges are buffered and overlapping buffers from different components are found.
+    With method 'dangling_nodes', only gaps starting at a dangling node are found, by querying edges of other components
+    within the distance of each dangling node. This is much faster, and finds most gaps since real gaps usually start at a dangling node.
+
     Arguments:
         components (list): list with network components (networkx graphs)
         edge_id (str): name of column with unique edge id
         buffer_dist (numeric): max distance for which edges in different components are considered 'adjacent'
         crs (str): crs to use when computing distances between edges
+        method (str): 'buffer' or 'dangling_nodes'
 
     Returns:
-        all_results (dict): dictionary with the ids for all edge pairs identifying as overlapping based on their buffers, and the centroid of the buffer intersection
+        all_results (dict): dictionary with the ids for all edge pairs identifying as overlapping based on their buffers, and the centroid of the buffer intersection.
+            With method 'dangling_nodes', the edge pairs are the edge ending in the dangling node (left) and the nearby edge (right),
+            the geometry is the midpoint between the dangling node and the nearby edge, and the component ids of the edges are included.
     """
 
+    assert method in ["buffer", "dangling_nodes"], f"Unknown method {method}!"
+
     edge_list = []
 
     for i, c in enumerate(components):
@@ -908,6 +1425,9 @@ def find_adjacent_components(components, edge_id, buffer_dist, crs):
 
     component_edges = component_edges.set_crs(crs)
 
+    if method == "dangling_nodes":
+        return _find_dangling_node_gaps(component_edges, edge_id, buffer_dist)
+
     # Buffer component edges and find overlapping buffers
     component_edges_buffer = component_edges.copy()
     component_edges_buffer.geometry = component_edges_buffer.geometry.buffer(
@@ -959,6 +1479,76 @@ def find_adjacent_components(components, edge_id, buffer_dist, crs):
     return all_results
 
 
+def _find_dangling_node_gaps(component_edges, edge_id, buffer_dist):
+
+    """
+    Helper function for find_adjacent_components.
+    Finds edges of other components within buffer_dist of the dangling nodes in each component.
+
+    Arguments:
+        component_edges (gdf): edges of all components indexed by u, v, key, with a column with component id
+        edge_id (str): name of column with unique edge id
+        buffer_dist (numeric): max distance for which edges in different components are considered 'adjacent'
+
+    Returns:
+        all_results (dict): dictionary with the edge pairs, component pairs and gap points
+    """
+
+    degrees = get_endpoint_degrees(component_edges)
+
+    # End points of edges that end in a dangling node
+    dangling_u = degrees.degree_u.to_numpy() == 1
+    dangling_v = degrees.degree_v.to_numpy() == 1
+
+    geoms = component_edges.geometry.to_numpy()
+
+    dn_edge_pos = np.concatenate([np.flatnonzero(dangling_u), np.flatnonzero(dangling_v)])
+    dn_points = np.concatenate(
+        [
+            shapely.get_point(geoms[dangling_u], 0),
+            shapely.get_point(geoms[dangling_v], -1),
+        ]
+    )
+
+    tree = shapely.STRtree(geoms)
+    point_ix, edge_ix = tree.query(dn_points, predicate="dwithin", distance=buffer_dist)
+
+    components = component_edges.component.to_numpy()
+    left_pos = dn_edge_pos[point_ix]
+
+    other_component = components[left_pos] != components[edge_ix]
+    point_ix, left_pos, edge_ix = (
+        point_ix[other_component],
+        left_pos[other_component],
+        edge_ix[other_component],
+    )
+
+    # Midpoint between the dangling node and the closest point on the nearby edge
+    nearest = shapely.shortest_line(dn_points[point_ix], geoms[edge_ix])
+    gap_points = shapely.line_interpolate_point(nearest, 0.5, normalized=True)
+
+    gaps = pd.DataFrame(
+        {
+            edge_id + "_left": component_edges[edge_id].to_numpy()[left_pos],
+            edge_id + "_right": component_edges[edge_id].to_numpy()[edge_ix],
+            "component_left": components[left_pos],
+            "component_right": components[edge_ix],
+            "geometry": gap_points,
+        }
+    )
+
+    # Keep one result per edge pair
+    pair_key = pd.Series(
+        [frozenset(p) for p in zip(gaps[edge_id + "_left"], gaps[edge_id + "_right"])],
+        dtype=object,
+    )
+    gaps = gaps.loc[~pair_key.duplicated().to_numpy()].reset_index(drop=True)
+
+    all_results = gaps.to_dict(orient="index")
+
+    return all_results
+
+
 def assign_component_id(components, edges, edge_id_col):
 
     """
@@ -1234,6 +1824,89 @@ def find_overshoots(
         return overshoot_ix
 
 
+def get_endpoint_degrees(edges):
+
+    """
+    Return the start and end node of each edge and the number of edge ends at each of the nodes.
+    Assumes an undirected network, i.e. the degree is the number of times a node is used as u or v.
+
+    Arguments:
+        edges (gdf): network edges, either with columns u and v or indexed by u, v, key
+
+    Returns:
+        degrees (df): dataframe with the same index as edges and the columns u, v, degree_u and degree_v
+    """
+
+    if "u" in edges.columns:
+        u = edges.u.to_numpy()
+        v = edges.v.to_numpy()
+
+    else:
+        u = edges.index.get_level_values("u").to_numpy()
+        v = edges.index.get_level_values("v").to_numpy()
+
+    _, inverse, counts = np.unique(
+        np.concatenate([u, v]), return_inverse=True, return_counts=True
+    )
+
+    degrees = pd.DataFrame(
+        {
+            "u": u,
+            "v": v,
+            "degree_u": counts[inverse[: len(u)]],
+            "degree_v": counts[inverse[len(u) :]],
+        },
+        index=edges.index,
+    )
+
+    return degrees
+
+
+def find_overshoots_sweep(edges, length_tolerances, endpoint_degrees=None):
+
+    """
+    Find overshoots in a network for several tolerances at once.
+    Overshoots are edges with exactly one dangling (degree one) end node and a length below the tolerance.
+    The candidate edges are sorted by length once, and the overshoots for each tolerance are found by a binary search.
+
+    Arguments:
+        edges (gdf): gdf with network edges
+        length_tolerances (list): thresholds for when an edge is considered an overshoot
+        endpoint_degrees (df): output of get_endpoint_degrees for edges. Computed if not provided.
+
+    Returns:
+        sweep (df): dataframe indexed by length tolerance, with the count of overshoots and a list with the index values of the overshoot edges
+    """
+
+    if endpoint_degrees is None:
+        endpoint_degrees = get_endpoint_degrees(edges)
+
+    dangling_u = endpoint_degrees.degree_u.to_numpy() == 1
+    dangling_v = endpoint_degrees.degree_v.to_numpy() == 1
+
+    # Edges with one dangling node - edges where both nodes are dangling are isolated edges, not overshoots
+    candidates = np.flatnonzero(dangling_u ^ dangling_v)
+
+    lengths = shapely.length(edges.geometry.to_numpy()[candidates])
+    order = np.argsort(lengths, kind="stable")
+
+    sorted_lengths = lengths[order]
+    sorted_ix = edges.index[candidates[order]]
+
+    length_tolerances = np.unique(length_tolerances)
+    counts = np.searchsorted(sorted_lengths, length_tolerances, side="right")
+
+    sweep = pd.DataFrame(
+        {
+            "count": counts,
+            "edge_ix": [sorted_ix[:c].to_list() for c in counts],
+        },
+        index=pd.Index(length_tolerances, name="length_tolerance"),
+    )
+
+    return sweep
+
+
 def find_undershoots(
     dangling_nodes, edges, length_tolerance, edge_id_col, return_undershoot_nodes=True
 ):
@@ -2,12 +2,17 @@
 The functions defined below are used for creating creating and modifying networkx graphs using the osmnx format for indexing edges and nodes
 """
 
+import os
+import json
+import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.ops import linemerge
-from shapely.geometry import LineString
-import momepy
+import shapely
+import networkx as nx
 import osmnx as ox
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from src import parquet_functions as pqf
 
 
 def clean_col_names(df):
@@ -48,38 +53,39 @@ def unzip_linestrings(org_gdf, edge_id_col):
         new_gdf (gdf): gdf with smallest possible linestring, with the same attributes as the original
     """
 
-    gdf = org_gdf.copy()
+    geoms = org_gdf.geometry.to_numpy().copy()
+    multi = shapely.get_type_id(geoms) == 5  # MultiLineString
+    geoms[multi] = shapely.line_merge(geoms[multi])
 
-    gdf["geometry"] = gdf["geometry"].apply(
-        lambda x: linemerge(x) if x.geom_type == "MultiLineString" else x
+    # Multilines that cannot be merged due to gaps are split into their parts, so no segments are created across gaps
+    parts, row_index = shapely.get_parts(geoms, return_index=True)
+    coords, part_index = shapely.get_coordinates(
+        parts, include_z=shapely.has_z(parts).any(), return_index=True
     )
 
-    # helper column: list of points
-    gdf["points"] = gdf.apply(lambda x: [c for c in x.geometry.coords], axis=1)
-    gdf["edges"] = gdf.apply(
-        lambda x: [LineString(e) for e in zip(x.points, x.points[1:])], axis=1
-    )
-    edgelist = [item for sublist in gdf["edges"] for item in sublist]
-
-    gdf[edge_id_col] = gdf.apply(lambda x: len(x.edges) * [x[edge_id_col]], axis=1)
+    # Each coordinate followed by a coordinate on the same line is the start of a segment
+    starts = np.flatnonzero(part_index[1:] == part_index[:-1])
+    segments = shapely.linestrings(np.stack([coords[starts], coords[starts + 1]], axis=1))
+    rows = row_index[part_index[starts]]
 
-    edgeid_list = [item for sublist in gdf[edge_id_col] for item in sublist]
+    attributes = pd.DataFrame(org_gdf.drop(columns=org_gdf.geometry.name))
+    attributes = attributes.take(rows).reset_index(drop=True)
 
-    new_gdf = gpd.GeoDataFrame(
-        {"geometry": edgelist, edge_id_col: edgeid_list}, crs=org_gdf.crs
+    new_gdf = pd.DataFrame(
+        {"geometry": segments, edge_id_col: attributes.pop(edge_id_col)}
     )
 
     new_gdf["new_edge_id"] = new_gdf.index  # Create random but unique edge id!
     assert len(new_gdf) == len(new_gdf.new_edge_id.unique())
 
-    new_gdf = new_gdf.merge(
-        org_gdf.drop("geometry", axis=1), how="left", on=edge_id_col
+    new_gdf = gpd.GeoDataFrame(
+        pd.concat([new_gdf, attributes], axis=1), geometry="geometry", crs=org_gdf.crs
     )
 
     return new_gdf
 
 
-def create_osmnx_graph(gdf):
+def create_osmnx_graph(gdf, snap_tolerance=None):
 
     """
     Function for  converting a geodataframe with LineStrings to a NetworkX graph object (MultiDiGraph), which follows the data structure required by OSMnx.
@@ -89,42 +95,108 @@ def create_osmnx_graph(gdf):
     OBS! Current version does not fix issues with topology.
 
     Arguments:
-        gdf (gdf): The data to be converted to a graph format
-        directed (bool): Whether the resulting graph should be directed or not. Directionality is based on the order of the coordinates.
+        gdf (gdf): The data to be converted to a graph format. Directionality is based on the order of the coordinates.
+        snap_tolerance (numeric): end points within this distance of each other are joined in the same node (see create_osmnx_gdfs)
 
     Returns:
         G_ox (NetworkX MultiDiGraph object): The original data in a NetworkX graph format
     """
 
-    gdf["geometry"] = gdf["geometry"].apply(
-        lambda x: linemerge(x) if x.geom_type == "MultiLineString" else x
-    )
+    nodes, edges = create_osmnx_gdfs(gdf, snap_tolerance=snap_tolerance)
 
-    # If Multilines cannot be merged do to gaps, use explode
-    geom_types = gdf.geom_type.to_list()
-    # unique_geom_types = set(geom_types)
+    G_ox = ox.graph_from_gdfs(nodes, edges)
+
+    return G_ox
+
+
+def create_osmnx_gdfs(gdf, snap_tolerance=None):
+
+    """
+    Function for converting a geodataframe with LineStrings to node and edge geodataframes in the format used by OSMnx,
+    without building a NetworkX graph. The result can be converted to a graph with ox.graph_from_gdfs.
+    Nodes are created for all unique start and end coordinates of the lines. Node ids and the order of nodes and edges are the same
+    as when converting the data with momepy.gdf_to_nx and momepy.nx_to_gdf.
+
+    Arguments:
+        gdf (gdf): The data to be converted. Directionality is based on the order of the coordinates.
+        snap_tolerance (numeric): if not None, end points within this distance of each other are joined in the same node.
+            End points are also joined if they are connected through other end points within the distance.
+            The node gets the coordinates of the first end point.
+
+    Returns:
+        nodes (gdf): nodes indexed by osmid, with the columns nodeID, geometry, x and y
+        edges (gdf): edges multiindexed by u, v, key with all columns from gdf and a column with length
+    """
 
-    if "MultiLineString" in geom_types:
-        gdf = gdf.explode(index_parts=False)
+    edges = gdf.copy()
+    if "key" in edges.columns:
+        edges.rename(columns={"key": "__key"}, inplace=True)
 
-    G = momepy.gdf_to_nx(gdf, approach="primal", directed=True)
+    geoms = edges.geometry.to_numpy().copy()
+    multi = shapely.get_type_id(geoms) == 5  # MultiLineString
+    geoms[multi] = shapely.line_merge(geoms[multi])
+    edges["geometry"] = gpd.GeoSeries(geoms, index=edges.index, crs=edges.crs)
 
-    nodes, edges = momepy.nx_to_gdf(G)
+    # If Multilines cannot be merged do to gaps, use explode
+    if "MultiLineString" in edges.geom_type.unique():
+        edges = edges.explode(index_parts=False)
 
-    # Create columns and index as required by OSMnx
-    # index_length = len(str(nodes['nodeID'].iloc[-1].item()))
-    nodes["osmid"] = nodes[
-        "nodeID"
-    ]  # .apply(lambda x: create_node_index(x, index_length))
+    edges.reset_index(drop=True, inplace=True)
+    edges["mm_len"] = edges.geometry.length
 
-    # Create x y coordinate columns
+    # First and last coordinate of each line, in the order the nodes are first found
+    coords, line_index = shapely.get_coordinates(
+        edges.geometry.to_numpy(), return_index=True
+    )
+    is_first = np.r_[True, line_index[1:] != line_index[:-1]]
+    is_last = np.r_[line_index[1:] != line_index[:-1], True]
+    end_points = np.empty((2 * len(edges), 2))
+    end_points[0::2] = coords[is_first]
+    end_points[1::2] = coords[is_last]
+
+    node_ids, _ = pd.factorize(end_points[:, 0] + 1j * end_points[:, 1])
+
+    if snap_tolerance is not None:
+        # Join unique end points within snap_tolerance of each other (directly or through other end points)
+        unique_points = shapely.points(
+            end_points[np.unique(node_ids, return_index=True)[1]]
+        )
+        pairs = shapely.STRtree(unique_points).query(
+            unique_points, predicate="dwithin", distance=snap_tolerance
+        )
+        adjacency = coo_matrix(
+            (np.ones(pairs.shape[1]), (pairs[0], pairs[1])),
+            shape=(len(unique_points), len(unique_points)),
+        )
+        _, labels = connected_components(adjacency, directed=False)
+        node_ids, _ = pd.factorize(labels[node_ids])
+
+    first_occurrence = np.unique(node_ids, return_index=True)[1]
+
+    nodes = gpd.GeoDataFrame(
+        {"nodeID": np.arange(len(first_occurrence))},
+        geometry=gpd.points_from_xy(
+            end_points[first_occurrence, 0], end_points[first_occurrence, 1]
+        ),
+        crs=gdf.crs,
+    )
     nodes["x"] = nodes.geometry.x
     nodes["y"] = nodes.geometry.y
+    nodes.index.rename("osmid", inplace=True)
+
+    edges["node_start"] = node_ids[0::2]
+    edges["node_end"] = node_ids[1::2]
 
-    edges["u"] = nodes["osmid"].loc[edges.node_start].values
-    edges["v"] = nodes["osmid"].loc[edges.node_end].values
+    # Order edges by start node and then by the first edge to the same end node, like edges in a NetworkX MultiDiGraph
+    pair_order, _ = pd.factorize(
+        edges.node_start.to_numpy() * len(nodes) + edges.node_end.to_numpy()
+    )
+    edges = edges.iloc[
+        np.lexsort((np.arange(len(edges)), pair_order, edges.node_start.to_numpy()))
+    ].reset_index(drop=True)
 
-    nodes.set_index("osmid", inplace=True)
+    edges["u"] = edges.node_start
+    edges["v"] = edges.node_end
 
     edges["length"] = edges.geometry.length  # Length is required by some functions
 
@@ -135,42 +207,32 @@ def create_osmnx_graph(gdf):
     # Create multiindex in u v key format
     edges = edges.set_index(["u", "v", "key"])
 
-    # For ox simplification to work, edge geometries must be dropped. Edge geometries is defined by their start and end node
-    # edges.drop(['geometry'], axis=1, inplace=True) # Not required by new simplification function
-
-    G_ox = ox.graph_from_gdfs(nodes, edges)
-
-    return G_ox
+    return nodes, edges
 
 
-def find_parallel_edges(edges):
+def find_parallel_edges(edges, directed=True):
 
     """
     Check for parallel edges in a pandas DataFrame with edges, including columns u with start node index and v with end node index.
-    If two edges have the same u-v pair, the column 'key' is updated to ensure that the u-v-key combination can uniquely identify an edge.
-    Note that (u,v) is not considered parallel to (v,u)
+    The column 'key' is updated to ensure that the u-v-key combination can uniquely identify an edge:
+    edges with the same node pair are numbered 0, 1, 2... in the order they appear in edges.
+    Note that (u,v) is not considered parallel to (v,u), unless directed is False
 
     Arguments:
         edges (gdf): network edges
+        directed (bool): if False, (u,v) and (v,u) are considered the same node pair (keys are unique for each undirected edge)
 
     Returns:
         edges (gdf): edges with updated key index
     """
 
-    # Find edges with duplicate node pairs
-    parallel = edges[edges.duplicated(subset=["u", "v"])]
-
-    edges.loc[parallel.index, "key"] = 1  # Set keys to 1
+    u = edges["u"].to_numpy()
+    v = edges["v"].to_numpy()
 
-    k = 1
+    if not directed:
+        u, v = np.minimum(u, v), np.maximum(u, v)
 
-    while len(edges[edges.duplicated(subset=["u", "v", "key"])]) > 0:
-
-        k += 1
-
-        parallel = edges[edges.duplicated(subset=["u", "v", "key"])]
-
-        edges.loc[parallel.index, "key"] = k  # Set keys to 1
+    edges["key"] = pd.Series(u).groupby([u, v], sort=False).cumcount().to_numpy()
 
     assert (
         len(edges[edges.duplicated(subset=["u", "v", "key"])]) == 0
@@ -198,3 +260,213 @@ def create_node_index(x, index_length):
     assert len(x) == index_length
 
     return x
+
+
+def _to_json(value):
+
+    """
+    Helper function for encoding attribute values that cannot be stored in a typed Parquet column (lists, mixed types etc.)
+    """
+
+    if not isinstance(value, (list, tuple, set, dict)) and pd.isna(value):
+        return None
+
+    return json.dumps(
+        value, default=lambda x: x.tolist() if hasattr(x, "tolist") else list(x)
+    )
+
+
+def _from_json(value):
+
+    """
+    Helper function for decoding values encoded with _to_json
+    """
+
+    return json.loads(value) if value is not None else None
+
+
+def _typed_table(df):
+
+    """
+    Helper function for converting a table with node or edge attributes (with dtype object) to typed columns.
+    Integer and boolean columns with missing values are stored with the pandas nullable dtypes.
+    Columns with lists or mixed types are encoded as JSON strings.
+    Returns the converted table and a list with the names of the JSON encoded columns.
+    """
+
+    json_cols = []
+
+    for col in df.columns:
+
+        if col == "geometry":
+            continue
+
+        values = df[col]
+        kind = pd.api.types.infer_dtype(values, skipna=True)
+        has_na = values.isna().any()
+
+        if kind == "integer":
+            df[col] = values.astype("Int64" if has_na else "int64")
+        elif kind in ["floating", "mixed-integer-float"]:
+            df[col] = values.astype("float64")
+        elif kind == "boolean":
+            df[col] = values.astype("boolean" if has_na else "bool")
+        elif kind not in ["string", "empty"]:
+            df[col] = values.map(_to_json)
+            json_cols.append(col)
+
+    return df, json_cols
+
+
+def _write_table(df, fp, crs):
+
+    """
+    Helper function for writing a node or edge table to Parquet, as GeoParquet if the table has a geometry column
+    """
+
+    if "geometry" in df.columns:
+        df = gpd.GeoDataFrame(df, geometry="geometry", crs=crs)
+
+    df.to_parquet(fp, index=True)
+
+
+def save_graph_parquet(G, fp):
+
+    """
+    Save a NetworkX graph in the OSMnx format as typed Parquet tables with nodes and edges, and a json file with the graph attributes.
+    Much faster to load than GraphML, since values are stored with their data types and do not have to be parsed from strings.
+
+    Arguments:
+        G (NetworkX MultiDiGraph): graph to be saved
+        fp (str): path to the directory the graph is saved in. The directory is created if it does not exist.
+
+    Returns:
+        None
+    """
+
+    os.makedirs(fp, exist_ok=True)
+
+    crs = G.graph.get("crs", None)
+
+    node_ids, node_data = zip(*G.nodes(data=True)) if len(G) else ((), ())
+    nodes = pd.DataFrame(
+        list(node_data), index=pd.Index(list(node_ids), name="osmid"), dtype=object
+    )
+
+    edge_data = list(G.edges(keys=True, data=True))
+    edges = pd.DataFrame(
+        [d for _, _, _, d in edge_data],
+        index=pd.MultiIndex.from_tuples(
+            [(u, v, k) for u, v, k, _ in edge_data], names=["u", "v", "key"]
+        ),
+        dtype=object,
+    )
+
+    nodes, node_json_cols = _typed_table(nodes)
+    edges, edge_json_cols = _typed_table(edges)
+
+    _write_table(nodes, os.path.join(fp, "nodes.parquet"), crs)
+    _write_table(edges, os.path.join(fp, "edges.parquet"), crs)
+
+    meta = {
+        "graph": G.graph,
+        "directed": G.is_directed(),
+        "json_columns": {"nodes": node_json_cols, "edges": edge_json_cols},
+    }
+
+    with open(os.path.join(fp, "graph.json"), "w") as f:
+        json.dump(meta, f, default=str)
+
+
+def _load_tables(fp, node_columns=None, edge_columns=None):
+
+    """
+    Helper function for loading the node and edge tables and the metadata of a graph saved with save_graph_parquet
+    """
+
+    with open(os.path.join(fp, "graph.json"), "r") as f:
+        meta = json.load(f)
+
+    nodes = pqf.read_parquet(os.path.join(fp, "nodes.parquet"), node_columns)
+    edges = pqf.read_parquet(os.path.join(fp, "edges.parquet"), edge_columns)
+
+    for df, name in zip([nodes, edges], ["nodes", "edges"]):
+        for col in meta["json_columns"][name]:
+            if col in df.columns:
+                df[col] = df[col].map(_from_json)
+
+    return nodes, edges, meta
+
+
+def load_graph_tables(fp, node_columns=None, edge_columns=None):
+
+    """
+    Load the node and edge tables of a graph saved with save_graph_parquet, without building a NetworkX graph.
+    Nodes are indexed by osmid and get a point geometry based on x and y, edges are multiindexed by u, v, key like in ox.graph_to_gdfs.
+
+    Arguments:
+        fp (str): path to the directory the graph is saved in
+        node_columns (list): names of node attributes to load. All attributes are loaded if None.
+        edge_columns (list): names of edge attributes to load. All attributes are loaded if None.
+
+    Returns:
+        nodes (gdf/df): nodes, as gdf if x and y are loaded
+        edges (gdf/df): edges, as gdf if the edge geometries are loaded
+        graph_attrs (dict): graph attributes
+    """
+
+    nodes, edges, meta = _load_tables(fp, node_columns, edge_columns)
+
+    graph_attrs = meta["graph"]
+
+    if {"x", "y"}.issubset(nodes.columns) and "geometry" not in nodes.columns:
+        nodes = gpd.GeoDataFrame(
+            nodes,
+            geometry=gpd.points_from_xy(nodes.x, nodes.y),
+            crs=graph_attrs.get("crs", None),
+        )
+
+    return nodes, edges, graph_attrs
+
+
+def _attribute_dicts(df):
+
+    """
+    Helper function for creating a dictionary with the non-null attributes of each row in a node or edge table
+    """
+
+    cols = df.columns.to_list()
+
+    # Lists are never null, so the null mask can be computed for all columns at once
+    not_null = df.notna().to_numpy()
+
+    for values, keep in zip(df.to_numpy(dtype=object), not_null):
+        yield {c: val for c, val, k in zip(cols, values, keep) if k}
+
+
+def load_graph_parquet(fp):
+
+    """
+    Load a graph saved with save_graph_parquet.
+    Nodes, edges and attributes are added in the same order as in the saved graph. Missing attribute values are not added.
+
+    Arguments:
+        fp (str): path to the directory the graph is saved in
+
+    Returns:
+        G (NetworkX MultiDiGraph object): the saved graph
+    """
+
+    nodes, edges, meta = _load_tables(fp)
+
+    if meta["directed"]:
+        G = nx.MultiDiGraph(**meta["graph"])
+    else:
+        G = nx.MultiGraph(**meta["graph"])
+
+    G.add_nodes_from(zip(nodes.index, _attribute_dicts(nodes)))
+    G.add_edges_from(
+        (u, v, k, d) for (u, v, k), d in zip(edges.index, _attribute_dicts(edges))
+    )
+
+    return G
@@ -0,0 +1,250 @@
+"""
+The functions defined below are used for creating H3 hexagonal grids and for assigning network elements to H3 grid cells
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from shapely.geometry import mapping
+import h3
+
+with warnings.catch_warnings():
+    # The vectorized functions in h3-py 3.x are only available in the unstable module
+    warnings.simplefilter("ignore")
+    from h3.unstable import vect as h3_vect
+
+
+def create_h3_grid(polygon_gdf, hex_resolution, crs, buffer_dist):
+
+    """
+    Create a grid with H3 hexagons covering a (buffered) study area.
+    The grid_id of each cell is the H3 index of the hexagon.
+
+    Arguments:
+        polygon_gdf (gdf): gdf with polygon(s) defining the study area
+        hex_resolution (int): H3 resolution of the hexagons
+        crs (str): crs of the returned grid
+        buffer_dist (numeric): distance to buffer the study area with, in units of polygon_gdf crs
+
+    Returns:
+        grid (gdf): grid with hexagons, with the columns hex_id and grid_id
+    """
+
+    print(f"Creating hexagons at resolution {hex_resolution}...")
+
+    union_poly = polygon_gdf.buffer(buffer_dist).to_crs("EPSG:4326").unary_union
+
+    # Find the hexagons within each polygon of the study area
+    hex_ids = set()
+    for g in shapely.get_parts(union_poly):
+        hex_ids.update(
+            h3.polyfill(mapping(g), hex_resolution, geo_json_conformant=True)
+        )
+
+    hex_ids = sorted(hex_ids)
+
+    grid = gpd.GeoDataFrame(
+        {"hex_id": hex_ids},
+        geometry=h3_polygons(hex_ids),
+        crs="EPSG:4326",
+    )
+
+    grid.to_crs(crs, inplace=True)
+
+    grid["grid_id"] = grid.hex_id
+
+    return grid
+
+
+def h3_polygons(hex_ids):
+
+    """
+    Create polygons for a list of H3 indices.
+    All rings are built in one call, which also handles pentagons.
+
+    Arguments:
+        hex_ids (list): H3 indices as strings
+
+    Returns:
+        polygons (array): array with shapely polygons in EPSG:4326
+    """
+
+    boundaries = [h3.h3_to_geo_boundary(h, geo_json=True) for h in hex_ids]
+
+    ring_sizes = np.fromiter((len(b) for b in boundaries), dtype=int, count=len(boundaries))
+    coords = np.array([c for b in boundaries for c in b], dtype=float).reshape(-1, 2)
+
+    rings = shapely.linearrings(
+        coords, indices=np.repeat(np.arange(len(boundaries)), ring_sizes)
+    )
+
+    polygons = shapely.polygons(rings)
+
+    return polygons
+
+
+def points_to_h3(points, hex_resolution):
+
+    """
+    Find the H3 index of the cell containing each point.
+
+    Arguments:
+        points (GeoSeries): point geometries with a defined crs
+        hex_resolution (int): H3 resolution
+
+    Returns:
+        hex_ids (array): H3 indices as strings
+    """
+
+    points = points.to_crs("EPSG:4326")
+
+    hex_ints = h3_vect.geo_to_h3(
+        points.y.to_numpy(), points.x.to_numpy(), hex_resolution
+    )
+
+    hex_ids = np.char.mod("%x", hex_ints.astype(np.uint64))
+
+    return hex_ids.astype(object)
+
+
+def assign_nodes_to_h3(nodes, hex_resolution):
+
+    """
+    Assign nodes to H3 grid cells, without a spatial join with the grid.
+
+    Arguments:
+        nodes (gdf): network nodes
+        hex_resolution (int): H3 resolution of the grid
+
+    Returns:
+        nodes_joined (gdf): copy of nodes with a column with grid_id
+    """
+
+    nodes_joined = nodes.copy()
+
+    nodes_joined["grid_id"] = points_to_h3(nodes_joined.geometry, hex_resolution)
+
+    return nodes_joined
+
+
+def assign_edges_to_h3(edges, hex_resolution, sample_dist=None):
+
+    """
+    Assign edges to H3 grid cells by sampling points along each edge.
+    The length of each edge in each cell is estimated from the share of the sampled points in the cell.
+
+    Arguments:
+        edges (gdf): network edges in a projected crs
+        hex_resolution (int): H3 resolution of the grid
+        sample_dist (numeric): distance between sampled points. Defaults to a quarter of the hexagon edge length.
+
+    Returns:
+        edges_cells (df): dataframe with one row per edge and cell, with the columns edge_index (index of edges), grid_id and cell_length
+    """
+
+    if sample_dist is None:
+        sample_dist = h3.edge_length(hex_resolution, unit="m") / 4
+
+    geoms = edges.geometry.to_numpy()
+    lengths = shapely.length(geoms)
+
+    # Sample points at sample_dist intervals, including both end points
+    n_samples = np.ceil(lengths / sample_dist).astype(int) + 1
+    edge_pos = np.repeat(np.arange(len(edges)), n_samples)
+    sample_no = np.arange(len(edge_pos)) - np.repeat(
+        np.cumsum(n_samples) - n_samples, n_samples
+    )
+    fractions = sample_no / np.maximum(n_samples[edge_pos] - 1, 1)
+
+    points = shapely.line_interpolate_point(
+        geoms[edge_pos], fractions, normalized=True
+    )
+
+    samples = pd.DataFrame(
+        {
+            "edge_pos": edge_pos,
+            "grid_id": points_to_h3(
+                gpd.GeoSeries(points, crs=edges.crs), hex_resolution
+            ),
+        }
+    )
+
+    edges_cells = samples.groupby(["edge_pos", "grid_id"]).size().reset_index(name="n")
+
+    edges_cells["cell_length"] = (
+        lengths[edges_cells.edge_pos] * edges_cells.n / n_samples[edges_cells.edge_pos]
+    )
+
+    edges_cells["edge_index"] = edges.index.to_numpy()[edges_cells.edge_pos]
+
+    return edges_cells[["edge_index", "grid_id", "cell_length"]]
+
+
+def h3_to_parents(hex_ids, parent_resolution):
+
+    """
+    Find the parent cell at a coarser resolution for a list of H3 indices.
+
+    Arguments:
+        hex_ids (list/array): H3 indices as strings
+        parent_resolution (int): H3 resolution of the parent cells
+
+    Returns:
+        parent_ids (array): H3 indices of the parent cells as strings
+    """
+
+    hex_ints = np.fromiter(
+        (int(h, 16) for h in hex_ids), dtype=np.uint64, count=len(hex_ids)
+    )
+
+    parent_ints = h3_vect.h3_to_parent(hex_ints, parent_resolution)
+
+    parent_ids = np.char.mod("%x", parent_ints.astype(np.uint64))
+
+    return parent_ids.astype(object)
+
+
+def rollup_grid_results(grid, parent_resolution, sum_cols, ratio_cols=None):
+
+    """
+    Aggregate grid results computed for a fine H3 resolution to a coarser resolution.
+    Additive results (counts, lengths etc.) are summed for all child cells of each parent cell.
+    Non-additive results (densities, percentages etc.) are recomputed from the summed numerators and denominators.
+    Note that H3 cells are not exactly contained in their parent cells, so the parent cell polygons and the child cells do not match completely.
+
+    Arguments:
+        grid (df/gdf): grid with H3 indices as grid_id and columns with results
+        parent_resolution (int): H3 resolution to aggregate the results to
+        sum_cols (list): names of columns with additive results
+        ratio_cols (dict): dictionary with names of non-additive columns as keys and tuples with (numerator column, denominator column, multiplier) as values.
+            The numerator and denominator columns must be in sum_cols.
+
+    Returns:
+        parent_grid (gdf): grid with parent cells and the aggregated results. The grid has the same crs as grid, if grid is a gdf.
+    """
+
+    parents = pd.DataFrame(grid[sum_cols]).reset_index(drop=True)
+    parents["grid_id"] = h3_to_parents(grid.grid_id.to_numpy(), parent_resolution)
+
+    parents = parents.groupby("grid_id").sum(min_count=1)
+
+    if ratio_cols is not None:
+        for col, (numerator, denominator, multiplier) in ratio_cols.items():
+            assert numerator in sum_cols and denominator in sum_cols
+            parents[col] = parents[numerator] / parents[denominator] * multiplier
+
+    parents.reset_index(inplace=True)
+
+    crs = grid.crs if isinstance(grid, gpd.GeoDataFrame) else "EPSG:4326"
+
+    parent_grid = gpd.GeoDataFrame(
+        parents,
+        geometry=h3_polygons(parents.grid_id.to_list()),
+        crs="EPSG:4326",
+    ).to_crs(crs)
+
+    parent_grid.insert(0, "hex_id", parent_grid.grid_id)
+
+    return parent_grid
@@ -0,0 +1,211 @@
+"""
+The functions and classes defined below are used for loading the processed data (Parquet files and graphs) used by the notebooks
+"""
+
+import os
+import pandas as pd
+import geopandas as gpd
+import shapely
+import pyarrow.parquet as pq
+import networkx as nx
+from src import graph_functions as gf
+from src import parquet_functions as pqf
+
+
+def memory_usage(data):
+
+    """
+    Estimate the memory used by a dataframe or graph.
+    For geometry columns the memory used by the coordinates is included.
+    For graphs the memory is estimated from tables with the node and edge attributes.
+    The dictionaries NetworkX stores the attributes in use more memory than this, so the estimate is a lower bound.
+
+    Arguments:
+        data (gdf/df/NetworkX graph): data to find the memory usage of
+
+    Returns:
+        mem (int): memory usage in bytes. None if the memory usage cannot be estimated.
+    """
+
+    if isinstance(data, nx.Graph):
+
+        nodes = pd.DataFrame([d for _, d in data.nodes(data=True)])
+        edges = pd.DataFrame([d for _, _, d in data.edges(data=True)])
+
+        for table in [nodes, edges]:
+            if "geometry" in table.columns:
+                table["geometry"] = gpd.GeoSeries(table["geometry"])
+
+        return memory_usage(nodes) + memory_usage(edges)
+
+    if not isinstance(data, pd.DataFrame):
+        return None
+
+    mem = data.memory_usage(deep=True).sum()
+
+    for col in data.columns:
+        if isinstance(data[col].dtype, gpd.array.GeometryDtype):
+            mem += shapely.get_num_coordinates(data[col].to_numpy()).sum() * 8 * 2
+
+    return int(mem)
+
+
+class DataLoader:
+
+    """
+    Lazy loader for the processed data used by the notebooks.
+    Datasets are only read from disk the first time they are used, and are then kept in memory.
+    Datasets can be read with a subset of the columns, in which case only these columns are read from disk.
+
+    Arguments:
+        datasets (dict): dictionary with dataset names as keys and file paths as values.
+            Paths to directories are loaded as graphs saved with graph_functions.save_graph_parquet, other paths as Parquet files.
+        index_cols (dict): dictionary with dataset names as keys and the name of the column to use as index as values
+        bbox (tuple/shapely geometry/gdf): if not None, only data intersecting bbox is read from datasets with geometries (see parquet_functions.read_parquet).
+            Not used for graphs.
+
+    Example:
+        osm_loader = DataLoader({"edges_simplified": osm_edges_simplified_fp}, index_cols={"nodes": "osmid"})
+        osm_loader.edges_simplified  # All columns
+        osm_loader.load("edges_simplified", columns=["edge_id", "geometry"])  # Only edge_id and geometry
+        osm_loader.report()
+    """
+
+    def __init__(self, datasets, index_cols=None, bbox=None):
+
+        self.datasets = dict(datasets)
+        self.index_cols = dict(index_cols) if index_cols is not None else {}
+        self.bbox = bbox
+        self._cache = {}
+
+    def __getattr__(self, name):
+
+        # Only called if name is not a normal attribute
+        if name.startswith("_") or name not in self.__dict__.get("datasets", {}):
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+
+        return self.load(name)
+
+    def __dir__(self):
+
+        return list(super().__dir__()) + list(self.datasets.keys())
+
+    def load(self, name, columns=None):
+
+        """
+        Load a dataset, or return it from memory if it has already been loaded.
+
+        Arguments:
+            name (str): name of dataset
+            columns (list): names of columns to read. All columns are read if None. Not used for graphs.
+
+        Returns:
+            data (gdf/df/NetworkX MultiDiGraph): the dataset
+        """
+
+        if name not in self.datasets:
+            raise KeyError(f"Unknown dataset '{name}'")
+
+        fp = self.datasets[name]
+
+        if os.path.isdir(fp):
+
+            if columns is not None:
+                raise ValueError(
+                    f"Columns cannot be selected for the graph '{name}', use graph_functions.load_graph_tables instead"
+                )
+
+            if (name, None) not in self._cache:
+                self._cache[(name, None)] = gf.load_graph_parquet(fp)
+
+            return self._cache[(name, None)]
+
+        key = (name, tuple(columns) if columns is not None else None)
+
+        if key in self._cache:
+            return self._cache[key]
+
+        index_col = self.index_cols.get(name, None)
+
+        if columns is not None:
+
+            missing_cols = [c for c in columns if c not in pq.read_schema(fp).names]
+
+            if len(missing_cols) > 0:
+                raise ValueError(f"Columns {missing_cols} not found in dataset '{name}'")
+
+            data_cols = [c for c in columns if c != index_col]
+
+            if (name, None) in self._cache and set(data_cols).issubset(
+                self._cache[(name, None)].columns
+            ):
+                # All columns are already in memory
+                return self._cache[(name, None)][data_cols]
+
+        read_columns = columns
+        if columns is not None and index_col is not None and index_col not in columns:
+            read_columns = list(columns) + [index_col]
+
+        bbox = None
+        if self.bbox is not None and b"geo" in (pq.read_schema(fp).metadata or {}):
+            bbox = self.bbox
+
+        data = pqf.read_parquet(fp, columns=read_columns, bbox=bbox)
+
+        if index_col is not None and index_col in data.columns:
+            data.set_index(index_col, inplace=True)
+
+        self._cache[key] = data
+
+        return data
+
+    def unload(self, name=None):
+
+        """
+        Remove a dataset from memory, or all datasets if name is None.
+
+        Arguments:
+            name (str): name of dataset
+
+        Returns:
+            None
+        """
+
+        self._cache = {
+            k: v for k, v in self._cache.items() if name is not None and k[0] != name
+        }
+
+    def report(self):
+
+        """
+        Create a summary of the datasets currently in memory.
+
+        Arguments:
+            None
+
+        Returns:
+            report (df): dataframe with dataset name, loaded columns, number of rows (or edges for graphs) and memory usage in MB (see memory_usage)
+        """
+
+        rows = []
+
+        for (name, columns), data in self._cache.items():
+
+            mem = memory_usage(data)
+
+            rows.append(
+                {
+                    "dataset": name,
+                    "loaded_columns": "all" if columns is None else ", ".join(columns),
+                    "rows": data.number_of_edges()
+                    if isinstance(data, nx.Graph)
+                    else len(data),
+                    "memory_mb": round(mem / 1000000, 2) if mem is not None else None,
+                }
+            )
+
+        report = pd.DataFrame(rows, columns=["dataset", "loaded_columns", "rows", "memory_mb"])
+
+        return report
@@ -0,0 +1,245 @@
+"""
+The functions defined below are used for writing and reading GeoParquet files with bounding box columns and spatially sorted rows.
+They only depend on geopandas and pyarrow, so they can also be used in the feature matching environment (see feature_matching_hpc).
+"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+import pyarrow.parquet as pq
+
+
+# Columns with the bounding box of each geometry, used for only reading the row groups intersecting an area
+BBOX_COLUMNS = ["bbox_xmin", "bbox_ymin", "bbox_xmax", "bbox_ymax"]
+
+
+def _hilbert_distance(x, y, level=16):
+
+    """
+    Helper function for finding the distance along a Hilbert curve of points with integer coordinates between 0 and 2**level - 1
+    """
+
+    n = 2**level
+    x = x.astype(np.int64)
+    y = y.astype(np.int64)
+    d = np.zeros(len(x), dtype=np.int64)
+
+    s = n // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+
+        # Rotate the quadrant
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+
+        s //= 2
+
+    return d
+
+
+def spatial_sort(gdf, method="hilbert", hex_resolution=12):
+
+    """
+    Sort the rows of a gdf spatially, so rows that are close to each other in space are also close to each other in the data.
+    Rows are sorted by a key computed from the centroids of the geometries: either their distance along a Hilbert curve covering the data,
+    or the H3 index of the cell containing them. Rows with the same key keep their original order. Rows without geometries are placed last.
+
+    Arguments:
+        gdf (gdf): data to be sorted
+        method (str): 'hilbert' or 'h3'
+        hex_resolution (int): H3 resolution of the cells used for sorting, if method is 'h3'
+
+    Returns:
+        sorted_gdf (gdf): gdf with the rows sorted
+        id_map (df): dataframe with one row per row in sorted_gdf, with the original index, the original position and the new position of each row
+    """
+
+    assert method in ["hilbert", "h3"], "method must be 'hilbert' or 'h3'"
+
+    geoms = gdf.geometry.to_numpy()
+    has_geometry = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+
+    centroids = shapely.centroid(geoms[has_geometry])
+
+    if len(centroids) == 0:
+        keys = np.array([])
+    elif method == "hilbert":
+        coords = shapely.get_coordinates(centroids)
+        # Scale coordinates to the grid used by the Hilbert curve (the extent is at least 1 if all centroids are on a line)
+        n = 2**16 - 1
+        mins = coords.min(axis=0)
+        extent = np.maximum(coords.max(axis=0) - mins, 1)
+        grid = np.floor((coords - mins) / extent * n)
+        keys = _hilbert_distance(grid[:, 0], grid[:, 1])
+    else:
+        # h3 is only needed for this method, and is not installed in the feature matching environment
+        from src import h3_functions as hf
+
+        keys = hf.points_to_h3(gpd.GeoSeries(centroids, crs=gdf.crs), hex_resolution)
+
+    positions = np.flatnonzero(has_geometry)
+    order = np.concatenate(
+        [positions[np.argsort(keys, kind="stable")], np.flatnonzero(~has_geometry)]
+    ).astype(int)
+
+    sorted_gdf = gdf.iloc[order]
+
+    id_map = pd.DataFrame(
+        {
+            "original_index": gdf.index.to_numpy()[order],
+            "original_position": order,
+            "position": np.arange(len(order)),
+        }
+    )
+
+    return sorted_gdf, id_map
+
+
+def id_map_path(fp):
+
+    """
+    Get the path of the id map saved next to a Parquet file with spatially sorted rows (see write_parquet).
+
+    Arguments:
+        fp (str): path to Parquet file
+
+    Returns:
+        id_map_fp (str): path to the id map, e.g. 'edges_id_map.parquet' for 'edges.parquet'
+    """
+
+    root, ext = os.path.splitext(fp)
+
+    id_map_fp = root + "_id_map" + (ext if ext else ".parquet")
+
+    return id_map_fp
+
+
+def write_parquet(df, fp, sort_method="hilbert", row_group_size=50000):
+
+    """
+    Write a dataframe to Parquet. The index is always saved.
+    For gdfs, columns with the bounding box of each geometry are added, and rows can be sorted spatially (see spatial_sort),
+    so each row group covers a small area and only the relevant row groups have to be read when reading with a bbox (see read_parquet).
+    If the rows are sorted, the id map returned by spatial_sort is saved next to the data (see id_map_path).
+
+    Arguments:
+        df (gdf/df): data to be saved
+        fp (str): path to Parquet file
+        sort_method (str): how rows in gdfs are sorted, 'hilbert' or 'h3' (see spatial_sort). If None, the order of the rows is kept.
+        row_group_size (int): max number of rows in each row group
+
+    Returns:
+        id_map (df): the id_map returned by spatial_sort, with the original and new position of each row. None if the rows are not sorted.
+    """
+
+    id_map = None
+
+    if isinstance(df, gpd.GeoDataFrame):
+
+        bounds = shapely.bounds(df.geometry.to_numpy())
+
+        df = df.assign(**dict(zip(BBOX_COLUMNS, bounds.T)))
+
+        if sort_method is not None:
+            df, id_map = spatial_sort(df, method=sort_method)
+
+    df.to_parquet(fp, index=True, row_group_size=row_group_size)
+
+    if id_map is not None:
+        id_map.to_parquet(id_map_path(fp), index=False)
+    elif os.path.exists(id_map_path(fp)):
+        # An id map from an earlier sorted version of the data no longer matches the data
+        os.remove(id_map_path(fp))
+
+    return id_map
+
+
+def _bbox_bounds(bbox):
+
+    """
+    Helper function for getting the bounds (xmin, ymin, xmax, ymax) of a bbox given as a tuple, a shapely geometry or a gdf/GeoSeries
+    """
+
+    if isinstance(bbox, (gpd.GeoDataFrame, gpd.GeoSeries)):
+        return tuple(bbox.total_bounds)
+
+    if isinstance(bbox, shapely.Geometry):
+        return bbox.bounds
+
+    return tuple(bbox)
+
+
+def read_parquet(fp, columns=None, bbox=None):
+
+    """
+    Read a Parquet file, only reading the requested columns from disk.
+    The index is restored if it was saved with the data.
+    If a bbox is given, only rows with geometries intersecting the bbox are returned (or rows with a bounding box intersecting the bbox,
+    if the geometries are not read). For files written with write_parquet, row groups outside the bbox are skipped without being read.
+
+    Arguments:
+        fp (str): path to Parquet file
+        columns (list): names of columns to read. All columns are read if None.
+        bbox (tuple/shapely geometry/gdf): area to read data for. Either a tuple with (xmin, ymin, xmax, ymax) or a geometry/gdf to read the data intersecting.
+            Must use the same crs as the data.
+
+    Returns:
+        df (gdf/df): the data, as gdf if the file is a GeoParquet file and the geometry column is read
+    """
+
+    requested_columns = columns
+
+    schema = pq.read_schema(fp)
+    metadata = schema.metadata or {}
+
+    geometry_col = None
+    if b"geo" in metadata:
+        geometry_col = json.loads(metadata[b"geo"])["primary_column"]
+
+    filters = None
+    if bbox is not None:
+
+        if geometry_col is None:
+            raise ValueError(f"Data in {fp} cannot be filtered by bbox, since it has no geometries")
+
+        xmin, ymin, xmax, ymax = _bbox_bounds(bbox)
+
+        if set(BBOX_COLUMNS).issubset(schema.names):
+            filters = [
+                ("bbox_xmax", ">=", xmin),
+                ("bbox_xmin", "<=", xmax),
+                ("bbox_ymax", ">=", ymin),
+                ("bbox_ymin", "<=", ymax),
+            ]
+        elif columns is not None and geometry_col not in columns:
+            # Without bbox columns the geometries are needed for filtering the data
+            columns = list(columns) + [geometry_col]
+
+    if geometry_col is not None and (columns is None or geometry_col in columns):
+        df = gpd.read_parquet(fp, columns=columns, filters=filters)
+    else:
+        df = pd.read_parquet(fp, columns=columns, filters=filters)
+
+    if bbox is not None and isinstance(df, gpd.GeoDataFrame):
+        if isinstance(bbox, (gpd.GeoDataFrame, gpd.GeoSeries)):
+            area = bbox.unary_union
+        elif isinstance(bbox, shapely.Geometry):
+            area = bbox
+        else:
+            area = shapely.box(*bbox)
+        df = df[df.intersects(area)]
+
+    # The bbox columns are only returned if requested
+    if requested_columns is None:
+        df = df.drop(columns=[c for c in BBOX_COLUMNS if c in df.columns])
+    elif list(df.columns) != list(requested_columns):
+        df = df[[c for c in requested_columns if c in df.columns]]
+
+    return df
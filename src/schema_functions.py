@@ -0,0 +1,181 @@
+"""
+The functions defined below are used for storing network data with compact data types:
+OSM tags as categoricals, ids as int32/int64, lengths as float32 and booleans as bool.
+The data types are preserved when the data is saved to and read from Parquet.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Default columns converted by compact_dtypes, if present in the data
+ID_COLUMNS = ["edge_id", "osmid", "u", "v", "key", "nodeID"]
+LENGTH_COLUMNS = ["length", "infrastructure_length"]
+BOOL_COLUMNS = ["bicycle_bidirectional"]
+
+
+def osm_tag_columns(osm_way_tags):
+
+    """
+    Get the names of the columns with OSM tags, after the column names have been cleaned with graph_functions.clean_col_names
+
+    Arguments:
+        osm_way_tags (list): OSM tags as defined in the config file
+
+    Returns:
+        tag_cols (list): column names
+    """
+
+    tag_cols = [t.lower().replace(":", "_") for t in osm_way_tags]
+
+    return tag_cols
+
+
+def compact_ids(values):
+
+    """
+    Convert a column with ids to int32, or int64 if the ids are too large for int32.
+    Ids stored as objects are converted to integers if all ids are integers.
+    Other ids that are not strings (e.g. lists of OSM ids for merged edges) are converted to strings, so they can be saved to Parquet.
+
+    Arguments:
+        values (Series): ids
+
+    Returns:
+        values (Series): ids with new data type
+    """
+
+    if values.dtype == object:
+
+        kind = pd.api.types.infer_dtype(values, skipna=False)
+
+        if kind == "integer":
+            values = values.astype("int64")
+        elif kind != "string":
+            return values.astype(str)
+
+    if not pd.api.types.is_integer_dtype(values.dtype) or len(values) == 0:
+        return values
+
+    int32 = np.iinfo(np.int32)
+
+    if values.min() >= int32.min and values.max() <= int32.max:
+        return values.astype("int32")
+
+    return values.astype("int64")
+
+
+def compact_lengths(values, tolerance=0.001):
+
+    """
+    Convert a column with lengths to float32, if no value changes by more than the tolerance.
+
+    Arguments:
+        values (Series): lengths
+        tolerance (numeric): max allowed change of any value, in the units of the data
+
+    Returns:
+        values (Series): lengths, as float32 if precision allows
+    """
+
+    if not pd.api.types.is_float_dtype(values.dtype) or values.dtype == "float32":
+        return values
+
+    compact_values = values.astype("float32")
+
+    error = np.abs(compact_values.to_numpy(dtype="float64") - values.to_numpy())
+
+    if np.nanmax(error, initial=0) <= tolerance:
+        return compact_values
+
+    return values
+
+
+def compact_bools(values):
+
+    """
+    Convert a column with True/False values stored as objects to bool.
+    Columns with missing values are converted to the nullable pandas boolean type.
+    Columns with other values than True, False and missing values are not changed.
+
+    Arguments:
+        values (Series): boolean values
+
+    Returns:
+        values (Series): values with new data type
+    """
+
+    if values.dtype != object:
+        return values
+
+    if pd.api.types.infer_dtype(values, skipna=True) != "boolean":
+        return values
+
+    if values.isna().any():
+        return values.astype("boolean")
+
+    return values.astype(bool)
+
+
+def compact_tags(values):
+
+    """
+    Convert a column with OSM tag values (strings) to a categorical.
+    Columns with other values than strings and missing values are not changed.
+
+    Arguments:
+        values (Series): tag values
+
+    Returns:
+        values (Series): values as categorical
+    """
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+
+    if pd.api.types.infer_dtype(values, skipna=True) not in ["string", "empty"]:
+        return values
+
+    return values.astype("category")
+
+
+def compact_dtypes(
+    df,
+    tag_cols=None,
+    id_cols=ID_COLUMNS,
+    length_cols=LENGTH_COLUMNS,
+    bool_cols=BOOL_COLUMNS,
+    length_tolerance=0.001,
+):
+
+    """
+    Convert the columns in a dataframe to compact data types. Columns not in the data are ignored.
+
+    Arguments:
+        df (gdf/df): data to be converted
+        tag_cols (list): columns with OSM tags, converted to categoricals (see compact_tags)
+        id_cols (list): columns with ids, converted to int32/int64 (see compact_ids)
+        length_cols (list): columns with lengths, converted to float32 (see compact_lengths)
+        bool_cols (list): columns with booleans, converted to bool (see compact_bools)
+        length_tolerance (numeric): max allowed change of lengths when converting to float32
+
+    Returns:
+        df (gdf/df): copy of df with the converted columns
+    """
+
+    df = df.copy()
+
+    conversions = [
+        (tag_cols, compact_tags),
+        (id_cols, compact_ids),
+        (length_cols, lambda x: compact_lengths(x, tolerance=length_tolerance)),
+        (bool_cols, compact_bools),
+    ]
+
+    for cols, convert in conversions:
+        if cols is None:
+            continue
+        for c in cols:
+            if c in df.columns:
+                df[c] = convert(df[c])
+
+    return df
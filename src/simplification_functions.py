@@ -5,15 +5,36 @@ simplify the graph by removing interstitial nodes and by going from a
 multidigraph to a graph.
 """
 
+import os
 import itertools
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import pandas as pd
 import geopandas as gpd
 import shapely
 from shapely.geometry import LineString
 from shapely.geometry import Point
 import networkx as nx
-from haversine import haversine
+from haversine import haversine_vector
 from haversine import Unit
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+class _Missing:
+    """
+    Marks attributes missing on all edges of a simplified path. Unpickles
+    to the same object, so it can be compared with `is` after being
+    returned from another process.
+    """
+    def __reduce__(self):
+        return "_MISSING"
+
+    def __repr__(self):
+        return "_MISSING"
+
+
+_MISSING = _Missing()
 
 
 # New function
@@ -51,200 +72,252 @@ def multidigraph_to_graph(G, attributes=None,
         path to return only if debug is True.
 
     """
-    if verbose is True:
-        self_loop_count = 0
-        multiple_path_count = dict()
-    if debug is True:
-        debug_dict = dict()
-        debug_dict['self-loop'] = []
-        debug_dict['multiple-path'] = []
     G = get_undirected(G, attributes=attributes) # make it undirected
-    initial_node_list = list(G.nodes()) # to avoid issue with changing
-    for node in initial_node_list: # number of node during the process
-        neighbors = np.transpose(list(G.edges(node)))[1]
-        if node in neighbors: # then self_loop, need 2 artifical nodes
-            for k in list(G.get_edge_data(node, node).keys()):
-                if verbose is True:
-                    self_loop_count +=1
-                if debug is True:
-                    debug_dict['self-loop'].append([
-                        G.edges[node, node, k]['osmid'],
-                        G.edges[node, node, k]['geometry']])
-                G = _solve_self_loop(G, node, k)
-        for neigh in neighbors:
-            if G.number_of_edges(node, neigh) > 1: #then multiple path, need 1
-                if verbose is True:
-                    if G.number_of_edges(node, neigh) in multiple_path_count:
-                        multiple_path_count[
-                            G.number_of_edges(node, neigh)] += 1
-                    else:
-                        multiple_path_count[
-                            G.number_of_edges(node, neigh)] = 1
-                if debug is True:
-                    for k in list(G.get_edge_data(node, neigh).keys()):
-                        debug_dict['multiple-path'].append([
-                            G.edges[node, neigh, k]['osmid'],
-                            G.edges[node, neigh, k]['geometry']])
-                G = _solve_multiple_path(G, node, neigh, verbose=verbose)
-    G = nx.Graph(G) #if no multiple edges, simply change the type
+
+    # edge table of the undirected multigraph, with edges between the same
+    # nodes grouped by their sorted end nodes
+    edge_list = list(G.edges(keys=True, data=True))
+    edges = pd.DataFrame({
+        "u": [e[0] for e in edge_list],
+        "v": [e[1] for e in edge_list],
+        "key": [e[2] for e in edge_list],
+        "geometry": [e[3]["geometry"] for e in edge_list],
+    })
+    edges["is_curved"] = shapely.get_num_coordinates(
+        edges.geometry.to_numpy()) > 2
+    edges["node_a"] = np.minimum(edges.u, edges.v)
+    edges["node_b"] = np.maximum(edges.u, edges.v)
+    groups = edges.groupby(["node_a", "node_b"], sort=False)
+    edges["n_edges"] = groups["key"].transform("size")
+
+    is_self_loop = (edges.u == edges.v).to_numpy()
+    is_multiple = ~is_self_loop & (edges.n_edges > 1).to_numpy()
+
+    # zero-length self-loops have no geometry to keep and are removed
+    is_loop = is_self_loop & (shapely.length(edges.geometry.to_numpy()) > 0)
+
+    # for multiple paths, split every path but one, to add as little nodes as
+    # needed: first the curved paths, then the straight paths
+    is_curved = edges.is_curved.to_numpy()
+    n_curved = groups["is_curved"].transform("sum").to_numpy()
+    rank = np.where(
+        is_curved,
+        edges[is_curved].groupby(["node_a", "node_b"]).cumcount()
+        .reindex(edges.index).fillna(0).to_numpy(),
+        n_curved + edges[~is_curved].groupby(["node_a", "node_b"])
+        .cumcount().reindex(edges.index).fillna(0).to_numpy())
+    is_split = is_multiple & (rank < edges.n_edges.to_numpy() - 1)
+
     if verbose is True:
+        straight = edges[is_split & ~is_curved]
+        for (node_a, node_b), group in straight.groupby(["node_a", "node_b"]):
+            print("""
+                  Multiple straight path between node {} and {} 
+                  at the keys {}
+                  """.format(node_a, node_b, group.key.to_list()))
+        multiple_path_count = edges[is_multiple].groupby(
+            ["node_a", "node_b"]).size().value_counts().to_dict()
         print("""
               Number of self-loop found : {} \n
               Number of multiple path between nodes found : {}
-              """.format(self_loop_count, multiple_path_count)
+              """.format(is_loop.sum(), multiple_path_count)
               )
     if debug is True:
-        return G, debug_dict
-    return G
+        debug_dict = dict()
+        debug_dict['self-loop'] = [
+            [edge_list[i][3]['osmid'], edge_list[i][3]['geometry']]
+            for i in np.flatnonzero(is_loop)]
+        debug_dict['multiple-path'] = [
+            [edge_list[i][3]['osmid'], edge_list[i][3]['geometry']]
+            for i in np.flatnonzero(is_multiple)]
+
+    # every new node gets a new ID from one counter above the highest ID
+    next_id = max(G.nodes) + 1 if len(G) > 0 else 0
+    loop_pos = np.flatnonzero(is_loop)
+    split_pos = np.flatnonzero(is_split)
+    loop_f = next_id + 2 * np.arange(len(loop_pos))
+    loop_s = loop_f + 1
+    split_p = next_id + 2 * len(loop_pos) + np.arange(len(split_pos))
+
+    new_nodes, new_edges = _split_self_loops(
+        G, edges.iloc[loop_pos], loop_f, loop_s)
+    split_nodes, split_edges = _split_multiple_paths(
+        G, edges.iloc[split_pos], split_p)
+    new_nodes += split_nodes
+    new_edges += split_edges
+
+    # the new edges keep the attributes of the edge they replace
+    replaced = np.concatenate([np.repeat(loop_pos, 3),
+                               np.repeat(split_pos, 2)])
+    new_edge_data = []
+    for (node_1, node_2, geometry, length), i in zip(new_edges, replaced):
+        edge_attributes = {k: val for k, val in edge_list[i][3].items()
+                           if k not in ('geometry', 'length')}
+        new_edge_data.append((node_1, node_2, dict(
+            **edge_attributes, geometry=geometry, length=length)))
+
+    H = nx.Graph(**G.graph)
+    H.add_nodes_from(G.nodes(data=True))
+    H.add_nodes_from(new_nodes)
+    is_kept = ~(is_self_loop | is_split)
+    H.add_edges_from((edge_list[i][0], edge_list[i][1], edge_list[i][3])
+                     for i in np.flatnonzero(is_kept))
+    H.add_edges_from(new_edge_data)
+
+    if debug is True:
+        return H, debug_dict
+    return H
 
 
 # New function
-def _solve_self_loop(G, node, key):
+def _split_self_loops(G, loops, f_num, s_num):
     """
-    Transform a loop where a node is connected to itself by adding two 
-    nodes in the geometry of the loop, in order to make it simple
+    Transform loops where a node is connected to itself by adding two
+    nodes in the geometry of each loop, in order to make it simple
     (no multiple edges)
 
     Parameters
     ----------
     G : networkx.MultiGraph
-        MultiGraph we want to transform.
-    node : int
-        Node's ID where there is a self-loop.
-    key : int
-        Key of the edge, needed because the graph is a MultiGraph
+        MultiGraph with the self-loops.
+    loops : pandas.DataFrame
+        The self-loops, with the columns u and geometry.
+    f_num : numpy.ndarray
+        ID of the node to add at the first point of each loop.
+    s_num : numpy.ndarray
+        ID of the node to add at the last point of each loop.
 
     Returns
     -------
-    G : networkx.MultiGraph
-        MultiGraph with the self-loop resolved.
-
-    """
-    edge_attributes = dict(G.edges[node, node, key]) # take attributes
-    geom = list(edge_attributes['geometry'].coords[:])
-    edge_attributes.pop('geometry') # remove geometry
-    edge_attributes.pop('length') # remove length
-    G.remove_edge(node, node, key)
-    f_num = node + 1 # find unique ID not already in the graph
-    while f_num in G.nodes():
-        f_num += 1
-    s_num = f_num + 1
-    while s_num in G.nodes():
-        s_num += 1
-    # TODO : add street_count to nodes ?
-    # Add nodes as the first and last point in the LineString geometry
+    new_nodes : list
+        (ID, attributes) of the new nodes.
+    new_edges : list
+        (node, node, geometry, length) of the three new edges of each loop.
+
+    """
+    geoms = loops.geometry.to_numpy().copy()
+    # loops need at least four points to place two nodes and an edge between
+    # them
+    short = shapely.get_num_coordinates(geoms) < 4
+    geoms[short] = shapely.segmentize(
+        geoms[short], shapely.length(geoms[short]) / 3)
+
+    coords, index = shapely.get_coordinates(geoms, return_index=True)
+    n_coords = np.bincount(index, minlength=len(geoms))
+    first = np.cumsum(n_coords) - n_coords
+    last = first + n_coords - 1
+    position = np.arange(len(coords)) - first[index]
+
+    node = loops.u.to_numpy()
+    node_xy = np.array([[G.nodes[n]['x'], G.nodes[n]['y']] for n in node])
+    node_xy = node_xy.reshape(-1, 2)
+    # add nodes as the first and last point in the LineString geometry
     # if we don't count the original node of the self-loop
-    G.add_node(f_num, x=geom[1][0], y=geom[1][1])
-    G.add_node(s_num, x=geom[-2][0], y=geom[-2][1])
-    # Connect them with edges keeping the attributes and having in total
+    f_xy = coords[first + 1]
+    s_xy = coords[last - 1]
+
+    middle = (position > 0) & (position < n_coords[index] - 1)
+    geom_f = shapely.linestrings(
+        np.stack([coords[first], coords[first + 1]], axis=1))
+    geom_s = shapely.linestrings(
+        np.stack([coords[last - 1], coords[last]], axis=1))
+    geom_fs = shapely.linestrings(coords[middle], indices=index[middle])
+
+    # connect them with edges keeping the attributes and having in total
     # the same geometry as before
-    G.add_edge(node, f_num, key=0, **edge_attributes,
-               geometry=LineString(geom[:2]),
-               length=_get_length(G, node, f_num))
-    G.add_edge(node, s_num, key=0, **edge_attributes,
-               geometry=LineString(geom[-2:]),
-               length=_get_length(G, node, s_num))
-    G.add_edge(f_num, s_num, key=0, **edge_attributes,
-               geometry=LineString(geom[1:-1]),
-               length=_get_length(G, s_num, f_num))
-    return G
+    new_nodes = [(n, {'x': x, 'y': y}) for n, (x, y) in
+                 zip(np.concatenate([f_num, s_num]).tolist(),
+                     np.concatenate([f_xy, s_xy]).tolist())]
+    length_f = _get_lengths(node_xy, f_xy)
+    length_s = _get_lengths(node_xy, s_xy)
+    length_fs = _get_lengths(s_xy, f_xy)
+    new_edges = []
+    for i in range(len(loops)):
+        new_edges.append((node[i], f_num[i], geom_f[i], length_f[i]))
+        new_edges.append((node[i], s_num[i], geom_s[i], length_s[i]))
+        new_edges.append((f_num[i], s_num[i], geom_fs[i], length_fs[i]))
+
+    return new_nodes, new_edges
+
 
 # New function
-def _solve_multiple_path(G, node, other_node, verbose=False):
+def _split_multiple_paths(G, paths, p_num):
     """
-    Transform multiple paths between nodes by adding artifical nodes on every
-    path but one, in order to make it simple (no multiple edges)
+    Transform multiple paths between nodes by adding an artifical node on
+    each path, in order to make it simple (no multiple edges). Curved paths
+    are split at their second point, straight paths at their middle.
 
     Parameters
     ----------
-    G : networkx.classes.multidigraph.MultiDiGraph
-        MultiDiGraph we want to transform.
-    node : int
-        First node's ID.
-    other_node : int
-        Second node's ID.
-    verbose : bool, optional
-        If True, give  the nodes with multiple straight edge between
-        (sign of bad OSM practice) and their keys. The default is False.
+    G : networkx.MultiGraph
+        MultiGraph with the multiple paths.
+    paths : pandas.DataFrame
+        The paths to split, with the columns u, v and geometry.
+    p_num : numpy.ndarray
+        ID of the node to add on each path.
 
     Returns
     -------
-    G : networkx.classes.multidigraph.MultiDiGraph
-        MultiDiGraph with the multiple path issue solved.
-
-    """
-    # for every path but one, to add as little number of node as needed
-    count = 0
-    straigth_key = []
-    initial_n_edges = G.number_of_edges(node, other_node)
-    initial_key_list = list(G.get_edge_data(node, other_node).keys())
-    for i in initial_key_list:
-        if count == initial_n_edges - 1:
-            break
-        elif len(list(
-                G.edges[node, other_node, i]['geometry'].coords[:]
-                )) > 2:
-            # take attributes
-            edge_attributes = dict(G.edges[node, other_node, i])
-            geom = list(edge_attributes['geometry'].coords[:])
-            edge_attributes.pop('geometry') #remove geometry
-            edge_attributes.pop('length') # remove length
-            G.remove_edge(node, other_node, i)
-            p_num = node + 1 # find ID that is not already in the graph
-            while p_num in G.nodes():
-                p_num += 1
-            # add node as the first point of the geometry
-            G.add_node(p_num, x=geom[1][0], y=geom[1][1])
-            # Connect it with edges keeping the attributes and having in total
-            # the same geometry as before
-            G.add_edge(node, p_num, key=0, **edge_attributes,
-                       geometry = LineString(geom[:2]),
-                       length=_get_length(G, node, p_num))
-            G.add_edge(p_num, other_node, key=0, **edge_attributes,
-                       geometry=LineString(geom[1:]),
-                       length=_get_length(G, other_node, p_num))
-            count += 1
-        else: #if straight line
-            straigth_key.append(i)
-    if count < G.number_of_edges(node, other_node) - 1:
-        if verbose is True:
-            print("""
-                  Multiple straight path between node {} and {} 
-                  at the keys {}
-                  """.format(node, other_node, straigth_key))
-        while count < G.number_of_edges(node, other_node) - 1:
-            f_key = straigth_key[0]
-            edge_attributes = dict(G.edges[node, other_node, f_key])
-            geom = list(edge_attributes['geometry'].coords[:])
-            edge_attributes.pop('geometry') #remove geometry
-            edge_attributes.pop('length') # remove length
-            mid_x = (geom[0][0]+geom[1][0]) / 2. # take middle coordinates
-            mid_y = (geom[0][1]+geom[1][1]) / 2.
-            geom.insert(1, (mid_x, mid_y)) # insert it into the geometry
-            G.remove_edge(node, other_node, f_key)
-            p_num = node + 1# find ID that is not already in the graph
-            while p_num in G.nodes():
-                p_num += 1
-            # add node as the first point of the geometry
-            G.add_node(p_num, x=geom[1][0], y=geom[1][1])
-            # Connect it with edges keeping the attributes and having in total
-            # the same geometry as before
-            G.add_edge(node, p_num, key=0, **edge_attributes,
-                       geometry=LineString(geom[:2]),
-                       length=_get_length(G, node, p_num))
-            G.add_edge(p_num, other_node, key=0, **edge_attributes,
-                       geometry=LineString(geom[1:]),
-                       length=_get_length(G, other_node, p_num))
-            straigth_key.remove(f_key)
-            count += 1
-    return G
+    new_nodes : list
+        (ID, attributes) of the new nodes.
+    new_edges : list
+        (node, node, geometry, length) of the two new edges of each path.
+
+    """
+    geoms = paths.geometry.to_numpy()
+    coords, index = shapely.get_coordinates(geoms, return_index=True)
+    n_coords = np.bincount(index, minlength=len(geoms))
+    first = np.cumsum(n_coords) - n_coords
+    last = first + n_coords - 1
+    position = np.arange(len(coords)) - first[index]
+
+    # take middle coordinates of straight lines, else the second point
+    straight = n_coords == 2
+    p_xy = coords[first + 1].copy()
+    p_xy[straight] = (coords[first[straight]] + coords[last[straight]]) / 2.
+
+    # the geometry may go from v to u
+    u_xy = np.array([[G.nodes[n]['x'], G.nodes[n]['y']]
+                     for n in paths.u]).reshape(-1, 2)
+    v_xy = np.array([[G.nodes[n]['x'], G.nodes[n]['y']]
+                     for n in paths.v]).reshape(-1, 2)
+    starts_at_u = (np.hypot(*(coords[first] - u_xy).T)
+                   <= np.hypot(*(coords[first] - v_xy).T))
+    start_node = np.where(starts_at_u, paths.u, paths.v)
+    end_node = np.where(starts_at_u, paths.v, paths.u)
+    start_xy = np.where(starts_at_u[:, None], u_xy, v_xy)
+    end_xy = np.where(starts_at_u[:, None], v_xy, u_xy)
+
+    geom_start = shapely.linestrings(np.stack([coords[first], p_xy], axis=1))
+    # the rest of straight lines starts at the middle point, else at the
+    # second point
+    rest_coords = coords.copy()
+    rest_coords[first[straight]] = p_xy[straight]
+    rest = (position > 0) | straight[index]
+    geom_end = shapely.linestrings(rest_coords[rest], indices=index[rest])
+
+    new_nodes = [(n, {'x': x, 'y': y})
+                 for n, (x, y) in zip(p_num.tolist(), p_xy.tolist())]
+    length_start = _get_lengths(start_xy, p_xy)
+    length_end = _get_lengths(end_xy, p_xy)
+    new_edges = []
+    for i in range(len(paths)):
+        new_edges.append((start_node[i], p_num[i], geom_start[i],
+                          length_start[i]))
+        new_edges.append((p_num[i], end_node[i], geom_end[i],
+                          length_end[i]))
+
+    return new_nodes, new_edges
+
 
 # New function
-def _get_length(G, f_node, s_node):
-    """Return the haversine length in meters between two nodes like OSM."""
-    f_point = [G.nodes[f_node]['y'], G.nodes[f_node]['x']] #[lat, lon]
-    s_point = [G.nodes[s_node]['y'], G.nodes[s_node]['x']]
-    return round(haversine(f_point, s_point, unit=Unit.METERS), 3)
+def _get_lengths(f_xy, s_xy):
+    """Return the haversine lengths in meters between arrays of points like
+    OSM."""
+    if len(f_xy) == 0:
+        return np.zeros(0)
+    lengths = haversine_vector(f_xy[:, ::-1], s_xy[:, ::-1], unit=Unit.METERS)
+    return np.round(lengths, 3)
 
 # Modified function
 def get_undirected(G, attributes=None):
@@ -286,29 +359,98 @@ def get_undirected(G, attributes=None):
 
     # the previous operation added all directed edges from G as undirected
     # edges in H. we now have duplicate edges for every bidirectional parallel
-    # edge or self-loop. so, look through the edges and remove any duplicates.
-    duplicate_edges = set()
-    for u1, v1, key1, data1 in H.edges(keys=True, data=True):
+    # edge or self-loop. so, find the edges between the same nodes with the
+    # same osmid, geometry and attributes and keep only the first of them.
+    if len(H.edges) == 0:
+        return H
+    u, v, k, data = zip(*H.edges(keys=True, data=True))
+    edges = _edge_keys(u, v, k)
+    edges["geometry"] = _geometry_hashes([d.get("geometry") for d in data])
+    edges["osmid"] = _value_codes([d.get("osmid") for d in data],
+                                  as_set=True)
+
+    if attributes is not None and not isinstance(attributes, list):
+        attributes = [attributes]
+    for i, attr in enumerate(attributes or []):
+        edges[f"attribute_{i}"] = _value_codes([d.get(attr) for d in data])
+
+    duplicated = edges.drop(columns="key").duplicated(keep="first").to_numpy()
+    H.remove_edges_from(
+        (u[i], v[i], k[i]) for i in np.flatnonzero(duplicated))
+    return H
 
-        # if we haven't already flagged this edge as a duplicate
-        if (u1, v1, key1) not in duplicate_edges:
 
-            # look at every other edge between u and v, one at a time
-            for key2 in H[u1][v1]:
+# New function
+def _edge_keys(u, v, k):
+    """
+    Canonical keys of edges, the same for edge u, v, k and edge v, u, k.
 
-                # don't compare this edge to itself
-                if key1 != key2:
+    Parameters
+    ----------
+    u, v, k : sequence
+        start nodes, end nodes and keys of the edges
 
-                    # compare the first edge's data to the second's
-                    # if they match up, flag the duplicate for removal
-                    data2 = H.edges[u1, v1, key2]
-                    if _is_duplicate_edge(data1, data2, attributes=attributes):
-                        duplicate_edges.add((u1, v1, key2))
+    Returns
+    -------
+    edges : pandas.DataFrame
+        the columns node_a (smallest node), node_b (largest node) and key
+    """
+    u = np.asarray(u)
+    v = np.asarray(v)
+    return pd.DataFrame({"node_a": np.minimum(u, v),
+                         "node_b": np.maximum(u, v),
+                         "key": np.asarray(k)})
 
-    H.remove_edges_from(duplicate_edges)
-    return H
 
-# Same function
+# New function
+def _geometry_hashes(geometries):
+    """
+    Hash LineString geometries so that a geometry and the same geometry in
+    the opposite direction get the same hash.
+
+    Geometries are normalized before hashing their WKB, which orients them
+    so that they start at the smallest of their end points.
+
+    Parameters
+    ----------
+    geometries : sequence
+        LineString geometries, None for missing geometries
+
+    Returns
+    -------
+    hashes : numpy.ndarray
+        uint64 hash of each geometry
+    """
+    geometries = np.asarray(list(geometries) + [None], dtype=object)[:-1]
+    wkb = shapely.to_wkb(shapely.normalize(geometries))
+    return pd.util.hash_array(wkb.astype(object))
+
+
+# New function
+def _value_codes(values, as_set=False):
+    """
+    Integer codes of attribute values, the same code for equal values.
+
+    Parameters
+    ----------
+    values : sequence
+        attribute values
+    as_set : bool
+        if True, lists are compared as sets (like osmids of simplified edges)
+
+    Returns
+    -------
+    codes : numpy.ndarray
+    """
+    container = frozenset if as_set else tuple
+    lookup = dict()
+    return np.array([
+        lookup.setdefault(container(val) if isinstance(val, list) else val,
+                          len(lookup))
+        for val in values], dtype=np.int64)
+
+
+# Modified function
 def _update_edge_keys(G):
     """
     Increment key of one edge of parallel edges that differ in geometry.
@@ -327,34 +469,38 @@ def _update_edge_keys(G):
     -------
     G : networkx.MultiDiGraph
     """
-    # identify all the edges that are duplicates based on a sorted combination
-    # of their origin, destination, and key. that is, edge uv will match edge vu
-    # as a duplicate, but only if they have the same key
-    edges = graph_to_gdfs(G, nodes=False, fill_edge_geometry=False)
-    edges["uvk"] = ["_".join(sorted([str(u), str(v)]) + [str(k)]) for u, v, k in edges.index]
-    mask = edges["uvk"].duplicated(keep=False)
-    dupes = edges[mask].dropna(subset=["geometry"])
-
-    different_streets = []
-    groups = dupes[["geometry", "uvk"]].groupby("uvk")
-
-    # for each group of duplicate edges
-    for _, group in groups:
-
-        # for each pair of edges within this group
-        for geom1, geom2 in itertools.combinations(group["geometry"], 2):
-
-            # if they don't have the same geometry, flag them as different
-            # streets: flag edge uvk, but not edge vuk, otherwise we would
-            # increment both their keys and they'll still duplicate each other
-            if not _is_same_geometry(geom1, geom2):
-                different_streets.append(group.index[0])
-
-    # for each unique different street, increment its key to make it unique
-    for u, v, k in set(different_streets):
-        new_key = max(list(G[u][v]) + list(G[v][u])) + 1
-        G.add_edge(u, v, key=new_key, **G.get_edge_data(u, v, k))
-        G.remove_edge(u, v, key=k)
+    if len(G.edges) == 0:
+        return G
+
+    # identify all the edges that are duplicates based on their sorted origin
+    # and destination and their key. that is, edge uv will match edge vu as a
+    # duplicate, but only if they have the same key
+    u, v, k, data = zip(*G.edges(keys=True, data=True))
+    edges = _edge_keys(u, v, k)
+    geometries = [d.get("geometry") for d in data]
+    edges["geometry"] = _geometry_hashes(geometries)
+
+    has_geometry = np.array([g is not None for g in geometries])
+    mask = edges.duplicated(["node_a", "node_b", "key"], keep=False)
+    dupes = edges[mask.to_numpy() & has_geometry]
+
+    # if they don't have the same geometry, flag them as different streets:
+    # flag the first edge uvk, but not edge vuk, otherwise we would increment
+    # both their keys and they'll still duplicate each other
+    groups = dupes.groupby(["node_a", "node_b", "key"], sort=False)
+    different = groups["geometry"].transform("nunique") > 1
+    different_streets = dupes[different & ~dupes.duplicated(
+        ["node_a", "node_b", "key"])]
+
+    # for each different street, increment its key to make it unique
+    max_keys = edges.groupby(["node_a", "node_b"])["key"].max()
+    new_keys = max_keys.reindex(pd.MultiIndex.from_frame(
+        different_streets[["node_a", "node_b"]])).to_numpy() + 1 \
+        + different_streets.groupby(["node_a", "node_b"]).cumcount() \
+        .to_numpy()
+    for i, new_key in zip(different_streets.index, new_keys.tolist()):
+        G.add_edge(u[i], v[i], key=new_key, **data[i])
+        G.remove_edge(u[i], v[i], key=k[i])
 
     return G
 
@@ -453,90 +599,8 @@ def graph_to_gdfs(G, nodes=True, edges=True, node_geometry=True,
         raise ValueError("you must request nodes or edges or both")
 
 # Modified function
-def _is_duplicate_edge(data1, data2, attributes=None):
-    """
-    Check if two graph edge data dicts have the same osmid and geometry.
-
-    Parameters
-    ----------
-    data1: dict
-        the first edge's data
-    data2 : dict
-        the second edge's data
-
-    Returns
-    -------
-    is_dupe : bool
-    """
-    is_dupe = False
-
-    # if either edge's osmid contains multiple values (due to simplification)
-    # compare them as sets to see if they contain the same values
-    osmid1 = set(data1["osmid"]) if isinstance(data1["osmid"], list) else data1["osmid"]
-    osmid2 = set(data2["osmid"]) if isinstance(data2["osmid"], list) else data2["osmid"]
-
-    # if they contain the same osmid or set of osmids (due to simplification)
-    if osmid1 == osmid2:
-
-        # if both edges have geometry attributes and they match each other
-        if ("geometry" in data1) and ("geometry" in data2):
-            if _is_same_geometry(data1["geometry"], data2["geometry"]):
-                is_dupe = True
-
-        # if neither edge has a geometry attribute
-        elif ("geometry" not in data1) and ("geometry" not in data2):
-            is_dupe = True
-
-        # if one edge has geometry attribute but the other doesn't:
-        # not dupes
-        else:
-            pass
-
-        if attributes is None:
-            pass
-        elif isinstance(attributes, list):
-            for attr in attributes:
-                if data1[attr] != data2[attr]:
-                    is_dupe = False
-                else:
-                    pass
-        else:
-            if data1[attributes] != data2[attributes]:
-                is_dupe = False
-
-    return is_dupe
-
-# Same function
-def _is_same_geometry(ls1, ls2):
-    """
-    Determine if two LineString geometries are the same (in either direction).
-
-    Check both the normal and reversed orders of their constituent points.
-
-    Parameters
-    ----------
-    ls1 : shapely.geometry.LineString
-        the first LineString geometry
-    ls2 : shapely.geometry.LineString
-        the second LineString geometry
-
-    Returns
-    -------
-    bool
-    """
-    # extract coordinates from each LineString geometry
-    geom1 = [tuple(coords) for coords in ls1.xy]
-    geom2 = [tuple(coords) for coords in ls2.xy]
-
-    # reverse the first LineString's coordinates' direction
-    geom1_r = [tuple(reversed(coords)) for coords in ls1.xy]
-
-    # if first geometry matches second in either direction, return True
-    return geom1 == geom2 or geom1_r == geom2
-
-
-# Modified function
-def simplify_graph(G, attributes=None, strict=True, remove_rings=True):
+def simplify_graph(G, attributes=None, strict=True, remove_rings=True,
+                   method="array", n_jobs=1):
     """
     Simplify a graph's topology by removing interstitial nodes.
 
@@ -559,6 +623,14 @@ def simplify_graph(G, attributes=None, strict=True, remove_rings=True):
         have multiple OSM IDs within them too.
     remove_rings : bool
         if True, remove isolated self-contained rings that have no endpoints
+    method : str
+        'array' finds the paths to simplify with array operations on the
+        edge table (see simplify_edges), 'networkx' walks the graph node by
+        node. Both give the same simplified graph.
+    n_jobs : int
+        only used by the 'array' method. If more than 1, the weakly connected
+        components are simplified in parallel in this number of processes.
+        -1 uses all CPUs.
 
     Returns
     -------
@@ -569,6 +641,14 @@ def simplify_graph(G, attributes=None, strict=True, remove_rings=True):
     if "simplified" in G.graph and G.graph["simplified"]:
         raise Exception("This graph has already been simplified, cannot simplify it again.")
 
+    if method == "array":
+        G = _simplify_graph_array(G, attributes=attributes, strict=strict,
+                                  remove_rings=remove_rings, n_jobs=n_jobs)
+        G.graph["simplified"] = True
+        return G
+    elif method != "networkx":
+        raise ValueError(f"Unknown simplification method {method}")
+
     # define edge segment attributes to sum upon edge simplification
     attrs_to_sum = {"length", "travel_time"}
 
@@ -577,9 +657,14 @@ def simplify_graph(G, attributes=None, strict=True, remove_rings=True):
     all_nodes_to_remove = []
     all_edges_to_add = []
 
+    # classify the nodes once, for finding the paths and removing rings
+    node_position, is_endpoint, is_topological_endpoint = \
+        _classify_endpoints(G, attributes=attributes, strict=strict)
+
     # generate each path that needs to be simplified
     for path in _get_paths_to_simplify(G, attributes=attributes,
-                                       strict=strict):
+                                       strict=strict,
+                                       is_endpoint=is_endpoint):
 
         # add the interstitial edges we're removing to a list so we can retain
         # their spatial geometry
@@ -639,12 +724,10 @@ def simplify_graph(G, attributes=None, strict=True, remove_rings=True):
     if remove_rings:
         # remove any connected components that form a self-contained ring
         # without any endpoints
-        wccs = nx.weakly_connected_components(G)
-        nodes_in_rings = set()
-        for wcc in wccs:
-            if not any(_is_endpoint(G, n) for n in wcc):
-                nodes_in_rings.update(wcc)
-        G.remove_nodes_from(nodes_in_rings)
+        changed_nodes = {edge["origin"] for edge in all_edges_to_add} | {
+            edge["destination"] for edge in all_edges_to_add}
+        _remove_rings(G, node_position, is_topological_endpoint,
+                      changed_nodes)
 
     # mark graph as having been simplified
     G.graph["simplified"] = True
@@ -652,7 +735,8 @@ def simplify_graph(G, attributes=None, strict=True, remove_rings=True):
 
 
 # Modified function
-def _get_paths_to_simplify(G, attributes=None, strict=True):
+def _get_paths_to_simplify(G, attributes=None, strict=True,
+                           is_endpoint=None):
     """
     Generate all the paths to be simplified between endpoint nodes.
 
@@ -668,15 +752,19 @@ def _get_paths_to_simplify(G, attributes=None, strict=True):
     strict : bool
         if False, allow nodes to be end points even if they fail all other
         rules but have edges with different OSM IDs
+    is_endpoint : numpy.ndarray
+        endpoint status of the nodes from _classify_endpoints. Computed if
+        None.
 
     Yields
     ------
     path_to_simplify : list
     """
     # first identify all the nodes that are endpoints
-    endpoints = set([n for n in G.nodes if _is_endpoint(G, n,
-                                                        attributes=attributes,
-                                                        strict=strict)])
+    if is_endpoint is None:
+        _, is_endpoint, _ = _classify_endpoints(G, attributes=attributes,
+                                                strict=strict)
+    endpoints = set(itertools.compress(G.nodes, is_endpoint))
 
     # for each endpoint node, look at each of its successor nodes
     for endpoint in endpoints:
@@ -745,8 +833,37 @@ def _is_endpoint(G, node, attributes=None, strict=True):
         # is an endpoint
         return True
 
+    # rules 4 and 5
+    else:
+        return _is_attribute_endpoint(G, node, attributes=attributes,
+                                      strict=strict)
+
+
+# New function
+def _is_attribute_endpoint(G, node, attributes=None, strict=True):
+    """
+    Is a node which is not an endpoint because of its neighbours and degree
+    an endpoint because of the attributes of its edges (rules 4 and 5 of
+    _is_endpoint).
+
+    Parameters
+    ----------
+    G : networkx.MultiDiGraph
+        input graph
+    node : int
+        the node to examine
+    attributes : list
+        key of the attributes we should discriminate
+    strict : bool
+        if False, allow nodes to be end points even if they fail all other
+        rules but have edges with different OSM IDs
+
+    Returns
+    -------
+    bool
+    """
     # rule 4
-    elif not strict:
+    if not strict:
         # non-strict mode: do its incident edges have different OSM IDs?
         osmids = []
 
@@ -764,30 +881,103 @@ def _is_endpoint(G, node, attributes=None, strict=True):
         # an endpoint, if not, it isn't
         return len(set(osmids)) > 1
 
-    # if none of the preceding rules returned true, then it is not an endpoint
-    # except if the attributes is not None and the values are different
-    else:
-        if attributes is None:
-            return False
-        else:
-            if isinstance(attributes, list):
-                for attr in attributes:
-                    for pre in list(G.predecessors(node)):
-                        for suc in list(G.successors(node)):
-                            if (G.edges[pre, node, 0][attr]) == (
-                                    G.edges[node, suc, 0][attr]):
-                                pass
-                            else:
-                                return True
-            else:
-                for pre in list(G.predecessors(node)):
-                    for suc in list(G.successors(node)):
-                        if (G.edges[pre, node, 0][attributes]) == (
-                                G.edges[node, suc, 0][attributes]):
-                            pass
-                        else:
-                            return True
-            return False
+    # rule 5: it is not an endpoint except if the attributes is not None and
+    # the values are different
+    if attributes is None:
+        return False
+    if not isinstance(attributes, list):
+        attributes = [attributes]
+    for attr in attributes:
+        for pre in list(G.predecessors(node)):
+            for suc in list(G.successors(node)):
+                if (G.edges[pre, node, 0][attr]) != (
+                        G.edges[node, suc, 0][attr]):
+                    return True
+    return False
+
+
+# New function
+def _classify_endpoints(G, attributes=None, strict=True):
+    """
+    Classify every node of a graph as an endpoint or not, once.
+
+    The status is stored in boolean arrays indexed by the position of the
+    node in G.nodes, so it can be shared between path discovery and ring
+    removal instead of calling _is_endpoint again for every node.
+
+    Parameters
+    ----------
+    G : networkx.MultiDiGraph
+        input graph
+    attributes : list
+        key of the attributes we should discriminate
+    strict : bool
+        if False, allow nodes to be end points even if they fail all other
+        rules but have edges with different OSM IDs
+
+    Returns
+    -------
+    node_position : dict
+        position of each node
+    is_endpoint : numpy.ndarray
+        True for the nodes which are endpoints with the given attributes and
+        strict mode
+    is_topological_endpoint : numpy.ndarray
+        True for the nodes which are endpoints because of their neighbours
+        and degree alone (rules 1 to 3), as used for removing rings
+    """
+    node_position = {node: i for i, node in enumerate(G.nodes)}
+
+    is_topological_endpoint = np.fromiter(
+        (_is_endpoint(G, node) for node in G.nodes), dtype=bool,
+        count=len(node_position))
+    is_endpoint = is_topological_endpoint.copy()
+
+    if attributes is not None or not strict:
+        for node, i in node_position.items():
+            if not is_endpoint[i]:
+                is_endpoint[i] = _is_attribute_endpoint(
+                    G, node, attributes=attributes, strict=strict)
+
+    return node_position, is_endpoint, is_topological_endpoint
+
+
+# New function
+def _remove_rings(G, node_position, is_topological_endpoint, changed_nodes):
+    """
+    Remove any connected components that form a self-contained ring without
+    any endpoints.
+
+    Only the nodes at the ends of the simplified paths get new edges, so the
+    endpoint status is only updated for these nodes instead of classifying
+    all nodes again.
+
+    Parameters
+    ----------
+    G : networkx.MultiDiGraph
+        simplified graph, modified in place
+    node_position : dict
+        position of each node in is_topological_endpoint
+    is_topological_endpoint : numpy.ndarray
+        endpoint status (rules 1 to 3) of the nodes before simplification,
+        updated in place
+    changed_nodes : set
+        the first and last nodes of the simplified paths
+
+    Returns
+    -------
+    None
+    """
+    for node in changed_nodes:
+        if node in G:
+            is_topological_endpoint[node_position[node]] = _is_endpoint(G, node)
+
+    wccs = nx.weakly_connected_components(G)
+    nodes_in_rings = set()
+    for wcc in wccs:
+        if not any(is_topological_endpoint[node_position[n]] for n in wcc):
+            nodes_in_rings.update(wcc)
+    G.remove_nodes_from(nodes_in_rings)
 
 # Same function
 def _build_path(G, endpoint, endpoint_successor, endpoints):
@@ -903,9 +1093,14 @@ def momepy_simplify_graph(G, attributes=None,
     all_edges_to_add = []
     
 
+    # classify the nodes once, for finding the paths and removing rings
+    node_position, is_endpoint, is_topological_endpoint = \
+        _classify_endpoints(G, attributes=attributes, strict=strict)
+
     # generate each path that needs to be simplified
     for path in _get_paths_to_simplify(G, attributes=attributes,
-                                       strict=strict):
+                                       strict=strict,
+                                       is_endpoint=is_endpoint):
         # add the interstitial edges we're removing to a list so we can retain
         # their spatial geometry
         path_attributes = dict()
@@ -978,13 +1173,675 @@ def momepy_simplify_graph(G, attributes=None,
     if remove_rings:
         # remove any connected components that form a self-contained ring
         # without any endpoints
-        wccs = nx.weakly_connected_components(G)
-        nodes_in_rings = set()
-        for wcc in wccs:
-            if not any(_is_endpoint(G, n) for n in wcc):
-                nodes_in_rings.update(wcc)
-        G.remove_nodes_from(nodes_in_rings)
+        changed_nodes = {edge["origin"] for edge in all_edges_to_add} | {
+            edge["destination"] for edge in all_edges_to_add}
+        _remove_rings(G, node_position, is_topological_endpoint,
+                      changed_nodes)
 
     # mark graph as having been simplified
     G.graph["simplified"] = True
     return G
+
+
+# New function
+def _endpoint_mask(u, v, n_nodes, rep=None, edge_values=None, osmid=None,
+                   strict=True, is_topological_endpoint=None):
+    """
+    Vectorized version of _is_endpoint for every node of an edge table.
+
+    Applies the same rules as _is_endpoint, using degree and neighbour
+    counts computed from the arrays of edge end nodes instead of walking the
+    graph node by node.
+
+    Parameters
+    ----------
+    u : numpy.ndarray
+        position of the start node of each edge
+    v : numpy.ndarray
+        position of the end node of each edge
+    n_nodes : int
+        number of nodes
+    rep : numpy.ndarray
+        position of the edge used for each pair of nodes (the edge with the
+        lowest key), used when comparing attributes
+    edge_values : numpy.ndarray
+        2d object array with the values of the attributes we should
+        discriminate, one row per edge
+    osmid : numpy.ndarray
+        osmid of each edge, only used if strict is False
+    strict : bool
+        if False, allow nodes to be end points even if they fail all other
+        rules but have edges with different OSM IDs
+    is_topological_endpoint : numpy.ndarray
+        result of _topological_endpoint_mask for the same edges. Computed if
+        None.
+
+    Returns
+    -------
+    is_endpoint : numpy.ndarray
+        boolean array indexed by node position
+    """
+    # rules 1 to 3
+    if is_topological_endpoint is None:
+        is_topological_endpoint = _topological_endpoint_mask(u, v, n_nodes)
+    is_endpoint = is_topological_endpoint.copy()
+
+    # rule 4
+    if not strict:
+        node = np.concatenate([u, v])
+        incident = pd.DataFrame({"node": node,
+                                 "osmid": np.concatenate([osmid, osmid])})
+        incident = incident[~is_endpoint[node]]
+        n_osmids = incident.groupby("node")["osmid"].nunique()
+        is_endpoint[n_osmids.index[n_osmids > 1].to_numpy()] = True
+        return is_endpoint
+
+    # rule 5
+    if edge_values is not None:
+        rep_u, rep_v = u[rep], v[rep]
+        incoming = rep[~is_endpoint[rep_v]]
+        outgoing = rep[~is_endpoint[rep_u]]
+        # compare every incoming edge with every outgoing edge of the node
+        pairs = pd.merge(
+            pd.DataFrame({"node": v[incoming], "edge_in": incoming}),
+            pd.DataFrame({"node": u[outgoing], "edge_out": outgoing}),
+            on="node",
+        )
+        different = (edge_values[pairs.edge_in.to_numpy()]
+                     != edge_values[pairs.edge_out.to_numpy()]).any(axis=1)
+        is_endpoint[pairs.node.to_numpy()[different]] = True
+
+    return is_endpoint
+
+
+# New function
+def _topological_endpoint_mask(u, v, n_nodes):
+    """
+    Find the nodes which are endpoints because of their neighbours and
+    degree alone (rules 1 to 3 of _is_endpoint).
+
+    Parameters
+    ----------
+    u : numpy.ndarray
+        position of the start node of each edge
+    v : numpy.ndarray
+        position of the end node of each edge
+    n_nodes : int
+        number of nodes
+
+    Returns
+    -------
+    is_endpoint : numpy.ndarray
+        boolean array indexed by node position
+    """
+    in_degree = np.bincount(v, minlength=n_nodes)
+    out_degree = np.bincount(u, minlength=n_nodes)
+
+    # rule 1
+    loop = u == v
+    is_endpoint = np.zeros(n_nodes, dtype=bool)
+    is_endpoint[u[loop]] = True
+
+    # rule 2
+    is_endpoint |= (in_degree == 0) | (out_degree == 0)
+
+    # rule 3
+    n_neighbors, _ = _neighbor_counts(u, v, n_nodes)
+    degree = in_degree + out_degree
+    is_endpoint |= ~((n_neighbors == 2) & ((degree == 2) | (degree == 4)))
+
+    return is_endpoint
+
+
+# New function
+def _neighbor_counts(u, v, n_nodes):
+    """
+    Count the distinct neighbours of each node, ignoring self-loops.
+
+    Parameters
+    ----------
+    u : numpy.ndarray
+        position of the start node of each edge
+    v : numpy.ndarray
+        position of the end node of each edge
+    n_nodes : int
+        number of nodes
+
+    Returns
+    -------
+    n_neighbors : numpy.ndarray
+        number of distinct neighbours of each node
+    neighbor_sum : numpy.ndarray
+        sum of the positions of the distinct neighbours of each node. For a
+        node with two neighbours, the other neighbour of the node is
+        neighbor_sum minus the position of the first one.
+    """
+    loop = u == v
+    codes = np.unique(np.concatenate([u[~loop] * n_nodes + v[~loop],
+                                      v[~loop] * n_nodes + u[~loop]]))
+    node, neighbor = np.divmod(codes, n_nodes)
+
+    n_neighbors = np.bincount(node, minlength=n_nodes)
+    neighbor_sum = np.zeros(n_nodes, dtype=np.int64)
+    np.add.at(neighbor_sum, node, neighbor)
+
+    return n_neighbors, neighbor_sum
+
+
+# New function
+def _chain_states(pair_u, pair_v, is_endpoint, neighbor_sum, n_nodes):
+    """
+    Find the chains of node pairs between endpoints with pointer jumping.
+
+    Each directed node pair (u, v) is a state. If v is not an endpoint, the
+    next state is (v, w), where w is the other neighbour of v, as in
+    _build_path. Chains start at pairs going from an endpoint to a node
+    which is not an endpoint. The start of the chain and the position in the
+    chain of every pair are found by repeatedly doubling the pointers to
+    the previous pair, instead of following the path node by node.
+
+    Parameters
+    ----------
+    pair_u : numpy.ndarray
+        position of the start node of each pair, sorted with pair_v
+    pair_v : numpy.ndarray
+        position of the end node of each pair
+    is_endpoint : numpy.ndarray
+        boolean array indexed by node position
+    neighbor_sum : numpy.ndarray
+        sum of the positions of the neighbours of each node
+    n_nodes : int
+        number of nodes
+
+    Returns
+    -------
+    root : numpy.ndarray
+        position of the first pair of the chain of each pair, -1 for pairs
+        which are not part of a chain
+    depth : numpy.ndarray
+        position of each pair in its chain
+    nxt : numpy.ndarray
+        position of the next pair in the chain, -1 for the last pair
+    """
+    n_pairs = len(pair_u)
+    pair_codes = pair_u * n_nodes + pair_v
+
+    # the next pair continues through v towards its other neighbour
+    nxt = np.full(n_pairs, -1)
+    interstitial = np.flatnonzero(~is_endpoint[pair_v])
+    other = neighbor_sum[pair_v[interstitial]] - pair_u[interstitial]
+    target = pair_v[interstitial] * n_nodes + other
+    found = np.searchsorted(pair_codes, target)
+    found[found == n_pairs] = 0
+    exists = pair_codes[found] == target
+    nxt[interstitial[exists]] = found[exists]
+
+    # every pair has at most one previous pair
+    prev = np.full(n_pairs, -1)
+    prev[nxt[nxt >= 0]] = np.flatnonzero(nxt >= 0)
+
+    pointer = np.where(prev >= 0, prev, np.arange(n_pairs))
+    depth = (prev >= 0).astype(np.int64)
+    for _ in range(int(np.ceil(np.log2(max(n_pairs, 2)))) + 1):
+        depth = depth + depth[pointer]
+        pointer = pointer[pointer]
+
+    # pairs in rings without endpoints never reach a pair without a
+    # previous pair, and chains not starting at an endpoint are never walked
+    is_start = (prev == -1) & is_endpoint[pair_u] & ~is_endpoint[pair_v]
+    root = np.where(is_start[pointer] & (prev[pointer] == -1), pointer, -1)
+
+    return root, depth, nxt
+
+
+# New function
+def _new_edge_keys(u, v, keys, new_u, new_v):
+    """
+    Find the keys NetworkX would give to new edges added to a MultiDiGraph.
+
+    Parameters
+    ----------
+    u, v, keys : numpy.ndarray
+        start node, end node and key of the existing edges
+    new_u, new_v : numpy.ndarray
+        start node and end node of the new edges, in the order they are added
+
+    Returns
+    -------
+    new_keys : numpy.ndarray
+    """
+    existing = pd.DataFrame({"u": u, "v": v, "key": keys})
+    groups = existing.groupby(["u", "v"])["key"].agg(["size", "max"])
+
+    new = pd.DataFrame({"u": new_u, "v": new_v})
+    index = pd.MultiIndex.from_arrays([new_u, new_v])
+    n_existing = groups["size"].reindex(index).fillna(0).to_numpy(np.int64)
+    new_keys = n_existing + new.groupby(["u", "v"]).cumcount().to_numpy()
+
+    # if the existing keys are not 0, 1, ..., n-1, NetworkX skips the keys
+    # already in use
+    gaps = groups.index[groups["max"] != groups["size"] - 1]
+    if len(gaps) > 0:
+        used = {uv: set(k) for uv, k in existing.set_index(["u", "v"])
+                .loc[gaps].groupby(level=[0, 1])["key"]}
+        for i in np.flatnonzero(index.isin(gaps)):
+            uv = (new_u[i], new_v[i])
+            key = len(used[uv])
+            while key in used[uv]:
+                key += 1
+            used[uv].add(key)
+            new_keys[i] = key
+
+    return new_keys
+
+
+# New function
+def _simplify_edge_table(nodes, edges, attributes=None, strict=True,
+                         remove_rings=True, present=None, missing=np.nan):
+    """
+    Array based topological simplification of an edge table.
+
+    Finds the same paths as _get_paths_to_simplify and builds the same
+    consolidated edges as simplify_graph, without walking the graph.
+
+    Parameters
+    ----------
+    nodes : pandas.DataFrame
+        nodes indexed by node id, with x and y columns
+    edges : pandas.DataFrame
+        edges with u, v and key columns and a column for each attribute
+    attributes : list
+        key of the attributes we should discriminate
+    strict : bool
+        if False, allow nodes to be end points even if they fail all other
+        rules but have edges with different OSM IDs
+    remove_rings : bool
+        if True, remove isolated self-contained rings that have no endpoints
+    present : pandas.DataFrame
+        boolean table with a row for each edge and a column for each
+        attribute, True where the edge has the attribute. Values of edges
+        without the attribute are not consolidated, like attributes missing
+        from the edge data in simplify_graph. If None, null values are
+        treated as missing.
+    missing : object
+        value of the attributes of new edges where the attribute is missing
+        on all edges of the path
+
+    Returns
+    -------
+    keep_nodes : numpy.ndarray
+        boolean array, True for the nodes kept in the simplified graph
+    keep_edges : numpy.ndarray
+        boolean array, True for the edges kept in the simplified graph
+    new_edges : pandas.DataFrame
+        the consolidated edges, with u, v and key columns, a column for each
+        attribute and a geometry column with the geometry of the path
+    """
+    # define edge segment attributes to sum upon edge simplification
+    attrs_to_sum = {"length", "travel_time"}
+
+    n_nodes = len(nodes)
+    node_index = pd.Index(nodes.index)
+    u = node_index.get_indexer(edges["u"])
+    v = node_index.get_indexer(edges["v"])
+    keys = edges["key"].to_numpy()
+    attr_cols = [c for c in edges.columns if c not in ("u", "v", "key",
+                                                       "geometry")]
+
+    # one edge for each directed pair of nodes, the one with the lowest key
+    order = np.lexsort((keys, v, u))
+    codes = u[order] * n_nodes + v[order]
+    first = np.ones(len(codes), dtype=bool)
+    first[1:] = codes[1:] != codes[:-1]
+    rep = order[first]
+    pair_u, pair_v = u[rep], v[rep]
+
+    if attributes is not None and not isinstance(attributes, list):
+        attributes = [attributes]
+    edge_values = None
+    if attributes is not None:
+        edge_values = edges.reindex(columns=attributes).to_numpy(dtype=object)
+    osmid = None
+    if not strict:
+        # graphs without edges have no osmid column
+        osmid = edges["osmid"].to_numpy() if len(edges) > 0 \
+            else np.empty(0, dtype=object)
+
+    # classify the nodes once, for finding the paths and removing rings
+    is_topological_endpoint = _topological_endpoint_mask(u, v, n_nodes)
+    is_endpoint = _endpoint_mask(
+        u, v, n_nodes, rep=rep, edge_values=edge_values, osmid=osmid,
+        strict=strict, is_topological_endpoint=is_topological_endpoint)
+    _, neighbor_sum = _neighbor_counts(u, v, n_nodes)
+
+    root, depth, nxt = _chain_states(pair_u, pair_v, is_endpoint,
+                                     neighbor_sum, n_nodes)
+
+    # order the chains like simplify_graph adds them to the graph, and each
+    # chain from its first to its last pair
+    in_chain = np.flatnonzero(root >= 0)
+    in_chain = in_chain[np.lexsort((depth[in_chain], rep[root[in_chain]]))]
+    chain_start = root[in_chain]
+    is_first = np.ones(len(in_chain), dtype=bool)
+    is_first[1:] = chain_start[1:] != chain_start[:-1]
+    chain = np.cumsum(is_first) - 1
+    is_last = nxt[in_chain] == -1
+
+    # consolidate the attribute values of the pairs in each chain, like
+    # simplify_graph: values are summed, or kept if there is only one
+    # unique value, or else kept as a list of the unique values. Null values
+    # count as values, but attributes missing on an edge are skipped
+    if present is None:
+        present = edges[attr_cols].notna()
+    path_values = edges[attr_cols].iloc[rep[in_chain]].reset_index(drop=True)
+    path_present = present[attr_cols].iloc[rep[in_chain]].to_numpy(dtype=bool)
+    n_chains = is_first.sum()
+    new_edges = pd.DataFrame(index=np.arange(n_chains))
+    for i, attr in enumerate(attr_cols):
+        values = path_values[attr][path_present[:, i]]
+        value_chain = chain[path_present[:, i]]
+        if attr in attrs_to_sum:
+            consolidated = pd.to_numeric(values).groupby(value_chain).sum()
+        else:
+            grouped = values.groupby(value_chain)
+            is_chain_first = np.ones(len(value_chain), dtype=bool)
+            is_chain_first[1:] = value_chain[1:] != value_chain[:-1]
+            consolidated = pd.Series(
+                values.to_numpy(dtype=object)[is_chain_first],
+                index=value_chain[is_chain_first], dtype=object)
+            # the unique values of chains with nulls are found like in
+            # simplify_graph, since None and NaN are different values there
+            n_unique = grouped.nunique(dropna=False)
+            has_null = values.isna().groupby(value_chain).any()
+            python_chains = n_unique.index[(n_unique > 1) | has_null]
+            if len(python_chains) > 0:
+                in_python = np.isin(value_chain, python_chains)
+                consolidated[python_chains] = values[in_python] \
+                    .groupby(value_chain[in_python]) \
+                    .agg(lambda x: x.iloc[0] if len(set(x)) == 1
+                         else list(set(x)))
+        consolidated = consolidated.reindex(np.arange(n_chains))
+        absent = np.setdiff1d(np.arange(n_chains), value_chain)
+        if len(absent) > 0 and missing is not np.nan:
+            consolidated = consolidated.astype(object)
+            consolidated.iloc[absent] = [missing] * len(absent)
+        new_edges[attr] = consolidated.to_numpy()
+
+    # the geometry of each chain goes through all the nodes of the path
+    path_nodes = np.concatenate([pair_u[in_chain[is_first]],
+                                 pair_v[in_chain]])
+    path_chain = np.concatenate([chain[is_first], chain])
+    path_order = np.argsort(path_chain, kind="stable")
+    coords = np.column_stack([nodes["x"].to_numpy(),
+                              nodes["y"].to_numpy()])[path_nodes[path_order]]
+    new_edges["geometry"] = shapely.linestrings(
+        coords, indices=path_chain[path_order])
+
+    new_u = pair_u[in_chain[is_first]]
+    new_v = pair_v[in_chain[is_last]]
+
+    new_keys = _new_edge_keys(u, v, keys, new_u, new_v)
+
+    # remove the interstitial nodes and all edges to them
+    keep_nodes = np.ones(n_nodes, dtype=bool)
+    keep_nodes[pair_v[in_chain[~is_last]]] = False
+    keep_edges = keep_nodes[u] & keep_nodes[v]
+    keep_new = keep_nodes[new_u] & keep_nodes[new_v]
+
+    if remove_rings:
+        # remove any connected components that form a self-contained ring
+        # without any endpoints
+        all_u = np.concatenate([u[keep_edges], new_u[keep_new]])
+        all_v = np.concatenate([v[keep_edges], new_v[keep_new]])
+
+        # only the nodes at the ends of the simplified paths get new edges,
+        # so only these nodes are classified again
+        changed = np.zeros(n_nodes, dtype=bool)
+        changed[new_u] = True
+        changed[new_v] = True
+        incident = changed[all_u] | changed[all_v]
+        ring_endpoint = is_topological_endpoint
+        ring_endpoint[changed] = _topological_endpoint_mask(
+            all_u[incident], all_v[incident], n_nodes)[changed]
+        adjacency = coo_matrix((np.ones(len(all_u)), (all_u, all_v)),
+                               shape=(n_nodes, n_nodes))
+        _, component = connected_components(adjacency, directed=True,
+                                            connection="weak")
+        has_endpoint = np.zeros(component.max() + 1 if n_nodes else 0,
+                                dtype=bool)
+        has_endpoint[component[ring_endpoint & keep_nodes]] = True
+        keep_nodes &= has_endpoint[component]
+        keep_edges &= keep_nodes[u]
+        keep_new &= keep_nodes[new_u]
+
+    new_edges.insert(0, "u", nodes.index.to_numpy()[new_u])
+    new_edges.insert(1, "v", nodes.index.to_numpy()[new_v])
+    new_edges.insert(2, "key", new_keys)
+
+    return keep_nodes, keep_edges, new_edges[keep_new].reset_index(drop=True)
+
+
+# New function
+def _simplify_edge_table_parallel(nodes, edges, attributes=None, strict=True,
+                                  remove_rings=True, present=None,
+                                  missing=np.nan, n_jobs=1):
+    """
+    Run _simplify_edge_table for groups of weakly connected components in
+    a process pool.
+
+    Paths to simplify never cross components, so each component can be
+    simplified on its own. Components are grouped into batches with about
+    the same number of edges, to avoid sending thousands of small
+    components to the pool one by one. The keys of the new edges only
+    depend on the edges between the same nodes, so they are also unique in
+    the combined result.
+
+    Parameters
+    ----------
+    nodes : pandas.DataFrame
+        nodes indexed by node id, with x and y columns
+    edges : pandas.DataFrame
+        edges with u, v and key columns and a column for each attribute
+    attributes : list
+        key of the attributes we should discriminate
+    strict : bool
+        if False, allow nodes to be end points even if they fail all other
+        rules but have edges with different OSM IDs
+    remove_rings : bool
+        if True, remove isolated self-contained rings that have no endpoints
+    present : pandas.DataFrame
+        attributes present on each edge, see _simplify_edge_table
+    missing : object
+        value of attributes missing on all edges of a path
+    n_jobs : int
+        number of processes, -1 uses all CPUs
+
+    Returns
+    -------
+    keep_nodes, keep_edges, new_edges : tuple
+        same as _simplify_edge_table
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    if n_jobs <= 1:
+        return _simplify_edge_table(nodes, edges, attributes=attributes,
+                                    strict=strict, remove_rings=remove_rings,
+                                    present=present, missing=missing)
+
+    n_nodes = len(nodes)
+    node_index = pd.Index(nodes.index)
+    u = node_index.get_indexer(edges["u"])
+    v = node_index.get_indexer(edges["v"])
+
+    # label the weakly connected components
+    adjacency = coo_matrix((np.ones(len(u)), (u, v)),
+                           shape=(n_nodes, n_nodes))
+    _, component = connected_components(adjacency, directed=True,
+                                        connection="weak")
+
+    # assign the components to batches with about the same number of edges
+    n_batches = n_jobs * 4
+    component_edges = np.bincount(component[u], minlength=component.max() + 1)
+    cumulative_edges = np.cumsum(component_edges) - component_edges
+    component_batch = np.minimum(
+        cumulative_edges * n_batches // max(len(u), 1), n_batches - 1)
+    node_batch = component_batch[component]
+    edge_batch = node_batch[u]
+
+    batches = []
+    for batch in range(n_batches):
+        node_pos = np.flatnonzero(node_batch == batch)
+        edge_pos = np.flatnonzero(edge_batch == batch)
+        if len(node_pos) > 0:
+            batches.append((node_pos, edge_pos))
+
+    keep_nodes = np.ones(n_nodes, dtype=bool)
+    keep_edges = np.ones(len(edges), dtype=bool)
+    new_edges = []
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = [
+            executor.submit(_simplify_edge_table,
+                            nodes[["x", "y"]].iloc[node_pos],
+                            edges.iloc[edge_pos], attributes=attributes,
+                            strict=strict, remove_rings=remove_rings,
+                            present=None if present is None
+                            else present.iloc[edge_pos],
+                            missing=missing)
+            for node_pos, edge_pos in batches]
+        for (node_pos, edge_pos), future in zip(batches, futures):
+            batch_keep_nodes, batch_keep_edges, batch_new_edges = \
+                future.result()
+            keep_nodes[node_pos] = batch_keep_nodes
+            keep_edges[edge_pos] = batch_keep_edges
+            new_edges.append(batch_new_edges)
+
+    return keep_nodes, keep_edges, pd.concat(new_edges, ignore_index=True)
+
+
+# New function
+def simplify_edges(nodes, edges, attributes=None, strict=True,
+                   remove_rings=True, n_jobs=1):
+    """
+    Simplify the topology of a network in OSMnx format by removing
+    interstitial nodes, working directly on the node and edge tables.
+
+    Gives the same simplified edges as simplify_graph, but endpoints are
+    classified for all nodes at once and the paths between endpoints are
+    found with array operations, which is much faster for large networks.
+
+    Parameters
+    ----------
+    nodes : geopandas.GeoDataFrame
+        nodes indexed by osmid, with x and y columns
+    edges : geopandas.GeoDataFrame
+        edges with a (u, v, key) multiindex
+    attributes : list
+        key of the attributes we should discriminate
+    strict : bool
+        if False, allow nodes to be end points even if they fail all other
+        rules but have incident edges with different OSM IDs
+    remove_rings : bool
+        if True, remove isolated self-contained rings that have no endpoints
+    n_jobs : int
+        number of processes. If more than 1, the weakly connected components
+        are simplified in parallel. -1 uses all CPUs.
+
+    Returns
+    -------
+    nodes, edges : tuple
+        simplified nodes and edges. The edges have a (u, v, key) multiindex
+        and a new geometry for each simplified edge.
+    """
+    edge_table = edges.reset_index()
+    if "geometry" in edge_table.columns:
+        edge_table = pd.DataFrame(edge_table)
+
+    keep_nodes, keep_edges, new_edges = _simplify_edge_table_parallel(
+        nodes, edge_table, attributes=attributes, strict=strict,
+        remove_rings=remove_rings, n_jobs=n_jobs)
+
+    simplified_edges = pd.concat([edge_table[keep_edges], new_edges],
+                                 ignore_index=True)
+    simplified_edges = gpd.GeoDataFrame(
+        simplified_edges.set_index(["u", "v", "key"]),
+        geometry="geometry", crs=getattr(nodes, "crs", None))
+
+    return nodes[keep_nodes], simplified_edges
+
+
+# New function
+def _simplify_graph_array(G, attributes=None, strict=True, remove_rings=True,
+                          n_jobs=1):
+    """
+    Simplify a graph with the array based engine used by simplify_edges.
+
+    Parameters
+    ----------
+    G : networkx.MultiDiGraph
+        input graph
+    attributes : list
+        key of the attributes we should discriminate
+    strict : bool
+        if False, allow nodes to be end points even if they fail all other
+        rules but have incident edges with different OSM IDs
+    remove_rings : bool
+        if True, remove isolated self-contained rings that have no endpoints
+    n_jobs : int
+        number of processes used for simplifying the weakly connected
+        components in parallel
+
+    Returns
+    -------
+    G : networkx.MultiDiGraph
+        topologically simplified graph
+    """
+    node_ids = list(G.nodes)
+    nodes = pd.DataFrame(
+        {"x": [d["x"] for _, d in G.nodes(data=True)],
+         "y": [d["y"] for _, d in G.nodes(data=True)]},
+        index=node_ids)
+
+    edge_list = list(G.edges(keys=True, data=True))
+    edge_table = pd.DataFrame([d for _, _, _, d in edge_list], dtype=object,
+                              index=np.arange(len(edge_list)))
+    # attributes can be missing from the data of some edges, which is not
+    # the same as having a null value. Only edges with more attributes than
+    # non-null values have null values
+    present = edge_table.notna()
+    n_attributes = np.fromiter((len(d) for _, _, _, d in edge_list),
+                               dtype=np.int64, count=len(edge_list))
+    with_nulls = np.flatnonzero(n_attributes > present.sum(axis=1).to_numpy())
+    if len(with_nulls) > 0:
+        present.iloc[with_nulls] = [
+            [c in edge_list[i][3] for c in edge_table.columns]
+            for i in with_nulls]
+    edge_table["u"] = [e[0] for e in edge_list]
+    edge_table["v"] = [e[1] for e in edge_list]
+    edge_table["key"] = np.array([e[2] for e in edge_list], dtype=np.int64)
+
+    keep_nodes, keep_edges, new_edges = _simplify_edge_table_parallel(
+        nodes, edge_table, attributes=attributes, strict=strict,
+        remove_rings=remove_rings, present=present, missing=_MISSING,
+        n_jobs=n_jobs)
+
+    H = G.__class__()
+    H.graph.update(G.graph)
+    H.add_nodes_from((n, G.nodes[n].copy())
+                     for n, keep in zip(node_ids, keep_nodes) if keep)
+    H.add_edges_from((u, v, k, d.copy())
+                     for (u, v, k, d), keep in zip(edge_list, keep_edges)
+                     if keep)
+
+    # attributes missing on all edges of a path are not added, as in
+    # simplify_graph
+    attr_cols = [c for c in new_edges.columns if c not in ("u", "v", "key")]
+    values = new_edges[attr_cols].to_numpy(dtype=object)
+    H.add_edges_from(
+        (u, v, k, {a: val for a, val in zip(attr_cols, row)
+                   if val is not _MISSING})
+        for u, v, k, row in zip(new_edges["u"].tolist(),
+                                new_edges["v"].tolist(),
+                                new_edges["key"].tolist(), values))
+
+    return H
@@ -8,11 +8,18 @@ import numpy as np
 import matplotlib.pyplot as plt
 from shapely.geometry import LineString, Polygon, Point, MultiLineString
 import math
+from h3 import h3_to_parent
 
 from src import evaluation_functions as ef
 
 from src import matching_functions as mf
 from src import graph_functions as gf
+from src import h3_functions as hf
+from src import cache_functions as cf
+from src import simplification_functions as sf
+from src import io_functions as iof
+from src import parquet_functions as pqf
+from src import schema_functions as schf
 
 #%%
 ###################### TESTS FOR EVALUATION FUNCTIONS #############################
@@ -29,6 +36,18 @@ assert len(grid) == (10 * 10) - (2 * 2)
 assert len(grid.geom_type.unique()) == 1
 assert grid.geom_type.unique()[0] == "Polygon"
 assert grid.loc[0, "geometry"].area == 1
+assert grid.grid_id.to_list() == list(range(len(grid)))
+
+# Test create_grid_geometry with cells on the border of the area
+poly = Polygon([(0, 0), (0, 10), (10, 0)])
+gdf = gpd.GeoDataFrame(geometry=[poly], crs="EPSG:25832")
+grid = ef.create_grid_geometry(gdf, 3)
+
+assert grid.crs == gdf.crs
+assert grid.geom_type.unique().tolist() == ["Polygon"]
+assert round(grid.area.sum(), 6) == poly.area
+assert grid.area.max() == 9
+assert grid.within(poly.buffer(1e-9)).all()
 
 
 # Test simplify bicycle tags
@@ -148,6 +167,33 @@ assert edges.loc[3, "infrastructure_length"] == edges.loc[3, "length"] * 2
 assert pd.isnull(edges.loc[4, "infrastructure_length"]) == True
 
 
+# Test compute_infrastructure_length
+infra_length, missing_count = ef.compute_infrastructure_length(
+    edges.geometry,
+    geometry_type=edges.cycling_geometries,
+    bidirectional=edges.cycling_bidirectional,
+    bicycle_infrastructure=edges.cycling_infrastructure,
+)
+
+assert missing_count == 0
+assert list(infra_length[0:4]) == edges.infrastructure_length.to_list()[0:4]
+assert np.isnan(infra_length[4])
+
+# Dataset-wide values and missing information
+edges.loc[1, "cycling_bidirectional"] = None
+infra_length, missing_count = ef.compute_infrastructure_length(
+    edges.geometry,
+    geometry_type="centerline",
+    bidirectional=edges.cycling_bidirectional,
+    bicycle_infrastructure="yes",
+)
+
+assert missing_count == 1
+assert np.isnan(infra_length[1])
+assert infra_length[0] == edges.loc[0, "length"] * 2
+assert infra_length[4] == edges.loc[4, "length"]
+
+
 # Test define_protected_unprotected
 l1 = LineString([[1, 1], [10, 10]])
 l2 = LineString([[2, 1], [6, 10]])
@@ -224,9 +270,12 @@ points_joined = gpd.overlay(points, grid, how="intersection")
 
 test_count = ef.count_features_in_grid(points_joined, "points")
 
-assert test_count.loc[0, "count_points"] == 2
-assert test_count.loc[18, "count_points"] == 2
-assert test_count.loc[28, "count_points"] == 1
+# Grid ids are arbitrary - look up the cells by location
+for x, y, count in [(0.5, 3.5, 2), (6.5, 8.5, 2), (9.5, 3.5, 1)]:
+    grid_id = grid.loc[grid.contains(Point(x, y)), "grid_id"].values[0]
+    assert test_count.loc[test_count.grid_id == grid_id, "count_points"].values[0] == count
+
+assert test_count.count_points.sum() == len(points_joined)
 
 
 # Test length features in grid
@@ -276,6 +325,111 @@ test_length = ef.length_of_features_in_grid(lines_joined, "lines")
 assert round(test_length.loc[0, "length_lines"], 2) == 1.41
 assert round(test_length.loc[1, "length_lines"], 2) == 2.83
 
+# Test aggregate_grid_metrics
+lines_joined["infrastructure_length"] = lines_joined.geometry.length * 2
+points_joined["degree"] = 1
+points_joined.loc[0, "degree"] = 3
+
+test_metrics = ef.aggregate_grid_metrics(
+    [
+        (lines_joined, "lines", ["count", "length", "infrastructure_length"]),
+        (points_joined, "points", ["count", "ave_degree"]),
+    ]
+)
+
+assert test_metrics.columns.to_list() == [
+    "grid_id",
+    "count_lines",
+    "length_lines",
+    "infrastructure_length_lines",
+    "count_points",
+    "points_ave_degree",
+]
+assert test_metrics.grid_id.is_unique
+assert round(test_metrics.length_lines.sum(), 2) == round(
+    lines_joined.geometry.length.sum(), 2
+)
+assert round(test_metrics.infrastructure_length_lines.sum(), 2) == round(
+    2 * lines_joined.geometry.length.sum(), 2
+)
+assert test_metrics.count_points.sum() == len(points_joined)
+assert (
+    test_metrics.loc[test_metrics.grid_id == points_joined.loc[0, "grid_id"]]
+    .points_ave_degree.values[0]
+    > 1
+)
+
+
+# Test merge_results
+grid_merged = ef.merge_results(grid.copy(), test_metrics[["grid_id", "count_lines"]], "left")
+assert len(grid_merged) == len(grid)
+assert grid_merged.count_lines.sum() == test_metrics.count_lines.sum()
+assert grid_merged.count_lines.isnull().sum() == len(grid) - test_metrics.count_lines.notnull().sum()
+
+grid_inner = ef.merge_results(grid.copy(), test_metrics[["grid_id", "count_lines"]].dropna(), "inner")
+assert len(grid_inner) == test_metrics.count_lines.notnull().sum()
+
+
+# Test save_grid_results and load_grid_results
+grid_fp = "../tests/test_data/grid_results_test.parquet"
+ef.save_grid_results(grid_merged, grid_fp)
+grid_loaded = ef.load_grid_results(grid_fp, columns=["count_lines"])
+os.remove(grid_fp)
+
+assert grid_loaded.columns.to_list() == ["grid_id", "geometry", "count_lines"]
+assert grid_loaded.count_lines.sum() == grid_merged.count_lines.sum()
+assert grid_loaded.geometry.equals(grid_merged.geometry)
+
+# The input grid is not changed by merge_results
+grid_input = grid.copy()
+grid_input["count_lines"] = -1
+grid_merged = ef.merge_results(grid_input, test_metrics[["grid_id", "count_lines"]], "left")
+assert (grid_input.count_lines == -1).all()
+assert grid_merged.count_lines.sum() == test_metrics.count_lines.sum()
+# Existing columns are not copied
+assert np.shares_memory(grid_merged.grid_id.to_numpy(), grid_input.grid_id.to_numpy())
+
+# Columns with lists and empty cells
+grid_merged["component_ids_osm"] = None
+grid_merged.at[grid_merged.index[0], "component_ids_osm"] = [1, 2]
+grid_merged.at[grid_merged.index[1], "component_ids_osm"] = [3]
+grid_merged.fillna(value={"component_ids_osm": ""}, inplace=True)
+assert grid_merged.component_ids_osm.to_list()[2] == ""
+
+ef.save_grid_results(grid_merged, grid_fp)
+grid_loaded = ef.load_grid_results(grid_fp, columns=["component_ids_osm"], geometry=False)
+os.remove(grid_fp)
+
+assert not isinstance(grid_loaded, gpd.GeoDataFrame)
+assert grid_loaded.columns.to_list() == ["grid_id", "component_ids_osm"]
+assert grid_loaded.component_ids_osm.to_list()[:3] == [[1, 2], [3], []]
+assert grid_loaded.component_ids_osm.apply(len).sum() == 3
+assert grid_merged.component_ids_osm.to_list()[2] == ""
+
+
+# Test compute_alpha_beta_gamma_grid
+edges = pd.DataFrame(
+    {"u": [1, 2, 3, 5], "v": [2, 3, 1, 6], "grid_id": [1, 1, 1, 2]}
+)
+nodes = pd.DataFrame(
+    {"osmid": [1, 2, 3, 4, 5, 6, 1], "grid_id": [1, 1, 1, 1, 2, 2, 2]}
+)
+
+abg = ef.compute_alpha_beta_gamma_grid(edges, nodes)
+
+assert abg.grid_id.to_list() == [1, 2]
+assert round(abg.loc[0, "alpha"], 3) == round(1 / 3, 3)
+assert abg.loc[0, "beta"] == 0.75
+assert abg.loc[0, "gamma"] == 0.5
+assert abg.loc[1, "alpha"] == 0
+assert round(abg.loc[1, "beta"], 3) == round(1 / 3, 3)
+assert round(abg.loc[1, "gamma"], 3) == round(1 / 3, 3)
+
+abg = ef.compute_alpha_beta_gamma_grid(edges, nodes.iloc[0:6], prefix="osm")
+assert abg.columns.to_list() == ["grid_id", "osm_alpha", "osm_beta", "osm_gamma"]
+assert np.isnan(abg.loc[1, "osm_alpha"])
+assert abg.loc[1, "osm_beta"] == 0.5
+
 
 # Test compute_network_density
 G = nx.MultiDiGraph()
@@ -507,6 +661,35 @@ dict = {
 incomp_tags_results = ef.check_incompatible_tags(edges, dict)
 assert incomp_tags_results["cycling/car"] == 1
 
+# Test compute_incompatible_tags
+edges["bicycle"] = ["no", "dismount", None, "dismount", "no"]
+edges["edge_id"] = [10, 11, 12, 13, 14]
+edges["grid_id"] = [1, 1, 2, 2, 3]
+
+incomp_tags_mask = ef.incompatible_tags_mask(edges, dict)
+assert list(incomp_tags_mask.columns) == ["cycling/bicycle", "cycling/car"]
+assert incomp_tags_mask["cycling/bicycle"].to_list() == [
+    True,
+    False,
+    False,
+    True,
+    False,
+]
+
+incomp_tags_results, incomp_tags_grid = ef.compute_incompatible_tags(
+    edges, dict, grid_edges=edges
+)
+assert incomp_tags_results == {"cycling/bicycle": 2, "cycling/car": 1}
+assert incomp_tags_grid.grid_id.to_list() == [1, 2, 3]
+assert incomp_tags_grid["incompatible_tags_cycling/bicycle"].to_list() == [1, 1, 0]
+assert incomp_tags_grid["incompatible_tags_cycling/car"].to_list() == [0, 1, 0]
+
+incomp_tags_ids, incomp_tags_grid = ef.compute_incompatible_tags(
+    edges, dict, store_edge_ids=True
+)
+assert incomp_tags_ids == {"cycling/bicycle": [10, 13], "cycling/car": [13]}
+assert incomp_tags_grid is None
+
 
 # Test existing tags
 l1 = LineString([[1, 1], [10, 10]])
@@ -562,6 +745,33 @@ assert round(existing_tags_results["surface"]["length"]) == 13
 assert existing_tags_results["width"]["count"] == 4
 assert round(existing_tags_results["width"]["length"]) == 35
 
+# Test compute_existing_tags
+existing_tags_mask = ef.existing_tags_mask(edges, dict)
+assert list(existing_tags_mask.columns) == ["surface", "width", "speedlimit", "lit"]
+assert existing_tags_mask["width"].to_list() == [True, True, True, True, False]
+assert existing_tags_mask["lit"].sum() == 0
+
+existing_tags_results = ef.compute_existing_tags(edges, dict)
+assert existing_tags_results["surface"]["count"] == 1
+assert round(existing_tags_results["surface"]["length"]) == 13
+assert existing_tags_results["width"]["count"] == 4
+assert round(existing_tags_results["width"]["length"]) == round(
+    edges.geometry.length[0:4].sum()
+)
+
+# Test compute_existing_tags_grid
+edges["grid_id"] = [1, 1, 2, 2, 3]
+existing_tags_grid = ef.compute_existing_tags_grid(edges, dict)
+assert existing_tags_grid.grid_id.to_list() == [1, 2, 3]
+assert existing_tags_grid["existing_tags_width_count"].to_list() == [2, 2, 0]
+assert existing_tags_grid["existing_tags_surface_count"].to_list() == [1, 0, 0]
+assert round(existing_tags_grid.loc[0, "existing_tags_width_length"]) == round(
+    edges.geometry.length[0:2].sum()
+)
+assert existing_tags_grid[
+    "existing_tags_width_count"
+].sum() == existing_tags_mask["width"].sum()
+
 
 # Test return components
 G = nx.MultiDiGraph()
@@ -696,6 +906,31 @@ assert adj_comps[0]["osmid_left"] in [9, 7]
 assert adj_comps[0]["osmid_right"] in [9, 7]
 assert len(adj_comps) == 1
 
+adj_comps_dn = ef.find_adjacent_components(
+    components,
+    edge_id="osmid",
+    buffer_dist=5,
+    crs="EPSG:25832",
+    method="dangling_nodes",
+)
+
+# Node 11 is a dangling node within 5 meters of edge 7 and (exactly) 5 meters from edge 6
+assert len(adj_comps_dn) == 2
+assert set(r["osmid_left"] for r in adj_comps_dn.values()) == {9}
+assert set(r["osmid_right"] for r in adj_comps_dn.values()) == {6, 7}
+for r in adj_comps_dn.values():
+    assert r["component_left"] != r["component_right"]
+    assert r["geometry"].distance(Point(53, 55)) <= 2.5
+
+adj_comps_dn = ef.find_adjacent_components(
+    components,
+    edge_id="osmid",
+    buffer_dist=1,
+    crs="EPSG:25832",
+    method="dangling_nodes",
+)
+assert len(adj_comps_dn) == 0
+
 
 # Test assign_component_id
 G = nx.MultiDiGraph()
@@ -923,6 +1158,19 @@ assert overshoots_5["v"].values[0] == 5
 assert overshoots_5["u"].values[1] == 3
 assert overshoots_5["v"].values[1] == 4
 
+# Test find_overshoots_sweep
+edges = edges.drop(columns=["u", "v"])
+endpoint_degrees = ef.get_endpoint_degrees(edges)
+assert endpoint_degrees.loc[(2, 3, 0), "degree_u"] == 3
+assert endpoint_degrees.loc[(2, 3, 0), "degree_v"] == 2
+
+sweep = ef.find_overshoots_sweep(edges, [5, 2, 1, 20], endpoint_degrees)
+assert sweep.index.to_list() == [1, 2, 5, 20]
+assert sweep["count"].to_list() == [0, 1, 2, 3]
+assert sweep.loc[2, "edge_ix"] == overshoots_2.index.to_list()
+assert set(sweep.loc[5, "edge_ix"]) == set(overshoots_5.index)
+assert "u" not in edges.columns
+
 
 # Test find_undershoots function
 G = nx.MultiDiGraph()  # construct the graph
@@ -1317,6 +1565,46 @@ assert nodes.index.name == "osmid"
 assert edges.index.names == ["u", "v", "key"]
 
 
+# Test create osmnx gdfs function
+lines = [
+    LineString([[0, 0], [10, 0]]),
+    LineString([[10, 0], [10, 10]]),
+    LineString([[0, 0], [0, 5], [10, 0]]),
+    LineString([[10.01, 10], [20, 10]]),
+]
+test_data = gpd.GeoDataFrame({"edge_id": [1, 2, 3, 4]}, geometry=lines, crs="EPSG:25832")
+
+nodes, edges = gf.create_osmnx_gdfs(test_data)
+
+assert len(nodes) == 5
+assert nodes.index.name == "osmid"
+assert nodes.index.to_list() == nodes.nodeID.to_list()
+assert edges.index.to_list() == [(0, 1, 0), (0, 1, 1), (1, 2, 0), (3, 4, 0)]
+assert edges.edge_id.to_list() == [1, 3, 2, 4]
+assert edges.length.to_list() == edges.geometry.length.to_list()
+assert "node_start" not in test_data.columns
+
+nodes, edges = gf.create_osmnx_gdfs(test_data, snap_tolerance=0.1)
+
+assert len(nodes) == 4
+assert edges.index.to_list()[-1] == (2, 3, 0)
+assert nodes.loc[2, "x"] == 10
+
+# End points on either side of a rounding boundary are also joined
+lines = [
+    LineString([[0, 0], [10.049, 0]]),
+    LineString([[10.051, 0], [20, 0]]),
+    LineString([[20.3, 0], [30, 0]]),
+]
+test_data = gpd.GeoDataFrame({"edge_id": [1, 2, 3]}, geometry=lines, crs="EPSG:25832")
+
+nodes, edges = gf.create_osmnx_gdfs(test_data, snap_tolerance=0.1)
+
+assert len(nodes) == 5
+assert edges.index.to_list() == [(0, 1, 0), (1, 2, 0), (3, 4, 0)]
+assert nodes.loc[1, "x"] == 10.049
+
+
 # Test for unzip_linestrings
 
 l1 = LineString([[1, 1], [5, 5], [10, 10], [15, 15]])
@@ -1359,6 +1647,20 @@ assert test.loc[0, "geometry"] == LineString([[1, 1], [5, 5]])
 assert test.loc[2, "geometry"] == LineString([[10, 10], [15, 15]])
 assert test.loc[6, "geometry"] == LineString([[10, 20], [52, 47]])
 
+# Test that no segments are created across gaps in MultiLineStrings
+org_gdf.loc[3] = [
+    "tertiary",
+    4,
+    MultiLineString([[[0, 0], [0, 1]], [[5, 5], [5, 6], [6, 6]]]),
+]
+
+test = gf.unzip_linestrings(org_gdf, "edge_id")
+
+assert len(test) == 10
+assert test.edge_id.to_list()[-3:] == [4, 4, 4]
+assert test.geometry.length.to_list()[-3:] == [1, 1, 1]
+assert test.new_edge_id.to_list() == list(range(10))
+
 
 # Test find_parallel_edges
 l1 = LineString([[1, 1], [10, 10]])
@@ -1447,5 +1749,649 @@ assert k[-3] == 1
 
 assert len(edges) == len(edges_test)
 
+# Test that (u,v) is treated as equal to (v,u) for undirected edges
+edges = gpd.GeoDataFrame(d)
+
+edges_test = gf.find_parallel_edges(edges, directed=False)
+
+assert list(edges_test["key"].values) == [0, 0, 0, 0, 1, 1, 2]
+assert len(edges_test[edges_test.duplicated(subset=["u", "v", "key"])]) == 0
+
+
+# Test save_graph_parquet and load_graph_parquet
+import tempfile
+
+test_data = gpd.read_file("../tests/test_data/osm_small_test.gpkg")
+test_graph = gf.create_osmnx_graph(test_data)
+
+test_edges = list(test_graph.edges(keys=True))
+test_graph.edges[test_edges[0]]["osmid"] = [1, 2]
+test_graph.edges[test_edges[1]]["lanes"] = 2
+test_graph.edges[test_edges[2]]["oneway"] = True
+test_graph.graph["simplified"] = True
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+
+    gf.save_graph_parquet(test_graph, tmp_dir + "/graph/")
+    loaded_graph = gf.load_graph_parquet(tmp_dir + "/graph/")
+
+    nodes, edges, graph_attrs = gf.load_graph_tables(
+        tmp_dir + "/graph/", node_columns=["x", "y"], edge_columns=["osmid", "length"]
+    )
+
+assert type(loaded_graph) == nx.classes.multidigraph.MultiDiGraph
+assert list(loaded_graph.nodes(data=True)) == list(test_graph.nodes(data=True))
+assert list(loaded_graph.edges(keys=True)) == test_edges
+assert loaded_graph.graph == {"crs": "EPSG:25832", "simplified": True}
+
+for e in test_edges:
+    org_attrs = test_graph.edges[e]
+    loaded_attrs = loaded_graph.edges[e]
+    assert org_attrs.keys() == loaded_attrs.keys()
+    assert loaded_attrs["geometry"].equals(org_attrs["geometry"])
+    assert {k: a for k, a in loaded_attrs.items() if k != "geometry"} == {
+        k: a for k, a in org_attrs.items() if k != "geometry"
+    }
+
+assert loaded_graph.edges[test_edges[0]]["osmid"] == [1, 2]
+assert type(loaded_graph.edges[test_edges[2]]["oneway"]) == bool
+assert "lanes" not in loaded_graph.edges[test_edges[0]]
+
+assert nodes.index.name == "osmid"
+assert type(nodes) == gpd.GeoDataFrame
+assert list(edges.columns) == ["osmid", "length"]
+assert edges.index.names == ["u", "v", "key"]
+assert edges.osmid.iloc[0] == [1, 2]
+
 print("All tests of graph functions passed!")
-# %%
+#%%
+###################### TESTS FOR H3 FUNCTIONS #############################
+
+# Test create_h3_grid
+poly = Polygon([(720000, 6170000), (725000, 6170000), (725000, 6175000), (720000, 6175000)])
+poly_gdf = gpd.GeoDataFrame(geometry=[poly], crs="EPSG:25832")
+
+h3_grid = hf.create_h3_grid(poly_gdf, 8, "EPSG:25832", 500)
+
+assert h3_grid.crs == "EPSG:25832"
+assert h3_grid.grid_id.is_unique
+assert h3_grid.geometry.is_valid.all()
+assert h3_grid.geom_type.unique().tolist() == ["Polygon"]
+assert h3_grid.unary_union.contains(poly.centroid)
+
+# Test assign_nodes_to_h3
+points = gpd.GeoDataFrame(
+    {"osmid": [1, 2, 3]},
+    geometry=[Point(721000, 6171000), Point(722500, 6172500), Point(724000, 6174000)],
+    crs="EPSG:25832",
+)
+points_h3 = hf.assign_nodes_to_h3(points, 8)
+points_overlay = gpd.overlay(points, h3_grid, how="intersection")
+
+assert "grid_id" not in points.columns
+assert points_h3.grid_id.to_list() == points_overlay.grid_id.to_list()
+
+# Test assign_edges_to_h3
+line = LineString([[721000, 6171000], [724000, 6174000]])
+edges = gpd.GeoDataFrame({"edge_id": [5]}, geometry=[line], crs="EPSG:25832", index=[5])
+edges_h3 = hf.assign_edges_to_h3(edges, 8)
+edges_overlay = gpd.overlay(edges, h3_grid, how="intersection", keep_geom_type=True)
+
+assert set(edges_h3.edge_index) == {5}
+assert set(edges_h3.grid_id).issubset(set(edges_overlay.grid_id))
+assert len(edges_h3) >= 0.9 * len(edges_overlay)
+assert round(edges_h3.cell_length.sum(), 2) == round(line.length, 2)
+
+# Test h3_to_parents
+parent_ids = hf.h3_to_parents(h3_grid.grid_id.to_numpy(), 7)
+
+assert parent_ids[0] == h3_to_parent(h3_grid.grid_id[0], 7)
+assert len(set(parent_ids)) < len(h3_grid)
+
+# Test rollup_grid_results
+h3_grid["count_edges"] = 1
+h3_grid["length_edges"] = 2.0
+h3_grid.loc[0, "length_edges"] = np.nan
+h3_grid["area_sqkm"] = h3_grid.area / 1000000
+
+parent_grid = hf.rollup_grid_results(
+    h3_grid,
+    7,
+    sum_cols=["count_edges", "length_edges", "area_sqkm"],
+    ratio_cols={"edge_density": ("length_edges", "area_sqkm", 1)},
+)
+
+assert parent_grid.crs == h3_grid.crs
+assert parent_grid.grid_id.is_unique
+assert set(parent_grid.grid_id) == set(parent_ids)
+assert parent_grid.count_edges.sum() == len(h3_grid)
+assert pd.api.types.is_integer_dtype(parent_grid.count_edges)
+assert parent_grid.length_edges.sum() == 2 * (len(h3_grid) - 1)
+assert (
+    parent_grid.edge_density == parent_grid.length_edges / parent_grid.area_sqkm
+).all()
+
+print("All tests of H3 functions passed!")
+#%%
+###################### TESTS FOR CACHE FUNCTIONS #############################
+import tempfile
+
+# Test hash_arguments
+l1 = LineString([[0, 0], [10, 0]])
+l2 = LineString([[0, 5], [10, 5]])
+gdf = gpd.GeoDataFrame({"edge_id": [1, 2], "tags": [["a"], ["b"]]}, geometry=[l1, l2])
+
+key = cf.hash_arguments(ef.find_overshoots, gdf, 5)
+assert key == cf.hash_arguments(ef.find_overshoots, gdf.copy(), 5)
+assert key != cf.hash_arguments(ef.find_overshoots, gdf, 6)
+assert key != cf.hash_arguments(ef.find_undershoots, gdf, 5)
+
+gdf_moved = gdf.copy()
+gdf_moved.loc[1, "geometry"] = LineString([[0, 5], [10, 6]])
+assert key != cf.hash_arguments(ef.find_overshoots, gdf_moved, 5)
+
+gdf_changed = gdf.copy()
+gdf_changed.loc[1, "edge_id"] = 3
+assert key != cf.hash_arguments(ef.find_overshoots, gdf_changed, 5)
+
+# Test disk_cache
+calls = []
+
+
+def buffer_edges(edges, dist):
+    calls.append(dist)
+    return edges.buffer(dist).to_frame("geometry")
+
+
+with tempfile.TemporaryDirectory() as cache_dir:
+
+    cached_buffer_edges = cf.disk_cache(cache_dir)(buffer_edges)
+
+    result_1 = cached_buffer_edges(gdf, 1)
+    result_2 = cached_buffer_edges(gdf, 1)
+    result_3 = cached_buffer_edges(gdf, dist=2)
+
+    assert calls == [1, 2]
+    assert isinstance(result_2, gpd.GeoDataFrame)
+    assert result_1.geom_equals(result_2).all()
+    assert len(os.listdir(cache_dir)) == 2
+
+    cf.evict_cache(cache_dir, max_size_mb=0)
+    assert len(os.listdir(cache_dir)) == 0
+
+    result_4 = cached_buffer_edges(gdf, 1)
+    assert calls == [1, 2, 1]
+
+print("All tests of cache functions passed!")
+
+#%%
+###################### TESTS FOR SIMPLIFICATION FUNCTIONS #############################
+
+# Test simplify graph array method
+test_graph = gf.create_osmnx_graph(
+    gpd.read_file("../tests/test_data/osm_small_test.gpkg")
+)
+for n1, n2, d in test_graph.edges(data=True):
+    d.pop("geometry", None)
+
+for kwargs in [{}, {"attributes": ["osmid"]}, {"strict": False}]:
+    simplified_nx = sf.simplify_graph(test_graph, method="networkx", **kwargs)
+    simplified_array = sf.simplify_graph(test_graph, method="array", **kwargs)
+
+    assert list(simplified_nx.nodes) == list(simplified_array.nodes)
+    assert set(simplified_nx.edges(keys=True)) == set(simplified_array.edges(keys=True))
+    assert simplified_array.graph["simplified"] == True
+
+    for e in simplified_nx.edges(keys=True):
+        d_nx = simplified_nx.edges[e]
+        d_array = simplified_array.edges[e]
+        assert d_nx.keys() == d_array.keys()
+        assert math.isclose(d_nx["length"], d_array["length"])
+        if "geometry" in d_nx:
+            assert d_nx["geometry"].equals_exact(d_array["geometry"], 0)
+
+# Test simplify graph array method with null and missing attribute values
+G = nx.MultiDiGraph()
+for i in range(5):
+    G.add_node(i, x=float(i), y=0.0)
+for i, name in enumerate([None, "a", np.nan, "a"]):
+    d = {"length": 1, "osmid": i}
+    if i < 3:
+        d["name"] = name
+    if i == 1:
+        d["ref"] = None
+    G.add_edge(i, i + 1, **d)
+    G.add_edge(i + 1, i, **d)
+
+for kwargs in [{}, {"strict": False}]:
+    simplified_nx = sf.simplify_graph(G, method="networkx", **kwargs)
+    simplified_array = sf.simplify_graph(G, method="array", **kwargs)
+    assert set(simplified_nx.edges(keys=True)) == set(simplified_array.edges(keys=True))
+    for e in simplified_nx.edges(keys=True):
+        d_nx = simplified_nx.edges[e]
+        d_array = simplified_array.edges[e]
+        assert d_nx.keys() == d_array.keys()
+        for attr in ["name", "ref"]:
+            if attr in d_nx:
+                assert repr(d_nx[attr]) == repr(d_array[attr])
+
+simplified = sf.simplify_graph(G, method="array")
+assert len(simplified.edges[0, 4, 0]["name"]) == 3
+assert simplified.edges[0, 4, 0]["ref"] is None
+
+# Test simplify graph without edges
+G = nx.MultiDiGraph()
+G.add_node(1, x=0.0, y=0.0)
+G.add_node(2, x=1.0, y=0.0)
+assert list(sf.simplify_graph(G, strict=False).nodes) == list(
+    sf.simplify_graph(G, strict=False, method="networkx").nodes
+)
+
+# Test simplify graph in parallel per component
+simplified = sf.simplify_graph(test_graph)
+simplified_parallel = sf.simplify_graph(test_graph, n_jobs=2)
+
+assert list(simplified.nodes) == list(simplified_parallel.nodes)
+assert set(simplified.edges(keys=True)) == set(simplified_parallel.edges(keys=True))
+
+# Test simplify graph with a chain, a ring and a change of attribute values
+G = nx.MultiDiGraph()
+for i, (x, y) in enumerate([(0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (5, 1), (6, 1), (5, 2)]):
+    G.add_node(i, x=x, y=y)
+for u, v, p in [(0, 1, "a"), (1, 2, "a"), (2, 3, "b"), (3, 4, "b"), (5, 6, "a"), (6, 7, "a"), (7, 5, "a")]:
+    G.add_edge(u, v, length=1, protected=p)
+    G.add_edge(v, u, length=1, protected=p)
+
+simplified = sf.simplify_graph(G)
+assert list(simplified.nodes) == [0, 4]
+assert set(simplified.edges(keys=True)) == {(0, 4, 0), (4, 0, 0)}
+assert simplified.edges[0, 4, 0]["length"] == 4
+assert set(simplified.edges[0, 4, 0]["protected"]) == {"a", "b"}
+assert list(simplified.edges[0, 4, 0]["geometry"].coords) == [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0)]
+
+simplified = sf.simplify_graph(G, attributes=["protected"], remove_rings=False)
+assert list(simplified.nodes) == [0, 2, 4, 5, 6, 7]
+assert simplified.edges[0, 2, 0]["protected"] == "a"
+assert simplified.edges[2, 4, 0]["protected"] == "b"
+
+# Test classify endpoints
+node_position, is_endpoint, is_topological_endpoint = sf._classify_endpoints(
+    G, attributes=["protected"]
+)
+assert node_position[7] == 7
+assert list(is_endpoint) == [True, False, True, False, True, False, False, False]
+assert list(is_topological_endpoint) == [True, False, False, False, True, False, False, False]
+
+# Test simplify graph with networkx method removes rings
+simplified = sf.simplify_graph(G, attributes=["protected"], method="networkx")
+assert list(simplified.nodes) == [0, 2, 4]
+
+# Test simplify edges
+nodes, edges = ox.graph_to_gdfs(test_graph, edges=True, fill_edge_geometry=False)
+edges = edges.drop(columns="geometry")
+nodes_simplified, edges_simplified = sf.simplify_edges(nodes, edges)
+simplified_nx = sf.simplify_graph(test_graph, method="networkx")
+
+assert list(nodes_simplified.index) == list(simplified_nx.nodes)
+assert set(edges_simplified.index) == set(simplified_nx.edges(keys=True))
+assert edges_simplified.index.names == ["u", "v", "key"]
+assert isinstance(edges_simplified, gpd.GeoDataFrame)
+
+# Test get undirected
+G = nx.MultiDiGraph(crs="EPSG:25832")
+G.add_node(1, x=0.0, y=0.0)
+G.add_node(2, x=10.0, y=0.0)
+G.add_edge(1, 2, osmid=1, geometry=LineString([(0, 0), (5, 1), (10, 0)]))
+G.add_edge(2, 1, osmid=1, geometry=LineString([(10, 0), (5, 1), (0, 0)]))
+G.add_edge(2, 1, key=1, osmid=[2, 3], geometry=LineString([(10, 0), (5, -1), (0, 0)]))
+G.add_edge(1, 2, key=1, osmid=[3, 2])
+G.add_edge(1, 2, key=2, osmid=[3, 2], protected="yes")
+
+H = sf.get_undirected(G)
+assert type(H) == nx.MultiGraph
+# the reversed copy of the first edge is a duplicate, the straight and curved edges with key 1 are different streets
+assert len(H.edges) == 3
+assert sorted(d["geometry"].wkt for u, v, d in H.edges(data=True)) == [
+    "LINESTRING (0 0, 10 0)",
+    "LINESTRING (10 0, 5 -1, 0 0)",
+    "LINESTRING (10 0, 5 1, 0 0)",
+]
+assert len(sf.get_undirected(G, attributes="protected").edges) == 4
+
+# Test multidigraph to graph
+G = nx.MultiDiGraph(crs="EPSG:4326")
+G.add_node(1, x=0.0, y=0.0)
+G.add_node(2, x=0.001, y=0.0)
+G.add_node(3, x=0.0, y=0.001)
+G.add_edge(1, 2, osmid=10, length=1, geometry=LineString([(0, 0), (0.0005, 0.0002), (0.001, 0)]))
+G.add_edge(1, 2, osmid=11, length=1, geometry=LineString([(0, 0), (0.0005, -0.0002), (0.001, 0)]))
+G.add_edge(2, 1, osmid=12, length=1, geometry=LineString([(0.001, 0), (0.0005, 0.0004), (0, 0)]))
+G.add_edge(1, 3, osmid=13, length=1, geometry=LineString([(0, 0), (0, 0.001)]))
+G.add_edge(1, 3, osmid=14, length=1, geometry=LineString([(0, 0), (0, 0.001)]))
+G.add_edge(3, 3, osmid=15, length=1, geometry=LineString([(0, 0.001), (0.0001, 0.002), (-0.0001, 0.002), (0, 0.001)]))
+
+H, debug_dict = sf.multidigraph_to_graph(G, debug=True)
+
+assert type(H) == nx.Graph
+assert len(debug_dict["self-loop"]) == 1
+assert len(debug_dict["multiple-path"]) == 5
+# 2 new nodes for the self-loop and 1 for each split path, numbered from the highest node id
+assert sorted(H.nodes) == [1, 2, 3, 4, 5, 6, 7, 8]
+assert len(H.edges) == 11
+assert math.isclose(
+    sum(d["geometry"].length for u, v, d in H.edges(data=True)),
+    sum(d["geometry"].length for u, v, d in G.edges(data=True)),
+)
+# the straight path is split at its middle
+assert [H.nodes[n]["y"] for n in H.neighbors(3) if H[3][n]["osmid"] == 13] == [0.0005]
+# edges are connected to the end of the geometry they start at
+for u, v, d in H.edges(data=True):
+    end_points = {d["geometry"].coords[0], d["geometry"].coords[-1]}
+    assert end_points == {(H.nodes[u]["x"], H.nodes[u]["y"]), (H.nodes[v]["x"], H.nodes[v]["y"])}
+
+print("All tests of simplification functions passed!")
+#%%
+###################### TESTS FOR IO FUNCTIONS #############################
+import tempfile
+
+# Test read_parquet
+test_edges = gpd.read_file("../tests/test_data/osm_small_test.gpkg")
+test_edges["length"] = test_edges.geometry.length
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+
+    test_edges.to_parquet(tmp_dir + "/edges.parquet")
+
+    edges = pqf.read_parquet(tmp_dir + "/edges.parquet")
+    assert type(edges) == gpd.GeoDataFrame
+    assert edges.crs == test_edges.crs
+    assert list(edges.columns) == list(test_edges.columns)
+
+    edges = pqf.read_parquet(tmp_dir + "/edges.parquet", columns=["length"])
+    assert type(edges) == pd.DataFrame
+    assert list(edges.columns) == ["length"]
+
+    # Test DataLoader
+    test_graph = gf.create_osmnx_graph(test_edges)
+    gf.save_graph_parquet(test_graph, tmp_dir + "/graph/")
+
+    nodes, _ = gf.create_osmnx_gdfs(test_edges)
+    nodes.reset_index().to_parquet(tmp_dir + "/nodes.parquet")
+
+    loader = iof.DataLoader(
+        {
+            "edges": tmp_dir + "/edges.parquet",
+            "nodes": tmp_dir + "/nodes.parquet",
+            "graph": tmp_dir + "/graph/",
+        },
+        index_cols={"nodes": "osmid"},
+    )
+
+    assert len(loader.report()) == 0
+    assert "edges" in dir(loader)
+
+    edges = loader.load("edges", columns=["length", "geometry"])
+    assert list(edges.columns) == ["length", "geometry"]
+    assert loader.load("edges", columns=["length", "geometry"]) is edges
+
+    nodes = loader.load("nodes", columns=["x"])
+    assert nodes.index.name == "osmid"
+    assert list(nodes.columns) == ["x"]
+
+    assert loader.graph.number_of_edges() == len(test_edges)
+    assert loader.graph is loader.graph
+
+    edges = loader.edges
+    assert list(edges.columns) == list(test_edges.columns)
+    assert list(loader.load("edges", columns=["length"]).columns) == ["length"]
+
+    # Unknown columns raise an error, also when all columns are in memory
+    for cached_name in ["nodes", "edges"]:
+        try:
+            loader.load(cached_name, columns=["length", "bike_lanes"])
+            assert False
+        except ValueError:
+            pass
+
+    report = loader.report()
+    assert len(report) == 4
+    assert report.memory_mb.notna().all()
+    graph_edges = ox.graph_to_gdfs(loader.graph, nodes=False)
+    assert iof.memory_usage(loader.graph) > iof.memory_usage(
+        pd.DataFrame(graph_edges[["length"]])
+    )
+    assert iof.memory_usage(nx.MultiDiGraph()) == 0
+    assert iof.memory_usage(edges) > iof.memory_usage(pd.DataFrame(edges.drop(columns="geometry")))
+    assert report.loc[report.loaded_columns == "all", "rows"].to_list() == [
+        len(test_edges),
+        len(test_edges),
+    ]
+
+    loader.unload("edges")
+    assert "edges" not in loader.report().dataset.to_list()
+
+    loader.unload()
+    assert len(loader.report()) == 0
+
+try:
+    loader.bike_lanes
+    assert False
+except AttributeError:
+    pass
+
+
+# Test write_parquet and read_parquet with bbox
+import shapely
+import pyarrow.parquet as pq
+
+test_lines = [
+    LineString([[x, y], [x + 5, y + 5]]) for x in range(0, 1000, 10) for y in range(0, 1000, 10)
+]
+test_gdf = gpd.GeoDataFrame(
+    {"edge_id": range(len(test_lines))}, geometry=test_lines, crs="EPSG:25832"
+)
+test_bbox = (100, 100, 199, 149)
+test_area = Polygon([(100, 100), (200, 100), (100, 200)])
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+
+    pqf.write_parquet(test_gdf, tmp_dir + "/edges.parquet", row_group_size=500)
+
+    parquet_file = pq.ParquetFile(tmp_dir + "/edges.parquet")
+    assert parquet_file.num_row_groups == 20
+    assert set(pqf.BBOX_COLUMNS).issubset(parquet_file.schema_arrow.names)
+
+    # Rows are sorted spatially, so row groups cover small areas
+    row_group_extent = [
+        parquet_file.metadata.row_group(0).column(i).statistics.max
+        - parquet_file.metadata.row_group(0).column(i).statistics.min
+        for i in [parquet_file.schema_arrow.names.index(c) for c in ["bbox_xmin", "bbox_ymin"]]
+    ]
+    assert max(row_group_extent) < 500
+
+    edges = pqf.read_parquet(tmp_dir + "/edges.parquet")
+    assert list(edges.columns) == list(test_gdf.columns)
+    assert edges.sort_index().equals(test_gdf)
+
+    edges = pqf.read_parquet(tmp_dir + "/edges.parquet", bbox=test_bbox)
+    assert len(edges) == 10 * 5
+    assert edges.intersects(shapely.box(*test_bbox)).all()
+    assert list(edges.columns) == list(test_gdf.columns)
+
+    edges = pqf.read_parquet(tmp_dir + "/edges.parquet", columns=["edge_id"], bbox=test_area)
+    assert type(edges) == pd.DataFrame
+    assert list(edges.columns) == ["edge_id"]
+    assert len(edges) == 11 * 11  # Rows are selected by their bounding box when geometries are not read
+
+    edges = pqf.read_parquet(tmp_dir + "/edges.parquet", bbox=test_area)
+    assert set(edges.edge_id) == set(test_gdf[test_gdf.intersects(test_area)].edge_id)
+
+    # Files without bbox columns are filtered after reading
+    test_gdf.to_parquet(tmp_dir + "/plain.parquet")
+    edges = pqf.read_parquet(tmp_dir + "/plain.parquet", columns=["edge_id"], bbox=test_area)
+    assert set(edges.edge_id) == set(test_gdf[test_gdf.intersects(test_area)].edge_id)
+    assert list(edges.columns) == ["edge_id"]
+
+    loader = iof.DataLoader({"edges": tmp_dir + "/edges.parquet"}, bbox=test_bbox)
+    assert len(loader.edges) == 10 * 5
+
+
+# Test spatial_sort
+test_gdf = gpd.GeoDataFrame(
+    {"edge_id": [1, 2, 3, 4, 5, 6]},
+    geometry=[
+        LineString([[0, 0], [10, 0]]),
+        LineString([[1000, 1000], [1010, 1000]]),
+        None,
+        LineString([[0, 10], [10, 10]]),
+        LineString([[1000, 1010], [1010, 1010]]),
+        LineString([[0, 10], [10, 10]]),
+    ],
+    crs="EPSG:25832",
+    index=[10, 11, 12, 13, 14, 15],
+)
+
+for method in ["hilbert", "h3"]:
+
+    sorted_gdf, id_map = pqf.spatial_sort(test_gdf, method=method)
+
+    assert len(sorted_gdf) == len(test_gdf)
+    assert sorted_gdf.edge_id.iloc[-1] == 3  # Rows without geometry are placed last
+    assert set(sorted_gdf.edge_id.iloc[:3]) == {1, 4, 6} or set(
+        sorted_gdf.edge_id.iloc[:3]
+    ) == {2, 5, 6}
+    # Rows with the same key keep their order
+    assert sorted_gdf.edge_id.to_list().index(4) < sorted_gdf.edge_id.to_list().index(6)
+
+    assert id_map.original_index.to_list() == sorted_gdf.index.to_list()
+    assert id_map.position.to_list() == list(range(6))
+    assert (
+        test_gdf.edge_id.iloc[id_map.original_position].to_list()
+        == sorted_gdf.edge_id.to_list()
+    )
+
+sorted_gdf, id_map = pqf.spatial_sort(test_gdf.iloc[[0]])
+assert sorted_gdf.equals(test_gdf.iloc[[0]])
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+
+    id_map = pqf.write_parquet(test_gdf, tmp_dir + "/edges.parquet", sort_method="h3")
+    edges = pqf.read_parquet(tmp_dir + "/edges.parquet")
+    assert edges.index.to_list() == id_map.original_index.to_list()
+
+    # The id map is saved next to the data
+    assert pqf.id_map_path(tmp_dir + "/edges.parquet") == tmp_dir + "/edges_id_map.parquet"
+    saved_id_map = pd.read_parquet(tmp_dir + "/edges_id_map.parquet")
+    assert saved_id_map.equals(id_map)
+
+    assert pqf.write_parquet(test_gdf, tmp_dir + "/edges.parquet", sort_method=None) is None
+    edges = pqf.read_parquet(tmp_dir + "/edges.parquet")
+    assert edges.index.to_list() == test_gdf.index.to_list()
+    assert not os.path.exists(tmp_dir + "/edges_id_map.parquet")
+
+print("All tests of IO functions passed!")
+
+#%%
+###################### TESTS FOR SCHEMA FUNCTIONS #############################
+
+# Test osm_tag_columns
+assert schf.osm_tag_columns(["highway", "cycleway:left", "Surface"]) == [
+    "highway",
+    "cycleway_left",
+    "surface",
+]
+
+# Test compact_dtypes
+test_gdf = gpd.GeoDataFrame(
+    {
+        "edge_id": [1, 2, 3, 4],
+        "osmid": [[10, 11], 12, 13, 14],
+        "u": [100, 101, 102, 2**40],
+        "highway": ["cycleway", "primary", None, "cycleway"],
+        "surface": ["paved", np.nan, np.nan, "gravel"],
+        "length": [1.25, 10.5, 100.0, 3.75],
+        "bicycle_bidirectional": [True, False, True, False],
+        "geometry": [
+            LineString([[0, 0], [1, 1]]),
+            LineString([[1, 1], [2, 2]]),
+            LineString([[2, 2], [3, 3]]),
+            LineString([[3, 3], [4, 4]]),
+        ],
+    },
+    crs="EPSG:25832",
+)
+test_gdf["bicycle_bidirectional"] = test_gdf.bicycle_bidirectional.astype(object)
+
+compact_gdf = schf.compact_dtypes(test_gdf, tag_cols=["highway", "surface", "cycleway"])
+
+assert compact_gdf.edge_id.dtype == "int32"
+assert compact_gdf.u.dtype == "int64"
+assert compact_gdf.osmid.to_list() == ["[10, 11]", "12", "13", "14"]
+assert compact_gdf.highway.dtype == "category"
+assert compact_gdf.surface.dtype == "category"
+assert compact_gdf.highway.isna().sum() == 1
+assert compact_gdf["length"].dtype == "float32"
+assert compact_gdf.bicycle_bidirectional.dtype == bool
+assert compact_gdf.bicycle_bidirectional.to_list() == [True, False, True, False]
+assert isinstance(compact_gdf, gpd.GeoDataFrame)
+
+# Input is not changed
+assert test_gdf.edge_id.dtype == "int64"
+assert test_gdf.highway.dtype == object
+
+assert iof.memory_usage(compact_gdf) < iof.memory_usage(test_gdf)
+
+# Ids stored as objects
+assert schf.compact_ids(pd.Series([1, 2, 3], dtype=object)).dtype == "int32"
+assert schf.compact_ids(pd.Series(["a", "b"])).to_list() == ["a", "b"]
+
+# Lengths are only converted if the precision is kept
+lengths = pd.Series([0.1, 123456.789])
+assert schf.compact_lengths(lengths, tolerance=0.1).dtype == "float32"
+assert schf.compact_lengths(lengths, tolerance=1e-9).dtype == "float64"
+
+# Booleans with missing values
+bools = schf.compact_bools(pd.Series([True, None, False], dtype=object))
+assert bools.dtype == "boolean"
+assert bools.isna().to_list() == [False, True, False]
+assert schf.compact_bools(pd.Series(["yes", "no"])).dtype == object
+
+# Tags that are not strings are not changed
+assert schf.compact_tags(pd.Series([1, 2])).dtype == "int64"
+
+# Data types are kept when saving to Parquet
+with tempfile.TemporaryDirectory() as tmp_dir:
+
+    pqf.write_parquet(compact_gdf, tmp_dir + "/edges.parquet", sort_method=None)
+    edges = pqf.read_parquet(tmp_dir + "/edges.parquet")
+
+    assert edges.dtypes.to_dict() == compact_gdf.dtypes.to_dict()
+    assert edges.highway.astype(object).where(edges.highway.notna(), None).to_list() == [
+        "cycleway",
+        "primary",
+        None,
+        "cycleway",
+    ]
+
+# Evaluation functions give the same results for compact data
+existing_tags_dict = {
+    "surface": {"all": ["surface"]},
+    "highway": {"all": ["highway"]},
+}
+existing_tags = ef.compute_existing_tags(test_gdf, existing_tags_dict)
+existing_tags_compact = ef.compute_existing_tags(compact_gdf, existing_tags_dict)
+for tag in existing_tags_dict:
+    assert existing_tags[tag]["count"] == existing_tags_compact[tag]["count"]
+    assert round(existing_tags[tag]["length"], 2) == round(
+        existing_tags_compact[tag]["length"], 2
+    )
+
+incompatible_tags_dict = {"highway": {"cycleway": [["surface", "gravel"]]}}
+assert ef.compute_incompatible_tags(
+    test_gdf, incompatible_tags_dict
+)[0] == ef.compute_incompatible_tags(compact_gdf, incompatible_tags_dict)[0]
+assert ef.compute_incompatible_tags(compact_gdf, incompatible_tags_dict)[0] == {
+    "highway/surface": 1
+}
+
+print("All tests of schema functions passed!")